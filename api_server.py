@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+HTTP/JSON API for transcript scoring, for services that can't use the Streamlit app
+
+Endpoints:
+    POST /score        raw PDF body (Content-Type: application/pdf)
+    POST /score/text   JSON {"text": "..."} or a text/plain body of extracted transcript text
+    GET  /healthz      liveness and load
+
+Both POST endpoints return the ``parse_transcript`` result as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple
+
+from cache import ResultCache, _to_json, hash_pdf_bytes
+from pdf_buffer import SharedPDF
+from pdf_parser import TranscriptParser
+from preflight import PreflightLimits, TranscriptRejected, preflight
+
+# One warm parser per pool worker, created by _init_worker
+_worker_parser = None
+
+# Response status for each TranscriptRejected reason
+REJECTION_STATUS = {
+    'too_large': HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+    'too_many_pages': HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+    'not_pdf': HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+    'busy': HTTPStatus.SERVICE_UNAVAILABLE,
+    'time_budget': HTTPStatus.GATEWAY_TIMEOUT,
+}
+
+
+def _init_worker():
+    """Create the per-process parser so thesis codes are loaded once per worker."""
+    global _worker_parser
+    _worker_parser = TranscriptParser()
+
+
+def _warm_up() -> int:
+    """No-op task submitted once per worker so every worker starts (and initialises) at once."""
+    return os.getpid()
+
+
+def _score_pdf(pdf: SharedPDF, time_budget: Optional[float] = None) -> Dict:
+    """Parse one PDF inside a pool worker, reading the request body from shared memory."""
+    parser = _worker_parser or TranscriptParser()
+    try:
+        return parser.parse_transcript(pdf, time_budget=time_budget)
+    finally:
+        pdf.close()
+
+
+def _score_text(text: str) -> Dict:
+    """Parse extracted transcript text inside a pool worker."""
+    parser = _worker_parser or TranscriptParser()
+    return parser.parse_transcript_text(text)
+
+
+class HTTPError(Exception):
+    """An error response: status code, message and optional extra headers."""
+
+    def __init__(self, status: HTTPStatus, message: str, headers: Optional[Dict[str, str]] = None,
+                 close: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+        self.close = close
+
+
+class ScoringServer:
+    """Minimal asyncio HTTP/1.1 server around a warm ``TranscriptParser``.
+
+    PDF extraction and text parsing both run on a process pool, so the event
+    loop never blocks on pdfplumber or the line matcher (a few tens of KB of
+    adversarial text can keep the matcher backtracking for seconds). Bodies
+    over ``max_body_bytes`` are rejected with 413 before they are read, and
+    once ``max_in_flight`` requests are being scored further ones get 503
+    with ``Retry-After`` instead of queueing without bound. Results are
+    cached in memory by PDF hash, as in the app.
+
+    PDF bodies are pre-flighted on a thread before they reach the pool, so
+    files that aren't readable transcripts, or have more than ``max_pages``
+    pages, are refused in milliseconds without taking a worker. Workers
+    stop extracting once a PDF has used ``request_timeout`` seconds.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_body_bytes: int = 10 * 1024 * 1024,
+                 max_in_flight: Optional[int] = None, request_timeout: float = 60, cache_entries: int = 256,
+                 cache_ttl: float = 15 * 60, max_pages: Optional[int] = 50):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_body_bytes = max_body_bytes
+        self.max_in_flight = max_in_flight or self.workers * 4
+        # Concurrency is bounded by max_in_flight, for text requests too
+        self.limits = PreflightLimits(max_bytes=max_body_bytes, max_pages=max_pages,
+                                      time_budget=request_timeout, max_concurrent=None)
+        self.request_timeout = request_timeout
+        self.parser = TranscriptParser()
+        self.result_cache = ResultCache(max_entries=cache_entries, ttl=cache_ttl)
+        self.in_flight = 0
+        self.served = 0
+        self.started_at = time.time()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Warm-up tasks of the current pool
+        self._warming = []
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Workers are never forked from the server itself: a forked worker would inherit
+            # whichever client sockets were open, and those clients would never see EOF
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 mp_context=multiprocessing.get_context(method))
+            # Workers start on demand; one no-op each starts them all now rather than on the first request
+            self._warming = [self._executor.submit(_warm_up) for _ in range(self.workers)]
+        return self._executor
+
+    def _warm_pool(self):
+        """Create the pool and wait until every worker has started."""
+        self._pool()
+        for future in self._warming:
+            future.result()
+
+    async def _run_in_pool(self, func, *args) -> Dict:
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._pool(), func, *args)
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, "Scoring timed out")
+        except BrokenProcessPool:
+            # A worker died (e.g. a pathological PDF ran it out of memory); replace the pool,
+            # starting the new workers now so the next request doesn't wait for them
+            self.close()
+            self._pool()
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "Worker crashed while scoring")
+
+    # Request handling
+
+    async def score_pdf(self, body: bytes, headers: Dict[str, str]) -> Dict:
+        key = self.result_cache.make_key(hash_pdf_bytes(body), self.parser.rules_version)
+        result = self.result_cache.get(key)
+        if result is None:
+            # Off the event loop, but without taking a pool worker
+            await asyncio.to_thread(preflight, body, self.limits)
+            # The body goes to the worker through shared memory rather than being pickled
+            with SharedPDF(body) as shared:
+                result = await self._run_in_pool(_score_pdf, shared, self.limits.time_budget)
+            self.result_cache.put(key, result)
+        return result
+
+    async def score_text(self, body: bytes, headers: Dict[str, str]) -> Dict:
+        if headers.get('content-type', '').split(';')[0].strip() == 'application/json':
+            try:
+                text = json.loads(body)['text']
+            except (ValueError, KeyError, TypeError):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, 'Expected a JSON object with a "text" field')
+            if isinstance(text, list):
+                text = '\n'.join(text)
+            if not isinstance(text, str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, '"text" must be a string or a list of lines')
+        else:
+            try:
+                text = body.decode('utf-8')
+            except UnicodeDecodeError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not UTF-8 text")
+        return await self._run_in_pool(_score_text, text)
+
+    def healthz(self) -> Dict:
+        return {
+            'status': 'ok',
+            'rules_version': self.parser.rules_version,
+            'workers': self.workers,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'served': self.served,
+            'cached_results': len(self.result_cache),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+        }
+
+    async def dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[HTTPStatus, Dict]:
+        path = path.split('?', 1)[0]
+        if path == '/healthz':
+            if method not in ('GET', 'HEAD'):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET", {'Allow': 'GET, HEAD'})
+            return HTTPStatus.OK, self.healthz()
+
+        routes = {'/score': self.score_pdf, '/score/text': self.score_text}
+        handler = routes.get(path)
+        if handler is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Not found")
+        if method != 'POST':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST", {'Allow': 'POST'})
+        if self.in_flight >= self.max_in_flight:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, retry shortly", {'Retry-After': '1'})
+
+        self.in_flight += 1
+        try:
+            result = await handler(body, headers)
+        except HTTPError:
+            raise
+        except TranscriptRejected as e:
+            raise HTTPError(REJECTION_STATUS.get(e.reason, HTTPStatus.UNPROCESSABLE_ENTITY), e.message)
+        except Exception as e:
+            raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, f"Could not score transcript: {e}")
+        finally:
+            self.in_flight -= 1
+        self.served += 1
+        return HTTPStatus.OK, result
+
+    # HTTP/1.1 plumbing
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Read one request; returns None when the client closed the connection."""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Incomplete request", close=True)
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large", close=True)
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line", close=True)
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Chunked bodies are not supported", close=True)
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length", close=True)
+        if length > self.max_body_bytes:
+            # Refuse before reading, and close since the body is left unread
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                            f"Body exceeds {self.max_body_bytes} bytes", close=True)
+        body = await reader.readexactly(length) if length else b''
+
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+        return method, target, headers, body, keep_alive
+
+    @staticmethod
+    def _response(status: HTTPStatus, payload: Dict, keep_alive: bool, extra_headers: Optional[Dict] = None) -> bytes:
+        body = json.dumps(payload, default=_to_json).encode('utf-8')
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Length': str(len(body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }
+        headers.update(extra_headers or {})
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        return head.encode('latin-1') + b'\r\n' + body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.request_timeout)
+                except HTTPError as e:
+                    writer.write(self._response(e.status, {'error': e.message}, False, e.headers))
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+                if request is None:
+                    break
+
+                method, target, headers, body, keep_alive = request
+                try:
+                    status, payload = await self.dispatch(method, target, headers, body)
+                    extra_headers = None
+                except HTTPError as e:
+                    status, payload, extra_headers = e.status, {'error': e.message}, e.headers
+                writer.write(self._response(status, payload, keep_alive, extra_headers))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8080):
+        # Start every worker before accepting connections, so the first PDF request doesn't pay for start-up
+        await asyncio.to_thread(self._warm_pool)
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=64 * 1024, backlog=1024)
+        print(f"🚀 Scoring API on http://{host}:{port} ({self.workers} workers)")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # pragma: no cover - Windows
+                pass
+        async with server:
+            await stop.wait()
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Serve transcript scoring over HTTP/JSON.")
+    arg_parser.add_argument('--host', default='127.0.0.1', help="Interface to bind (default: 127.0.0.1)")
+    arg_parser.add_argument('--port', type=int, default=8080, help="Port to listen on (default: 8080)")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None,
+                            help="PDF extraction processes (default: CPU count)")
+    arg_parser.add_argument('--max-body-mb', type=float, default=10, help="Largest accepted request body in MB")
+    arg_parser.add_argument('--max-in-flight', type=int, default=None,
+                            help="Requests scored at once before answering 503 (default: 4 x workers)")
+    arg_parser.add_argument('--timeout', type=float, default=60, help="Per-request timeout in seconds")
+    arg_parser.add_argument('--max-pages', type=int, default=50, help="Largest accepted PDF in pages")
+    args = arg_parser.parse_args(argv)
+
+    server = ScoringServer(workers=args.workers, max_body_bytes=int(args.max_body_mb * 1024 * 1024),
+                           max_in_flight=args.max_in_flight, request_timeout=args.timeout,
+                           max_pages=args.max_pages)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
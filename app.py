@@ -1,6 +1,13 @@
+import time
 import streamlit as st
-import pandas as pd
 from pdf_parser import TranscriptParser
+from ocr import OCRFallback
+from cache import PageCache, ResultCache
+from line_matcher import UNIT_CODE
+from simulator import WhatIfSimulator
+from instrumentation import HistogramSink, LoggingSink
+from parse_jobs import ParseJob, ParseJobManager
+from preflight import PreflightLimits, TranscriptRejected
 
 # Page configuration
 st.set_page_config(
@@ -66,8 +73,62 @@ st.markdown("""
 @st.cache_resource
 def load_parser():
     """Load the transcript parser with caching."""
-    return TranscriptParser()
+    # Scanned transcripts can only be read when tesseract is installed
+    ocr = OCRFallback(workers=2, page_timeout=30) if OCRFallback.available() else None
+    # A re-uploaded transcript only extracts and matches its new pages
+    return TranscriptParser(ocr=ocr, page_cache=PageCache(ttl=15 * 60))
 
+@st.cache_resource
+def load_result_cache():
+    """Memory-only cache of parsed results, shared across reruns and sessions."""
+    return ResultCache(max_entries=64, ttl=15 * 60)
+
+@st.cache_resource
+def load_parse_histograms():
+    """Stage and page timings aggregated over every parse served by this process."""
+    return HistogramSink()
+
+@st.cache_resource
+def load_parse_jobs():
+    """Bounded background parsing pool, shared by every session."""
+    # Junk, oversized and encrypted uploads are turned away before they reach a worker
+    limits = PreflightLimits(max_bytes=10 * 1024 * 1024, max_pages=50, time_budget=60, max_concurrent=8)
+    return ParseJobManager(load_parser(), load_result_cache(), workers=2,
+                           sinks=[LoggingSink(), load_parse_histograms()], limits=limits)
+
+def progress_text(job: ParseJob) -> str:
+    """Describe how far a background parse has got."""
+    if not job.future.running():
+        return "Waiting for a free worker..."
+    if not job.pages_total:
+        return "Opening your transcript..."
+    return f"Reading page {min(job.pages_done + 1, job.pages_total)} of {job.pages_total}..."
+
+def wait_for_result(uploaded_file) -> ParseJob:
+    """Parse the upload in the background, showing per-page progress until it finishes.
+    
+    The job is kept in the session, so reruns from widget changes reuse it
+    (or its finished result) instead of parsing again. Uploading a new file
+    releases the previous job, cancelling it if it never started.
+    """
+    parse_jobs = load_parse_jobs()
+    job = st.session_state.get('parse_job')
+    if job is None or st.session_state.get('parse_job_file') != uploaded_file.file_id:
+        if job is not None:
+            parse_jobs.release(job)
+            st.session_state['parse_job'] = None
+        # Raises TranscriptRejected for uploads that fail pre-flight
+        job = parse_jobs.submit(uploaded_file)
+        st.session_state['parse_job'] = job
+        st.session_state['parse_job_file'] = uploaded_file.file_id
+    
+    if not job.done():
+        progress = st.progress(0.0, text=progress_text(job))
+        while not job.done():
+            progress.progress(job.progress, text=progress_text(job))
+            time.sleep(0.2)
+        progress.empty()
+    return job
 
 
 def main():
@@ -102,7 +163,7 @@ def main():
         st.markdown("**📚 Source:** EIHWAM calculation methodology and honours class thresholds are based on the [USYD Engineering Handbook](https://www.sydney.edu.au/handbooks/engineering/).")
         
         st.markdown("---")
-        st.markdown("**🔒 Privacy:** Your transcript is processed in memory only and is not stored.")
+        st.markdown("**🔒 Privacy:** Your transcript is processed in memory only and is never written to disk. Results are kept in memory for up to 15 minutes so the page can refresh instantly.")
     
     # Main content
     st.markdown("### 📄 Upload Your Academic Transcript")
@@ -136,18 +197,22 @@ def main():
     # Consent checkbox
     consent = st.checkbox(
         "I consent to processing my transcript for EIHWAM calculation",
-        help="Your transcript will be processed in memory only and not stored"
+        help="Your transcript will be processed in memory only and never written to disk"
     )
     
     if uploaded_file and consent:
         try:
+            # Only needed once there are results to show; keeps the first page load fast
+            import pandas as pd
+            
             # Load parser
             parser = load_parser()
+            parse_histograms = load_parse_histograms()
             
-            # Show processing message
-            with st.spinner("Processing your transcript..."):
-                # Parse transcript
-                result = parser.parse_transcript(uploaded_file)
+            # Parse in the background (reruns and repeat uploads reuse the result)
+            job = wait_for_result(uploaded_file)
+            result = job.result()
+            instrumentation = job.instrumentation
             
             # Display results
             st.success("✅ Transcript processed successfully!")
@@ -209,7 +274,80 @@ def main():
             # Display table
             st.dataframe(df_display, use_container_width=True)
             
+            # What-if simulator
+            with st.expander("🎯 What-if Simulator"):
+                st.markdown("Add units you haven't completed yet. Enter an expected mark, or leave **Mark** blank to see the mark you need in those units for each honours class.")
+                planned = st.data_editor(
+                    pd.DataFrame({
+                        'Unit Code': pd.Series(dtype=str),
+                        'Credit Points': pd.Series(dtype=float),
+                        'Mark': pd.Series(dtype=float)
+                    }),
+                    num_rows="dynamic",
+                    use_container_width=True,
+                    key="what_if_units"
+                )
+                
+                simulator = WhatIfSimulator.from_result(parser, result)
+                for index, row in planned.iterrows():
+                    code = str(row['Unit Code'] or '').strip().upper()
+                    if not UNIT_CODE.fullmatch(code):
+                        continue
+                    credit_points = 6 if pd.isna(row['Credit Points']) else int(row['Credit Points'])
+                    mark = None if pd.isna(row['Mark']) else int(row['Mark'])
+                    simulator.add_unit(str(index), code, credit_points, mark)
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Projected EIHWAM", simulator.eihwam, delta=round(simulator.eihwam - result['eihwam'], 2))
+                with col2:
+                    st.metric("Projected WAM", simulator.wam, delta=round(simulator.wam - result['wam'], 2))
+                with col3:
+                    st.metric("Projected Honours Class", simulator.honours_class)
+                
+                if any(unit.mark is None for unit, _, _ in simulator.hypothetical.values()):
+                    # Imported here so sessions that never leave a mark blank don't load NumPy
+                    from projection import EIHWAMProjection, MarkDistribution
 
+                    required = simulator.required_marks()
+                    # Blank units' marks drawn from this transcript's own marks at each level
+                    projection = EIHWAMProjection.from_simulator(
+                        simulator, MarkDistribution.fit(result['units'], parser.rules)
+                    ).project(seed=0)
+                    chances = projection['class_probabilities']
+                    st.dataframe(pd.DataFrame([
+                        {
+                            'Honours Class': honours_class,
+                            'Mark Needed in Blank Units': 'Not reachable' if mark is None else ('Already secured' if mark == 0 else mark),
+                            'Chance at Your Usual Marks': f"{chances.get(honours_class, 0):.0%}"
+                        }
+                        for honours_class, mark in required.items()
+                    ]), use_container_width=True, hide_index=True)
+                    st.caption(f"Chances from {projection['scenarios']:,} simulated results for the blank units, "
+                               f"based on your marks so far. Middle 90% of final EIHWAMs: "
+                               f"{projection['percentiles']['p5']}–{projection['percentiles']['p95']}.")
+            
+            # Parse diagnostics
+            with st.expander("🩺 Diagnostics"):
+                if instrumentation is not None and instrumentation.stages:
+                    report = instrumentation.report()
+                    st.markdown("**This transcript**")
+                    st.dataframe(pd.DataFrame([
+                        {'Stage': stage, 'Time (ms)': round(seconds * 1000, 2)}
+                        for stage, seconds in report['stages'].items()
+                    ]), use_container_width=True, hide_index=True)
+                    st.json(report['counters'])
+                else:
+                    st.caption("This result was served from the cache, so no parsing was timed.")
+                
+                summary = parse_histograms.summary()
+                if summary:
+                    st.markdown("**All transcripts parsed by this server**")
+                    st.dataframe(pd.DataFrame([
+                        {'Stage': stage, 'Count': stats['count'], 'Mean (ms)': round(stats['mean'] * 1000, 2),
+                         'p50 (ms) ≤': stats['p50'] * 1000, 'p95 (ms) ≤': stats['p95'] * 1000}
+                        for stage, stats in summary.items()
+                    ]), use_container_width=True, hide_index=True)
             
             # Warnings and information
             if result['excluded_units'] > 0:
@@ -234,6 +372,8 @@ def main():
             </div>
             """, unsafe_allow_html=True)
             
+        except TranscriptRejected as e:
+            st.error(f"❌ {e.message}")
         except Exception as e:
             st.error(f"❌ Error processing transcript: {str(e)}")
             st.markdown("""
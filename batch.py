@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+Batch transcript processing for whole-cohort EIHWAM runs
+"""
+
+import argparse
+import csv
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from cohort_store import CohortStore
+from ingest_queue import IngestQueue
+from ocr import OCRFallback
+from pdf_parser import TranscriptParser
+from preflight import TranscriptRejected
+from rule_sets import default_registry
+from text_store import TranscriptTextStore
+
+# Columns written for every student, in output order
+SUMMARY_FIELDS = [
+    'file', 'status', 'eihwam', 'wam', 'honours_class',
+    'total_units', 'included_units', 'excluded_units', 'error', 'elapsed',
+    'ocr_pages', 'ocr_seconds', 'rule_set', 'student_id', 'first_page', 'last_page', 'attempts'
+]
+
+# Seconds past its timeout before a transcript whose worker ignored the alarm
+# (stuck in native code) is treated as having crashed its worker
+HANG_GRACE = 30
+
+# Seconds allowed per transcript in --queue runs when --timeout isn't given, so
+# one hanging PDF is quarantined instead of holding its worker forever
+QUEUE_TIMEOUT = 300
+
+# One warm parser (and optional text store) per worker process, created by _init_worker
+_worker_parser = None
+_worker_store = None
+# Whether rows carry their unit dicts (for a cohort store)
+_worker_keep_units = False
+# Seconds each transcript may take, or None
+_worker_timeout = None
+
+
+def _init_worker(text_store_dir: Optional[str] = None, ocr_options: Optional[Dict] = None, layout: bool = False,
+                 keep_units: bool = False, timeout: Optional[float] = None):
+    """Create the per-process parser so thesis codes are loaded once per worker."""
+    global _worker_parser, _worker_store, _worker_keep_units, _worker_timeout
+    _worker_keep_units = keep_units
+    _worker_timeout = timeout
+    _worker_parser = TranscriptParser(ocr=OCRFallback(**ocr_options) if ocr_options is not None else None,
+                                      layout=layout)
+    _worker_store = TranscriptTextStore(text_store_dir) if text_store_dir else None
+
+
+def _summary_row(path: str, result: Dict, keep_units: bool = False) -> Dict:
+    row = {
+        'file': path,
+        'status': 'ok',
+        'eihwam': result['eihwam'],
+        'wam': result['wam'],
+        'honours_class': result['honours_class'],
+        'total_units': result['total_units'],
+        'included_units': result['included_units'],
+        'excluded_units': result['excluded_units'],
+        'error': None
+    }
+    if keep_units:
+        # Plain dicts so rows pickle cheaply back from workers; popped before writing
+        row['units'] = [dict(unit) for unit in result['units']]
+    return row
+
+
+@contextmanager
+def _time_limit(seconds: Optional[float]):
+    """Raise ``TranscriptRejected`` if the body runs for longer than ``seconds``.
+
+    Uses SIGALRM, so it only works in a process's main thread (as in pool
+    workers) and stops pdfminer wherever it is looping in Python code.
+    Where SIGALRM is unavailable the body runs unlimited.
+    """
+    if not seconds or not hasattr(signal, 'setitimer'):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise TranscriptRejected('time_budget', f"Took longer than {seconds:g} seconds to read")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _process_transcript(path: str) -> Dict:
+    """Parse a single transcript inside a worker and return its summary row."""
+    parser = _worker_parser or TranscriptParser()
+    ocr_done = len(parser.ocr.stats.latencies) if parser.ocr else 0
+    start = time.perf_counter()
+    try:
+        with _time_limit(_worker_timeout):
+            if _worker_store is not None:
+                # Reuse stored text when this PDF has been extracted before
+                _, lines = _worker_store.extract_lines(parser, path)
+                result = parser.parse_transcript_text(lines)
+            else:
+                result = parser.parse_transcript(path)
+        row = _summary_row(path, result, _worker_keep_units)
+    except Exception as e:
+        row = {'file': path, 'status': 'error', 'error': str(e)}
+    row['elapsed'] = round(time.perf_counter() - start, 4)
+    if parser.ocr is not None:
+        ocr_latencies = parser.ocr.stats.latencies[ocr_done:]
+        row['ocr_pages'] = len(ocr_latencies)
+        row['ocr_seconds'] = round(sum(ocr_latencies), 3)
+    return row
+
+
+def discover_pdfs(source: str) -> List[str]:
+    """Resolve a directory, manifest file or single PDF into a list of PDF paths.
+
+    A directory is searched recursively for ``*.pdf`` files. A manifest is a
+    text file with one path per line, or a CSV file with a ``path`` column;
+    relative paths are resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith('.pdf'):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+    if source.lower().endswith('.pdf'):
+        return [source]
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', newline='') as f:
+        if source.lower().endswith('.csv'):
+            entries = [row['path'] for row in csv.DictReader(f) if row.get('path')]
+        else:
+            entries = [line.strip() for line in f]
+
+    return [
+        entry if os.path.isabs(entry) else os.path.join(base_dir, entry)
+        for entry in entries
+        if entry and not entry.startswith('#')
+    ]
+
+
+def manifest_majors(source: str) -> Dict[str, str]:
+    """Map each PDF path in a CSV manifest to its ``major`` column, if it has one."""
+    if os.path.isdir(source) or not source.lower().endswith('.csv'):
+        return {}
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r', newline='') as f:
+        return {
+            row['path'] if os.path.isabs(row['path']) else os.path.join(base_dir, row['path']): row['major']
+            for row in csv.DictReader(f) if row.get('path') and row.get('major')
+        }
+
+
+class ResultWriter:
+    """Stream summary rows to a CSV or JSONL file as they arrive."""
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.path = path
+        self.format = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.json')) else 'csv')
+        self._file = open(path, 'w', newline='')
+        self._csv = None
+        if self.format == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=SUMMARY_FIELDS, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, row: Dict):
+        """Write one row and flush so partial runs are never lost."""
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BatchProcessor:
+    """Run ``parse_transcript`` over many PDFs on a process pool.
+
+    Results are yielded in completion order. Only a bounded window of jobs is
+    in flight at once, so rows stream out as soon as they finish and memory
+    does not grow with cohort size, and ``paths`` is only read as jobs are
+    needed. If a worker process dies, the transcripts that were in flight
+    are rerun one at a time on a fresh pool, so only the file that actually
+    crashes it is reported as an error.
+
+    With ``timeout``, a transcript that takes longer than that many seconds
+    is stopped and reported as an error. A worker hung where it can't be
+    interrupted is killed and handled like a crash.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 max_tasks_per_child: Optional[int] = None, text_store_dir: Optional[str] = None,
+                 ocr_options: Optional[Dict] = None, layout: bool = False, keep_units: bool = False,
+                 timeout: Optional[float] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers * 4
+        self.max_tasks_per_child = max_tasks_per_child
+        self.text_store_dir = text_store_dir
+        # OCRFallback keyword arguments; None disables OCR
+        self.ocr_options = ocr_options
+        # Read results tables from word positions rather than lines of text
+        self.layout = layout
+        # Attach each transcript's unit dicts to its row under 'units'
+        self.keep_units = keep_units
+        # Seconds each transcript may take, or None
+        self.timeout = timeout
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        kwargs = {'max_workers': self.workers, 'initializer': _init_worker,
+                  'initargs': (self.text_store_dir, self.ocr_options, self.layout, self.keep_units, self.timeout)}
+        if self.max_tasks_per_child:
+            kwargs['max_tasks_per_child'] = self.max_tasks_per_child
+        return ProcessPoolExecutor(**kwargs)
+
+    @staticmethod
+    def _kill_pool(pool: ProcessPoolExecutor):
+        """Stop a pool without waiting for its workers, killing any that are still running."""
+        terminate_workers = getattr(pool, 'terminate_workers', None)
+        if terminate_workers is not None:
+            terminate_workers()
+            return
+        # Before Python 3.14 there is no public way to stop a running call
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _hung(self, in_flight: Dict[Future, tuple], started: Dict[Future, float]) -> bool:
+        """Note when jobs start running; True if any has outlived its timeout and grace period."""
+        if self.timeout is None:
+            return False
+        now = time.monotonic()
+        for future in in_flight:
+            if future.running():
+                started.setdefault(future, now)
+        return any(now - started.get(future, now) > self.timeout + HANG_GRACE for future in in_flight)
+
+    def run(self, paths: Iterable[str]) -> Iterator[Dict]:
+        """Process ``paths`` and yield one summary row per transcript."""
+        pending = iter(paths)
+        # Jobs that were in flight when a worker died; rerun one at a time
+        # so the transcript that actually crashes the worker is identified
+        suspects = deque()
+        in_flight = {}
+        # When each job was first seen running, for the timeout
+        started = {}
+        poll = None if self.timeout is None else min(self.timeout, 1.0)
+        pool = self._new_pool()
+        try:
+            while True:
+                if suspects:
+                    if not in_flight:
+                        path = suspects.popleft()
+                        in_flight[pool.submit(_process_transcript, path)] = (path, True)
+                else:
+                    while len(in_flight) < self.max_in_flight:
+                        path = next(pending, None)
+                        if path is None:
+                            break
+                        in_flight[pool.submit(_process_transcript, path)] = (path, False)
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, timeout=poll, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    path, isolated = in_flight.pop(future)
+                    started.pop(future, None)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        if isolated:
+                            yield {'file': path, 'status': 'error',
+                                   'error': 'Worker process crashed', 'elapsed': None}
+                        else:
+                            suspects.append(path)
+
+                if not broken and self._hung(in_flight, started):
+                    broken = True
+                    for future, (path, isolated) in list(in_flight.items()):
+                        if isolated:
+                            del in_flight[future]
+                            yield {'file': path, 'status': 'error',
+                                   'error': 'Worker stopped responding', 'elapsed': None}
+
+                if broken:
+                    # Every other in-flight job died with the pool
+                    suspects.extend(path for path, _ in in_flight.values())
+                    in_flight.clear()
+                    started.clear()
+                    self._kill_pool(pool)
+                    pool = self._new_pool()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_queue(queue: IngestQueue, processor: BatchProcessor, batch_size: int = 32) -> Iterator[Dict]:
+    """Process ``queue``'s files until every one is done or quarantined.
+
+    Files are pulled ``batch_size`` at a time and each row is recorded as
+    soon as it arrives, so a restart loses nothing already finished. Rows
+    are yielded with status ``ok``, ``retrying`` (it will be tried again
+    after its backoff) or ``quarantined``. Once no file is ready, waits for
+    the next retry to come due.
+    """
+    while True:
+        for row in processor.run(queue.drain(batch_size)):
+            status = queue.record(row)
+            if status == 'pending':
+                row['status'] = 'retrying'
+            elif status == 'quarantined':
+                row['status'] = 'quarantined'
+            yield row
+        wait_seconds = queue.next_retry()
+        if wait_seconds is None:
+            return
+        time.sleep(wait_seconds)
+
+
+def split_students(paths: Iterable[str], ocr_options: Optional[Dict] = None,
+                   keep_units: bool = False) -> Iterator[Dict]:
+    """Score PDFs that each hold many students' transcripts, one row per student.
+
+    Files are streamed page by page in this process, so memory stays bounded
+    even for a whole cohort merged into one export. A file that can't be
+    read is reported as one error row.
+    """
+    parser = TranscriptParser(ocr=OCRFallback(**ocr_options) if ocr_options is not None else None)
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            for result in parser.iter_student_results(path):
+                row = _summary_row(path, result, keep_units)
+                for key in ('student_id', 'first_page', 'last_page'):
+                    row[key] = result[key]
+                row['elapsed'] = round(time.perf_counter() - start, 4)
+                start = time.perf_counter()
+                yield row
+        except Exception as e:
+            yield {'file': path, 'status': 'error', 'error': str(e),
+                   'elapsed': round(time.perf_counter() - start, 4)}
+
+
+def recompute_from_store(text_store_dir: str, rule_set_ids: Optional[List[str]] = None,
+                         keep_units: bool = False) -> Iterator[Dict]:
+    """Re-score every transcript in a text store without opening any PDFs.
+
+    Use after thesis_codes.json or the EIHWAM rules change: only the line
+    parser and rules engine run, so an archive re-scores in seconds. With
+    ``rule_set_ids`` each transcript is parsed once and scored under every
+    listed rule set (``'auto'`` picks the one that applies to the student),
+    one row per rule set.
+    """
+    parser = TranscriptParser()
+    registry = default_registry() if rule_set_ids else None
+    store = TranscriptTextStore(text_store_dir)
+    try:
+        for pdf_hash, source, lines in store.iter_transcripts():
+            path = source or pdf_hash
+            if registry is None:
+                start = time.perf_counter()
+                try:
+                    row = _summary_row(path, parser.parse_transcript_text(lines), keep_units)
+                except Exception as e:
+                    row = {'file': path, 'status': 'error', 'error': str(e)}
+                row['elapsed'] = round(time.perf_counter() - start, 4)
+                yield row
+                continue
+
+            units = parser.parse_units(lines)
+            for rule_set_id in rule_set_ids:
+                start = time.perf_counter()
+                try:
+                    result = registry.evaluate(units, None if rule_set_id == 'auto' else rule_set_id, lines=lines)
+                    row = _summary_row(path, result, keep_units)
+                    row['rule_set'] = result['rule_set']
+                except Exception as e:
+                    row = {'file': path, 'status': 'error', 'error': str(e), 'rule_set': rule_set_id}
+                row['elapsed'] = round(time.perf_counter() - start, 4)
+                yield row
+    finally:
+        store.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        description="Calculate EIHWAM for a directory or manifest of transcript PDFs."
+    )
+    arg_parser.add_argument('source', nargs='?',
+                            help="Directory of PDFs, a manifest (.txt or .csv with a 'path' column) or a single PDF")
+    arg_parser.add_argument('-o', '--output', required=True, help="Output file (.csv or .jsonl)")
+    arg_parser.add_argument('--format', choices=['csv', 'jsonl'], help="Output format (default: from extension)")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    arg_parser.add_argument('--max-tasks-per-child', type=int, default=None,
+                            help="Recycle worker processes after this many transcripts")
+    arg_parser.add_argument('--text-store', default=None,
+                            help="Directory for extracted transcript text; PDFs already in it are not re-extracted")
+    arg_parser.add_argument('--from-text-store', action='store_true',
+                            help="Re-score every transcript in --text-store without reading any PDFs")
+    arg_parser.add_argument('--rule-set', action='append', dest='rule_sets', metavar='ID',
+                            help="With --from-text-store: score under this rule set from rule_sets.json "
+                                 "('auto' = the one that applies to each student); repeat to compare")
+    arg_parser.add_argument('--split-students', action='store_true',
+                            help="Each PDF holds many students' transcripts; stream it and write one row per student")
+    arg_parser.add_argument('--cohort-db', default=None,
+                            help="Also store every student's summary and unit rows in this SQLite cohort database "
+                                 "(a CSV manifest's 'major' column is recorded too)")
+    arg_parser.add_argument('--layout', action='store_true',
+                            help="Read results tables from word positions instead of matching text lines")
+    arg_parser.add_argument('--ocr', action='store_true', help="OCR pages with no text layer (needs tesseract)")
+    arg_parser.add_argument('--ocr-workers', type=int, default=1, help="OCR processes per worker (default: 1)")
+    arg_parser.add_argument('--ocr-timeout', type=float, default=60, help="Seconds allowed per OCR page")
+    arg_parser.add_argument('--timeout', type=float, default=None,
+                            help="Seconds allowed per transcript; slower ones are stopped and reported as errors "
+                                 f"(default: none, or {QUEUE_TIMEOUT} with --queue)")
+    arg_parser.add_argument('--queue', default=None,
+                            help="SQLite ingest queue recording each file's status; rerunning with the same queue "
+                                 "resumes where an interrupted run stopped (source is then optional)")
+    arg_parser.add_argument('--batch-size', type=int, default=32, help="With --queue: files claimed at a time")
+    arg_parser.add_argument('--max-attempts', type=int, default=3,
+                            help="With --queue: failures before a file is quarantined (default: 3)")
+    arg_parser.add_argument('--retry-quarantined', action='store_true',
+                            help="With --queue: give quarantined files a fresh set of attempts")
+    args = arg_parser.parse_args(argv)
+
+    queue = None
+    if args.queue and (args.from_text_store or args.split_students):
+        arg_parser.error("--queue can't be combined with --from-text-store or --split-students")
+    if (args.retry_quarantined or args.batch_size != 32 or args.max_attempts != 3) and not args.queue:
+        arg_parser.error("--batch-size, --max-attempts and --retry-quarantined need --queue")
+    if args.queue and args.timeout is None:
+        args.timeout = QUEUE_TIMEOUT
+
+    if args.from_text_store:
+        if not args.text_store:
+            arg_parser.error("--from-text-store requires --text-store")
+        if args.rule_sets:
+            unknown = set(args.rule_sets) - set(default_registry().ids()) - {'auto'}
+            if unknown:
+                arg_parser.error(f"unknown rule set(s): {', '.join(sorted(unknown))}")
+        rows = recompute_from_store(args.text_store, args.rule_sets, keep_units=bool(args.cohort_db))
+        print(f"🔍 Recomputing results from stored text in {args.text_store}...")
+    else:
+        if not args.source and not args.queue:
+            arg_parser.error("source is required unless --from-text-store or --queue is given")
+        if args.rule_sets:
+            arg_parser.error("--rule-set is only supported with --from-text-store")
+        if args.layout and args.text_store:
+            arg_parser.error("--layout reads word positions from the PDF and can't be used with --text-store")
+        if args.split_students and (args.layout or args.text_store):
+            arg_parser.error("--split-students can't be combined with --layout or --text-store")
+        paths = discover_pdfs(args.source) if args.source else []
+        if args.queue:
+            queue = IngestQueue(args.queue, max_attempts=args.max_attempts)
+            added = queue.add(paths)
+            if queue.recovered:
+                print(f"↩️ Resuming {queue.recovered} transcripts interrupted in the last run")
+            if args.retry_quarantined:
+                print(f"↩️ Retrying {queue.requeue()} quarantined transcripts")
+            counts = queue.counts()
+            print(f"🗂️ {added} new transcripts queued; {counts['pending']} to process, "
+                  f"{counts['done']} already done, {counts['quarantined']} quarantined")
+        elif not paths:
+            print(f"❌ No PDFs found in {args.source}")
+            return 1
+
+        ocr_options = None
+        if args.ocr:
+            if not OCRFallback.available():
+                print("❌ --ocr needs the tesseract binary to be installed")
+                return 1
+            ocr_options = {'workers': args.ocr_workers, 'page_timeout': args.ocr_timeout}
+        if args.split_students:
+            rows = split_students(paths, ocr_options, keep_units=bool(args.cohort_db))
+            print(f"🔍 Streaming {len(paths)} merged transcript files one student at a time...")
+        else:
+            processor = BatchProcessor(workers=args.workers, max_tasks_per_child=args.max_tasks_per_child,
+                                       text_store_dir=args.text_store, ocr_options=ocr_options, layout=args.layout,
+                                       keep_units=bool(args.cohort_db), timeout=args.timeout)
+            if queue is not None:
+                rows = run_queue(queue, processor, args.batch_size)
+                print(f"🔍 Processing queued transcripts with {processor.workers} workers...")
+            else:
+                rows = processor.run(paths)
+                print(f"🔍 Processing {len(paths)} transcripts with {processor.workers} workers...")
+
+    cohort = CohortStore(args.cohort_db) if args.cohort_db else None
+    majors = manifest_majors(args.source) if cohort is not None and args.source else {}
+    start = time.perf_counter()
+    ok = failed = retried = ocr_pages = 0
+    ocr_seconds = 0.0
+    with ResultWriter(args.output, args.format) as writer:
+        for row in rows:
+            units = row.pop('units', None)
+            if cohort is not None and units is not None:
+                cohort.ingest_row(row, units, majors.get(row['file']))
+            if queue is None:
+                writer.write(row)
+            ocr_pages += row.get('ocr_pages') or 0
+            ocr_seconds += row.get('ocr_seconds') or 0.0
+            if row['status'] == 'ok':
+                ok += 1
+            elif row['status'] == 'retrying':
+                retried += 1
+                print(f"   ↻ {row['file']}: {row['error']} (will retry)")
+            else:
+                failed += 1
+                print(f"   ❌ {row['file']}: {row['error']}")
+        if queue is not None:
+            # Every finished file, including those done in earlier runs
+            for row in queue.results():
+                writer.write(row)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Processed {ok + failed} transcripts in {elapsed:.1f}s ({ok} ok, {failed} failed)")
+    if retried:
+        print(f"↻ {retried} failed attempts were retried")
+    if ocr_pages:
+        print(f"🔎 OCR'd {ocr_pages} pages, {ocr_seconds / ocr_pages:.2f}s per page on average")
+    print(f"📄 Results written to {args.output}")
+    if cohort is not None:
+        print(f"🗄️ {len(cohort)} students in cohort database {args.cohort_db}")
+        cohort.close()
+    if queue is not None:
+        counts = queue.counts()
+        print(f"🗂️ {counts['done']} transcripts done, {counts['quarantined']} quarantined in {args.queue}")
+        failed = counts['quarantined']
+        queue.close()
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
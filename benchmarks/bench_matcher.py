@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: transcript line matching before and after the precompiled matcher
+
+Runs the original per-line ``re.search`` parsers and the current
+``TranscriptParser`` over the same synthetic transcript, checks that their
+outputs are identical and reports lines/sec for each.
+
+    python benchmarks/bench_matcher.py --lines 20000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_parser import TranscriptParser
+
+SUBJECTS = ['ENGG', 'MECH', 'AMME', 'ELEC', 'CIVL', 'MATH', 'COMP', 'ENGP', 'CHNG', 'BMET']
+TITLES = ['Introduction to Engineering Computing', 'Fluid Mechanics', 'Thesis A',
+          'Linear Mathematics - Advanced', 'Professional Engagement', 'Design 3', 'Signals and Systems']
+GRADES = ['HD', 'D', 'CR', 'P', 'F', 'AF', 'DF', 'DC', 'W', 'SR']
+
+
+def synthetic_strict_lines(n, seed=0):
+    """Lines in the standard USYD format, with some non-unit noise lines."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n):
+        if i % 10 == 0:
+            lines.append(f"Page {i // 10 + 1} Academic Transcript The University of Sydney")
+            continue
+        code = f"{rng.choice(SUBJECTS)}{rng.randint(1, 4)}{rng.randint(0, 999):03d}"
+        lines.append(f"{rng.randint(2018, 2025)} S{rng.randint(1, 2)}C {code} {rng.choice(TITLES)} "
+                     f"{rng.randint(0, 100)}.0 {rng.choice(GRADES)} {rng.choice([0, 3, 6, 12])}")
+    return lines
+
+
+def synthetic_flexible_lines(n, seed=0):
+    """Loosely formatted lines that only the flexible parser can read."""
+    rng = random.Random(seed)
+    grades = GRADES + ['Credit', 'pass', 'High Distinction', 'hd']
+    lines = []
+    for i in range(n):
+        code = f"{rng.choice(SUBJECTS)}{rng.randint(1, 4)}{rng.randint(0, 999):03d}"
+        style = i % 4
+        if style == 0:
+            lines.append(f"{code} - {rng.choice(TITLES)} {rng.randint(0, 100)} {rng.choice(grades)} {rng.choice([3, 6, 12])}")
+        elif style == 1:
+            lines.append(f"{code} {rng.choice(TITLES)} {rng.choice(grades)}")
+        elif style == 2:
+            other = f"{rng.choice(SUBJECTS)}{rng.randint(1, 4)}{rng.randint(0, 999):03d}"
+            lines.append(f"{code} / {other} {rng.choice(TITLES)} {rng.randint(0, 99)}.5 {rng.choice(grades)} 6")
+        else:
+            lines.append(f"Completed {code} {rng.choice(TITLES)}")
+    return lines
+
+
+class LegacyParser(TranscriptParser):
+    """The parsers as they were before the precompiled matcher."""
+
+    def parse_units(self, text):
+        units = []
+        transcript_pattern = r'(\d{4})\s+([A-Z0-9]+)\s+([A-Z]{4}\d{4})\s+(.*?)\s+(\d+\.?\d*)\s+([A-Z]+)\s+(\d+)'
+        for line in text.split('\n'):
+            match = re.search(transcript_pattern, line)
+            if match:
+                unit_code = match.group(3)
+                credit_points = int(match.group(7))
+                if unit_code.startswith('ENGP'):
+                    credit_points = 0
+                units.append({
+                    'code': unit_code,
+                    'title': match.group(4).strip(),
+                    'credit_points': credit_points,
+                    'mark': int(float(match.group(5))),
+                    'grade': match.group(6),
+                    'level': self._determine_level(unit_code),
+                    'is_thesis': unit_code in self.thesis_codes,
+                    'included_in_eihwam': True,
+                    'exclusion_reason': None,
+                    'year': match.group(1),
+                    'session': match.group(2)
+                })
+        if not units:
+            units = self._parse_units_flexible(text)
+        return units
+
+    def _parse_units_flexible(self, text):
+        units = []
+        for line in text.split('\n'):
+            for match in re.finditer(r'\b([A-Z]{4}\d{4})\b', line):
+                unit_code = match.group(1)
+                cp_matches = re.findall(r'\b(6|12|3|0)\b', line)
+                credit_points = None
+                if cp_matches:
+                    credit_points = int(cp_matches[-1])
+                if unit_code.startswith('ENGP'):
+                    credit_points = 0
+                mark_match = re.search(r'\b(\d{1,2}\.\d|\d{1,2}|100)\b', line)
+                mark = None
+                if mark_match:
+                    potential_mark = float(mark_match.group(1))
+                    if 0 <= potential_mark <= 100:
+                        mark = int(potential_mark)
+                grade_patterns = [
+                    r'\b(HD|D|C|P|F|AF|DF|DC|CR|NC|W|AW|FW|SR|DI)\b',
+                    r'\b(High Distinction|Distinction|Credit|Pass|Fail)\b',
+                    r'\b(HD|D|C|P|F)\b'
+                ]
+                grade = None
+                for pattern in grade_patterns:
+                    grade_match = re.search(pattern, line, re.IGNORECASE)
+                    if grade_match:
+                        grade = grade_match.group(1).upper()
+                        break
+                title_end = len(line)
+                if grade_match:
+                    title_end = grade_match.start()
+                elif mark_match:
+                    title_end = mark_match.start()
+                title = line[match.end():title_end].strip()
+                title = re.sub(r'^\s*[-–]\s*', '', title)
+                if unit_code and (mark is not None or grade is not None):
+                    units.append({
+                        'code': unit_code,
+                        'title': title,
+                        'credit_points': credit_points,
+                        'mark': mark,
+                        'grade': grade,
+                        'level': self._determine_level(unit_code),
+                        'is_thesis': unit_code in self.thesis_codes,
+                        'included_in_eihwam': True,
+                        'exclusion_reason': None
+                    })
+        return units
+
+
+def _rate(func, text, line_count, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return line_count / best
+
+
+def _as_dicts(units):
+    return [dict(unit) for unit in units]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    arg_parser.add_argument('--lines', type=int, default=20000, help="Lines per synthetic transcript")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="Timing repeats (best is reported)")
+    args = arg_parser.parse_args()
+
+    legacy = LegacyParser()
+    current = TranscriptParser()
+
+    cases = [
+        ('strict (parse_units)', '\n'.join(synthetic_strict_lines(args.lines)),
+         legacy.parse_units, current.parse_units),
+        ('flexible (_parse_units_flexible)', '\n'.join(synthetic_flexible_lines(args.lines)),
+         legacy._parse_units_flexible, current._parse_units_flexible),
+    ]
+
+    print(f"🔍 Benchmarking line matching on {args.lines} synthetic lines")
+    for name, text, before, after in cases:
+        if _as_dicts(before(text)) != _as_dicts(after(text)):
+            print(f"❌ {name}: outputs differ")
+            return 1
+        before_rate = _rate(before, text, args.lines, args.repeat)
+        after_rate = _rate(after, text, args.lines, args.repeat)
+        print(f"   - {name}: {before_rate:,.0f} -> {after_rate:,.0f} lines/sec "
+              f"({after_rate / before_rate:.2f}x)")
+    print("✅ Outputs identical")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start time of the parser, the batch CLI and the Streamlit app
+
+Each target is imported in a fresh interpreter under ``python -X importtime``;
+the cumulative import time of the target module, the wall time of the whole
+interpreter and the heaviest dependencies pulled in are reported. Point
+``--tree`` at another checkout (e.g. ``git worktree add /tmp/before HEAD~1``)
+to compare before and after:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --tree /tmp/before
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# target name -> code run in the fresh interpreter
+TARGETS = {
+    'pdf_parser': "import pdf_parser; pdf_parser.TranscriptParser()",
+    'batch': "import batch",
+    'api_server': "import api_server",
+    # Streamlit runs app.py as a script; importing it in bare mode runs the same top-level code
+    'app': "import app",
+}
+
+HEAVY_MODULES = ('pdfplumber', 'pdfminer', 'pandas', 'numpy', 'PIL', 'streamlit')
+
+
+def _run(tree: str, code: str) -> tuple:
+    """Return (wall seconds, {module: cumulative microseconds}) for one cold start."""
+    env = dict(os.environ, PYTHONPATH=tree)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=tree, env=env,
+                               capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total, name = line.split('|')
+        # Indentation shows nesting; the first (outermost) import of a name is what we want
+        cumulative.setdefault(name.strip(), int(total))
+    return wall, cumulative
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    arg_parser.add_argument('--tree', default=REPO, help="Checkout to measure (default: this repository)")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="Cold starts per target")
+    arg_parser.add_argument('--targets', default=','.join(TARGETS), help="Comma-separated targets to measure")
+    args = arg_parser.parse_args()
+
+    print(f"🚀 Cold start in {args.tree} (median of {args.repeat})")
+    for target in args.targets.split(','):
+        try:
+            runs = [_run(args.tree, TARGETS[target]) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"   - {target:<11} failed: {e}")
+            continue
+        wall = statistics.median(run[0] for run in runs)
+        imported = statistics.median(run[1].get(target, 0) for run in runs) / 1e6
+        heavy = [name for name in HEAVY_MODULES if name in runs[0][1]]
+        print(f"   - {target:<11} import {imported * 1000:7.1f} ms   interpreter {wall * 1000:7.1f} ms   "
+              f"loads: {', '.join(heavy) or 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory per parsed unit for dicts, Unit records and UnitTable
+
+    python benchmarks/bench_unit_memory.py --units 200000
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_matcher import synthetic_strict_lines
+from pdf_parser import TranscriptParser
+from units import UnitTable
+
+
+def _measure(build):
+    """Return (result, bytes allocated while building it)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    arg_parser.add_argument('--units', type=int, default=200000, help="Number of units to hold in memory")
+    args = arg_parser.parse_args()
+
+    parser = TranscriptParser()
+    lines = [line for line in synthetic_strict_lines(args.units * 10 // 9 + 10) if not line.startswith('Page')]
+    lines = lines[:args.units]
+
+    def parse():
+        return parser.calculate_weights(parser.apply_eihwam_rules(parser.parse_units(lines)))
+
+    # Each representation is built from a fresh parse, so titles are counted every time
+    units, record_bytes = _measure(parse)
+    dicts, dict_bytes = _measure(lambda: [unit.to_dict() for unit in parse()])
+    table, table_bytes = _measure(lambda: UnitTable(parse()))
+
+    count = len(units)
+    print(f"🔍 Memory for {count} weighted units")
+    print(f"   - dict per unit:      {dict_bytes / count:7.1f} bytes")
+    print(f"   - Unit per unit:      {record_bytes / count:7.1f} bytes ({dict_bytes / record_bytes:.1f}x smaller)")
+    print(f"   - UnitTable per unit: {table_bytes / count:7.1f} bytes ({dict_bytes / table_bytes:.1f}x smaller)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the transcript parser and EIHWAM rules engine
+
+Times each pipeline stage on synthetic transcripts of several sizes and
+reports throughput and peak memory as JSON, so runs can be compared across
+commits:
+
+    python benchmarks/run_benchmarks.py -o bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_parser import TranscriptParser
+from synthetic_transcripts import generate_transcript, load_thesis_codes
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _time(func, setup, repeat):
+    """Best and mean wall time of ``func(setup())`` over ``repeat`` runs."""
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+
+def _peak_memory(func, setup):
+    """Peak bytes allocated by one ``func(setup())`` call."""
+    arg = setup()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def build_stages(parser, transcript, flexible_transcript, tabular_transcript, layout_parser):
+    """Return {stage: (func, setup, work units, work label)} for one transcript size."""
+    pdf = transcript.to_pdf()
+    tabular_pdf = tabular_transcript.to_pdf()
+    text = transcript.text
+    flexible_text = flexible_transcript.text
+    units = parser.parse_units(text)
+    ruled = parser.apply_eihwam_rules(copy.deepcopy(units))
+    weighted = parser.calculate_weights(copy.deepcopy(ruled))
+    line_count = len(transcript.lines)
+    page_count = len(transcript.pages)
+
+    return {
+        'extract_text_from_pdf': (parser.extract_text_from_pdf, lambda: pdf, page_count, 'pages'),
+        'parse_units': (parser.parse_units, lambda: text, line_count, 'lines'),
+        '_parse_units_flexible': (parser._parse_units_flexible, lambda: flexible_text,
+                                  len(flexible_transcript.lines), 'lines'),
+        'apply_eihwam_rules': (parser.apply_eihwam_rules, lambda: copy.deepcopy(units), len(units), 'units'),
+        'calculate_weights': (parser.calculate_weights, lambda: copy.deepcopy(ruled), len(units), 'units'),
+        'calculate_eihwam': (parser.calculate_eihwam, lambda: weighted, len(units), 'units'),
+        'parse_transcript': (parser.parse_transcript, lambda: pdf, page_count, 'pages'),
+        'iter_table_rows': (lambda data: list(parser.iter_table_rows(data)), lambda: tabular_pdf,
+                            len(tabular_transcript.pages), 'pages'),
+        'parse_transcript_layout': (layout_parser.parse_transcript, lambda: tabular_pdf,
+                                    len(tabular_transcript.pages), 'pages'),
+    }
+
+
+def run(page_counts, repeat, seed=0):
+    parser = TranscriptParser()
+    layout_parser = TranscriptParser(layout=True)
+    thesis_codes = load_thesis_codes()
+    results = []
+    for pages in page_counts:
+        transcript = generate_transcript(seed, pages, thesis_codes=thesis_codes)
+        flexible_transcript = generate_transcript(seed, pages, flexible=True, thesis_codes=thesis_codes)
+        tabular_transcript = generate_transcript(seed, pages, tabular=True, thesis_codes=thesis_codes)
+        stages = build_stages(parser, transcript, flexible_transcript, tabular_transcript, layout_parser)
+        for stage, (func, setup, work, label) in stages.items():
+            best, mean = _time(func, setup, repeat)
+            results.append({
+                'stage': stage,
+                'pages': pages,
+                'work': work,
+                'work_unit': label,
+                'best_seconds': round(best, 6),
+                'mean_seconds': round(mean, 6),
+                'throughput_per_second': round(work / best, 1) if best > 0 else None,
+                'peak_memory_bytes': _peak_memory(func, setup),
+            })
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(current, baseline):
+    """Print the throughput change of each stage against a baseline run."""
+    previous = {(row['stage'], row['pages']): row for row in baseline['results']}
+    print(f"📊 {current['commit']} vs {baseline.get('commit')} (throughput, higher is better)")
+    for row in current['results']:
+        before = previous.get((row['stage'], row['pages']))
+        if not before or not before['throughput_per_second'] or not row['throughput_per_second']:
+            continue
+        change = row['throughput_per_second'] / before['throughput_per_second'] - 1
+        print(f"   - {row['stage']:<24} {row['pages']:>3} pages: "
+              f"{before['throughput_per_second']:>12,.1f} -> {row['throughput_per_second']:>12,.1f} "
+              f"{row['work_unit']}/s ({change:+.1%})")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the transcript parser and rules engine.")
+    arg_parser.add_argument('--pages', default='1,5,20', help="Comma-separated transcript sizes in pages")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="Timing repeats per stage")
+    arg_parser.add_argument('-o', '--output', help="Write JSON results here (default: stdout)")
+    arg_parser.add_argument('--compare', help="Baseline JSON file to compare against")
+    args = arg_parser.parse_args()
+
+    report = run([int(pages) for pages in args.pages.split(',')], args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""
+Content-addressed cache for parsed transcript results
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from pdf_buffer import pdf_view
+from units import Unit
+
+
+def hash_pdf_bytes(data) -> str:
+    """Return the SHA-256 hex digest of a PDF's raw bytes (any bytes-like object or view)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _to_json(value):
+    """Serialise Unit records (and other dict-like values) for JSON."""
+    if isinstance(value, Unit):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class MemoryBackend:
+    """In-process LRU store. Nothing ever touches the disk."""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, stored_at: float, value: Dict):
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskBackend:
+    """On-disk store with one file per entry and LRU eviction by access time.
+
+    Entries are encrypted with Fernet when ``encryption_key`` is given (see
+    ``cryptography.fernet.Fernet.generate_key``). Without a key, results are
+    written as plain JSON, so only enable that where storing transcript data
+    unencrypted is acceptable.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 1024, encryption_key: Optional[bytes] = None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._fernet = None
+        if encryption_key is not None:
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError:
+                raise ImportError("Encrypted disk caching requires the 'cryptography' package")
+            self._fernet = Fernet(encryption_key)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ('.enc' if self._fernet else '.json'))
+
+    def get(self, key: str) -> Optional[tuple]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            if self._fernet is not None:
+                payload = self._fernet.decrypt(payload)
+            entry = json.loads(payload)
+        except Exception:
+            # Missing, corrupt or written with another key: treat as a miss
+            return None
+        # Refresh the access time so eviction is least-recently-used
+        os.utime(path, None)
+        value = entry['value']
+        if 'units' in value:
+            value['units'] = [Unit.from_dict(unit) for unit in value['units']]
+        return entry['stored_at'], value
+
+    def put(self, key: str, stored_at: float, value: Dict):
+        payload = json.dumps({'stored_at': stored_at, 'value': value}, default=_to_json).encode('utf-8')
+        if self._fernet is not None:
+            payload = self._fernet.encrypt(payload)
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = [
+                entry for entry in os.scandir(self.directory)
+                if entry.name.endswith(('.json', '.enc'))
+            ]
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(('.json', '.enc')):
+                os.remove(entry.path)
+
+    def __len__(self):
+        return sum(1 for entry in os.scandir(self.directory) if entry.name.endswith(('.json', '.enc')))
+
+
+class ResultCache:
+    """Cache ``parse_transcript`` results keyed by PDF hash and rules version.
+
+    The default backend is memory-only, in keeping with the app's promise
+    that transcripts are never written to disk. Pass a ``DiskBackend`` to
+    share results between processes or across restarts.
+    """
+
+    def __init__(self, backend=None, max_entries: int = 128, ttl: Optional[float] = 3600):
+        self.backend = backend if backend is not None else MemoryBackend(max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pdf_hash: str, rules_version: str) -> str:
+        """Combine the PDF content hash with the rules version."""
+        return hashlib.sha256(f"{pdf_hash}:{rules_version}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a copy of the cached result, or None if missing or expired."""
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, value = entry
+        if self.ttl is not None and time.time() - stored_at > self.ttl:
+            self.backend.delete(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Dict):
+        """Store a copy of ``value`` under ``key``."""
+        self.backend.put(key, time.time(), copy.deepcopy(value))
+
+    def parse_transcript(self, parser, pdf_file, **parse_kwargs) -> Dict:
+        """Return the cached result for ``pdf_file`` or parse and cache it.
+        
+        ``parse_kwargs`` (e.g. ``instrumentation``) are passed to
+        ``parser.parse_transcript`` on a miss.
+        """
+        # One zero-copy view of the upload serves both hashing and extraction
+        data = pdf_view(pdf_file)
+        key = self.make_key(hash_pdf_bytes(data), parser.rules_version)
+        result = self.get(key)
+        if result is None:
+            result = parser.parse_transcript(data, **parse_kwargs)
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        self.backend.clear()
+
+    def __len__(self):
+        return len(self.backend)
+
+
+class PageCache:
+    """Per-page cache of extracted text and matched unit rows.
+
+    A re-uploaded transcript is usually the previous one plus a page or two
+    of new results. Page text is cached by ``page_content_hash``, so an
+    unchanged page skips pdfplumber's text extraction, and each page's
+    strict unit rows are cached by its text, so it skips line matching
+    too. Only new or changed pages are extracted and matched; the rules
+    engine then runs over the merged rows as usual. A page whose printed
+    content changes at all (e.g. a "Page 1 of N" footer when N changes)
+    is a miss.
+
+    Everything is held in memory, like the default ``ResultCache`` backend,
+    and pages older than ``ttl`` seconds are treated as misses.
+    """
+
+    def __init__(self, max_pages: int = 4096, ttl: Optional[float] = None):
+        self.texts = MemoryBackend(max_pages)
+        self.rows = MemoryBackend(max_pages)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, backend: MemoryBackend, key: str):
+        entry = backend.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl is not None and time.time() - stored_at > self.ttl:
+            backend.delete(key)
+            return None
+        return value
+
+    def get_text(self, page_hash: str) -> Optional[str]:
+        """Return the cached text of the page with ``page_hash``, or None."""
+        text = self._get(self.texts, page_hash)
+        if text is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put_text(self, page_hash: str, text: str):
+        self.texts.put(page_hash, time.time(), text)
+
+    @staticmethod
+    def _rows_key(page_text: str) -> str:
+        return hashlib.sha256(page_text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def get_rows(self, page_text: str) -> Optional[Tuple[tuple, ...]]:
+        """Return the strict unit rows matched on ``page_text``, or None if not cached."""
+        return self._get(self.rows, self._rows_key(page_text))
+
+    def put_rows(self, page_text: str, rows: Tuple[tuple, ...]):
+        self.rows.put(self._rows_key(page_text), time.time(), rows)
+
+    def clear(self):
+        self.texts.clear()
+        self.rows.clear()
+
+    def __len__(self):
+        return len(self.texts)
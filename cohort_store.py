@@ -0,0 +1,341 @@
+"""
+SQLite store of parsed cohort results with indexed queries and running aggregates
+"""
+
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Columns of the per-unit table, in insert order
+UNIT_COLUMNS = ('code', 'title', 'level', 'credit_points', 'mark', 'grade', 'is_thesis', 'included',
+                'exclusion_reason', 'weight', 'wam_weight', 'year', 'session')
+
+# Student columns that queries may group or filter by
+GROUP_COLUMNS = ('major', 'honours_class', 'rule_set')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    student_id TEXT NOT NULL DEFAULT '',
+    rule_set TEXT NOT NULL DEFAULT '',
+    major TEXT,
+    eihwam REAL,
+    wam REAL,
+    honours_class TEXT,
+    total_units INTEGER,
+    included_units INTEGER,
+    excluded_units INTEGER,
+    ingested_at REAL,
+    UNIQUE (source, student_id, rule_set)
+);
+CREATE INDEX IF NOT EXISTS students_eihwam ON students (eihwam);
+CREATE INDEX IF NOT EXISTS students_honours_class ON students (honours_class, eihwam);
+CREATE INDEX IF NOT EXISTS students_major ON students (major, eihwam);
+
+CREATE TABLE IF NOT EXISTS units (
+    student INTEGER NOT NULL REFERENCES students (id),
+    code TEXT NOT NULL,
+    title TEXT,
+    level INTEGER,
+    credit_points INTEGER,
+    mark INTEGER,
+    grade TEXT,
+    is_thesis INTEGER,
+    included INTEGER,
+    exclusion_reason TEXT,
+    weight REAL,
+    wam_weight REAL,
+    year TEXT,
+    session TEXT
+);
+CREATE INDEX IF NOT EXISTS units_student ON units (student);
+CREATE INDEX IF NOT EXISTS units_code ON units (code);
+CREATE INDEX IF NOT EXISTS units_level ON units (level);
+CREATE INDEX IF NOT EXISTS units_grade ON units (grade);
+
+-- Running aggregates, kept up to date by the triggers below as rows come and go
+CREATE TABLE IF NOT EXISTS unit_stats (
+    code TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    exclusions INTEGER NOT NULL,
+    marks INTEGER NOT NULL,
+    mark_sum REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exclusion_stats (
+    code TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (code, reason)
+);
+CREATE TABLE IF NOT EXISTS honours_stats (
+    honours_class TEXT PRIMARY KEY,
+    students INTEGER NOT NULL,
+    eihwam_sum REAL NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS units_insert AFTER INSERT ON units BEGIN
+    INSERT INTO unit_stats (code, attempts, exclusions, marks, mark_sum)
+    VALUES (NEW.code, 1, NOT NEW.included, NEW.mark IS NOT NULL, COALESCE(NEW.mark, 0))
+    ON CONFLICT (code) DO UPDATE SET
+        attempts = attempts + 1,
+        exclusions = exclusions + (NOT NEW.included),
+        marks = marks + (NEW.mark IS NOT NULL),
+        mark_sum = mark_sum + COALESCE(NEW.mark, 0);
+END;
+CREATE TRIGGER IF NOT EXISTS units_delete AFTER DELETE ON units BEGIN
+    UPDATE unit_stats SET
+        attempts = attempts - 1,
+        exclusions = exclusions - (NOT OLD.included),
+        marks = marks - (OLD.mark IS NOT NULL),
+        mark_sum = mark_sum - COALESCE(OLD.mark, 0)
+    WHERE code = OLD.code;
+END;
+CREATE TRIGGER IF NOT EXISTS units_insert_excluded AFTER INSERT ON units WHEN NOT NEW.included BEGIN
+    INSERT INTO exclusion_stats (code, reason, count)
+    VALUES (NEW.code, COALESCE(NEW.exclusion_reason, ''), 1)
+    ON CONFLICT (code, reason) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS units_delete_excluded AFTER DELETE ON units WHEN NOT OLD.included BEGIN
+    UPDATE exclusion_stats SET count = count - 1
+    WHERE code = OLD.code AND reason = COALESCE(OLD.exclusion_reason, '');
+END;
+CREATE TRIGGER IF NOT EXISTS students_insert AFTER INSERT ON students BEGIN
+    INSERT INTO honours_stats (honours_class, students, eihwam_sum)
+    VALUES (NEW.honours_class, 1, COALESCE(NEW.eihwam, 0))
+    ON CONFLICT (honours_class) DO UPDATE SET
+        students = students + 1,
+        eihwam_sum = eihwam_sum + COALESCE(NEW.eihwam, 0);
+END;
+CREATE TRIGGER IF NOT EXISTS students_delete AFTER DELETE ON students BEGIN
+    UPDATE honours_stats SET
+        students = students - 1,
+        eihwam_sum = eihwam_sum - COALESCE(OLD.eihwam, 0)
+    WHERE honours_class = OLD.honours_class;
+END;
+"""
+
+
+class CohortStore:
+    """Persistent store of per-student summaries and unit rows from ``TranscriptParser``.
+
+    Students are keyed by (source, student ID, rule set), so re-ingesting a
+    transcript replaces its earlier rows. Unit rows are indexed on code,
+    level and grade; students on EIHWAM, honours class and major. Per-unit
+    attempt/exclusion counts, exclusion reasons and honours-class counts are
+    kept in aggregate tables that SQLite triggers update on every insert and
+    delete, so they never need a full rescan.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def ingest(self, source: str, result: Dict, student_id: Optional[str] = None,
+               major: Optional[str] = None, rule_set: Optional[str] = None) -> int:
+        """Store one ``parse_transcript`` result, replacing any earlier copy; returns its row id."""
+        return self._ingest(source, result, result['units'], student_id or result.get('student_id'),
+                            major, rule_set or result.get('rule_set'))
+
+    def ingest_row(self, row: Dict, units: Iterable, major: Optional[str] = None) -> int:
+        """Store a ``batch.py`` summary row and the unit dicts it was built from."""
+        return self._ingest(row['file'], row, units, row.get('student_id'), major, row.get('rule_set'))
+
+    def _ingest(self, source: str, summary: Dict, units: Iterable, student_id: Optional[str],
+                major: Optional[str], rule_set: Optional[str]) -> int:
+        key = (source, student_id or '', rule_set or '')
+        with self.connection:
+            self._delete(key)
+            cursor = self.connection.execute(
+                "INSERT INTO students (source, student_id, rule_set, major, eihwam, wam, honours_class, "
+                "total_units, included_units, excluded_units, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (major, summary['eihwam'], summary['wam'], summary['honours_class'], summary['total_units'],
+                       summary['included_units'], summary['excluded_units'], time.time())
+            )
+            student = cursor.lastrowid
+            self.connection.executemany(
+                f"INSERT INTO units (student, {', '.join(UNIT_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(UNIT_COLUMNS))})",
+                (
+                    (student, unit['code'], unit['title'], unit['level'], unit['credit_points'], unit['mark'],
+                     unit['grade'], bool(unit['is_thesis']), bool(unit['included_in_eihwam']),
+                     unit['exclusion_reason'], unit.get('weight'), unit.get('wam_weight'),
+                     unit.get('year'), unit.get('session'))
+                    for unit in units
+                )
+            )
+        return student
+
+    def _delete(self, key: Tuple[str, str, str]):
+        row = self.connection.execute(
+            "SELECT id FROM students WHERE source = ? AND student_id = ? AND rule_set = ?", key
+        ).fetchone()
+        if row is not None:
+            # Units first, so their triggers take them out of the aggregates
+            self.connection.execute("DELETE FROM units WHERE student = ?", (row['id'],))
+            self.connection.execute("DELETE FROM students WHERE id = ?", (row['id'],))
+
+    def remove(self, source: str, student_id: Optional[str] = None, rule_set: Optional[str] = None):
+        """Remove a stored transcript and its units."""
+        with self.connection:
+            self._delete((source, student_id or '', rule_set or ''))
+
+    def set_major(self, source: str, major: Optional[str], student_id: Optional[str] = None):
+        """Record the major of an already-ingested student (every rule set)."""
+        with self.connection:
+            self.connection.execute("UPDATE students SET major = ? WHERE source = ? AND student_id = ?",
+                                    (major, source, student_id or ''))
+
+    # Queries
+
+    def _rows(self, sql: str, params: Sequence = ()) -> List[Dict]:
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    @staticmethod
+    def _group_column(by: Optional[str]) -> str:
+        if by is None:
+            return "'all'"
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"Can't group by {by!r}; choose from {', '.join(GROUP_COLUMNS)}")
+        return by
+
+    def students(self, honours_class: Optional[str] = None, major: Optional[str] = None,
+                 min_eihwam: Optional[float] = None, max_eihwam: Optional[float] = None,
+                 rule_set: Optional[str] = None) -> List[Dict]:
+        """Student summaries matching every filter given, highest EIHWAM first."""
+        clauses, params = [], []
+        for column, value in (('honours_class', honours_class), ('major', major), ('rule_set', rule_set)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if min_eihwam is not None:
+            clauses.append("eihwam >= ?")
+            params.append(min_eihwam)
+        if max_eihwam is not None:
+            clauses.append("eihwam <= ?")
+            params.append(max_eihwam)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._rows(f"SELECT * FROM students {where} ORDER BY eihwam DESC", params)
+
+    def units(self, code: Optional[str] = None, level: Optional[int] = None, grade: Optional[str] = None,
+              included: Optional[bool] = None) -> List[Dict]:
+        """Unit rows (with their student's source and ID) matching every filter given."""
+        clauses, params = [], []
+        for column, value in (('code', code), ('level', level), ('grade', grade)):
+            if value is not None:
+                clauses.append(f"units.{column} = ?")
+                params.append(value)
+        if included is not None:
+            clauses.append("units.included = ?")
+            params.append(included)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self._rows(
+            f"SELECT students.source, students.student_id, units.* FROM units "
+            f"JOIN students ON students.id = units.student {where}", params
+        )
+
+    def eihwam_summary(self, by: Optional[str] = 'major') -> Dict[Optional[str], Dict]:
+        """Count, mean, min and max EIHWAM per group (``major``, ``honours_class``, ``rule_set`` or None)."""
+        column = self._group_column(by)
+        return {
+            row['grp']: {'students': row['students'], 'mean': round(row['mean'], 2),
+                         'min': row['min'], 'max': row['max']}
+            for row in self.connection.execute(
+                f"SELECT {column} AS grp, COUNT(*) AS students, AVG(eihwam) AS mean, MIN(eihwam) AS min, "
+                f"MAX(eihwam) AS max FROM students GROUP BY grp ORDER BY grp"
+            )
+        }
+
+    def eihwam_distribution(self, by: Optional[str] = 'major', bin_width: float = 5.0) -> Dict[Optional[str], Dict[float, int]]:
+        """Histogram of EIHWAM per group: {group: {bin start: students}}."""
+        column = self._group_column(by)
+        distribution: Dict[Optional[str], Dict[float, int]] = {}
+        for row in self.connection.execute(
+            f"SELECT {column} AS grp, CAST(eihwam / ? AS INTEGER) * ? AS bin, COUNT(*) AS students "
+            f"FROM students WHERE eihwam IS NOT NULL GROUP BY grp, bin ORDER BY grp, bin",
+            (bin_width, bin_width)
+        ):
+            distribution.setdefault(row['grp'], {})[row['bin']] = row['students']
+        return distribution
+
+    def near_boundary(self, within: float = 1.0,
+                      thresholds: Optional[Sequence[Tuple[float, str]]] = None) -> List[Dict]:
+        """Students within ``within`` marks of an honours class boundary.
+
+        ``thresholds`` are (minimum EIHWAM, class) pairs and default to those
+        in eihwam_rules.json. Each row gains the ``boundary`` it is near, the
+        class at that boundary and ``gap`` (EIHWAM minus boundary; negative
+        means just short).
+        """
+        if thresholds is None:
+            from rules import load_rule_index
+            thresholds = load_rule_index().honours_thresholds
+        rows = []
+        for threshold, honours_class in thresholds:
+            for row in self._rows("SELECT * FROM students WHERE eihwam BETWEEN ? AND ? ORDER BY eihwam",
+                                  (threshold - within, threshold + within)):
+                row.update(boundary=threshold, boundary_class=honours_class,
+                           gap=round(row['eihwam'] - threshold, 2))
+                rows.append(row)
+        rows.sort(key=lambda row: abs(row['gap']))
+        return rows
+
+    def honours_counts(self) -> Dict[str, Dict]:
+        """Students and mean EIHWAM per honours class (precomputed)."""
+        return {
+            row['honours_class']: {'students': row['students'],
+                                   'mean_eihwam': round(row['eihwam_sum'] / row['students'], 2)}
+            for row in self.connection.execute(
+                "SELECT * FROM honours_stats WHERE students > 0 ORDER BY eihwam_sum / students DESC"
+            )
+        }
+
+    def most_excluded_units(self, limit: int = 10) -> List[Dict]:
+        """Units most often excluded from EIHWAM, with the reasons (precomputed)."""
+        rows = self._rows(
+            "SELECT code, attempts, exclusions FROM unit_stats WHERE exclusions > 0 "
+            "ORDER BY exclusions DESC, code LIMIT ?", (limit,)
+        )
+        for row in rows:
+            row['reasons'] = {
+                reason['reason']: reason['count'] for reason in self.connection.execute(
+                    "SELECT reason, count FROM exclusion_stats WHERE code = ? AND count > 0 ORDER BY count DESC",
+                    (row['code'],)
+                )
+            }
+        return rows
+
+    def exclusion_reasons(self) -> Dict[str, int]:
+        """How many unit attempts were excluded for each reason (precomputed)."""
+        return {
+            row['reason']: row['total'] for row in self.connection.execute(
+                "SELECT reason, SUM(count) AS total FROM exclusion_stats GROUP BY reason "
+                "HAVING total > 0 ORDER BY total DESC"
+            )
+        }
+
+    def unit_stats(self, code: str) -> Optional[Dict]:
+        """Attempts, exclusions and mean mark of one unit (precomputed)."""
+        row = self.connection.execute("SELECT * FROM unit_stats WHERE code = ? AND attempts > 0",
+                                      (code,)).fetchone()
+        if row is None:
+            return None
+        stats = dict(row)
+        stats['mean_mark'] = round(stats['mark_sum'] / stats['marks'], 2) if stats['marks'] else None
+        return stats
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,48 @@
+"""
+Shared pytest fixtures: synthetic transcripts and their baseline parse results
+"""
+
+import os
+
+import pytest
+
+from pdf_parser import TranscriptParser
+from synthetic_transcripts import generate_transcript
+
+
+@pytest.fixture(scope='session')
+def parser():
+    """A default parser, as every front end uses it."""
+    return TranscriptParser()
+
+
+@pytest.fixture(scope='session')
+def transcript():
+    return generate_transcript(seed=1, pages=2)
+
+
+@pytest.fixture(scope='session')
+def transcript_pdf(transcript):
+    return transcript.to_pdf()
+
+
+@pytest.fixture(scope='session')
+def baseline(parser, transcript_pdf):
+    """``parse_transcript`` output for ``transcript_pdf``, the result every other path must match."""
+    return parser.parse_transcript(transcript_pdf)
+
+
+@pytest.fixture(scope='session')
+def pdf_dir(tmp_path_factory):
+    """A directory of three synthetic transcripts, ``transcript-<seed>.pdf``."""
+    directory = tmp_path_factory.mktemp('transcripts')
+    for seed in (1, 2, 3):
+        with open(os.path.join(directory, f"transcript-{seed}.pdf"), 'wb') as f:
+            f.write(generate_transcript(seed=seed, pages=2).to_pdf())
+    return str(directory)
+
+
+def scores(result):
+    """The fields every scoring path must agree on."""
+    return {key: result[key] for key in
+            ('eihwam', 'wam', 'honours_class', 'total_units', 'included_units', 'excluded_units')}
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Differential testing of the unit parsers over a corpus of transcript texts
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pdf_parser import TranscriptParser
+from synthetic_transcripts import generate_transcript, load_thesis_codes
+from text_store import TranscriptTextStore
+
+# Built-in engines: (parser, lines) -> units. More are given as "name=module:function".
+ENGINES: Dict[str, Callable] = {
+    'parse_units': lambda parser, lines: parser.parse_units(lines),
+    'parse_units_flexible': lambda parser, lines: parser._parse_units_flexible(lines),
+}
+
+# Unit fields compared between engines. Year and session are left out: only
+# the strict pattern reads them, so they would differ on every line.
+COMPARED_FIELDS = ('code', 'title', 'credit_points', 'mark', 'grade')
+
+# Result fields compared after the rules engine has run on each engine's units
+RESULT_FIELDS = ('eihwam', 'wam', 'honours_class')
+
+SYNTHETIC_VARIANTS = ('standard', 'flexible', 'tabular')
+
+# A corpus item: ('synthetic', seed, variant), ('file', path) or ('store', pdf hash)
+Item = Tuple
+
+# Per-process state, created by _init_worker
+_worker_parser = None
+_worker_engines: Dict[str, Callable] = {}
+_worker_store = None
+_worker_thesis_codes = None
+_worker_pages = 2
+
+
+def resolve_engines(specs: Sequence[str]) -> Dict[str, Callable]:
+    """Map engine specs to callables, in order.
+
+    A spec is a built-in engine name, or ``name=module:function`` for an
+    engine under development; it is called as ``function(parser, lines)``
+    and must return units shaped like ``parse_units`` output.
+    """
+    engines = {}
+    for spec in specs:
+        name, _, target = spec.partition('=')
+        if not target:
+            if name not in ENGINES:
+                raise ValueError(f"Unknown engine {name!r}; built-in engines are {', '.join(ENGINES)}")
+            engines[name] = ENGINES[name]
+            continue
+        module_name, _, function_name = target.partition(':')
+        if not function_name:
+            raise ValueError(f"Engine {spec!r} must be given as name=module:function")
+        engines[name] = getattr(importlib.import_module(module_name), function_name)
+    return engines
+
+
+def _init_worker(engine_specs: Sequence[str], text_store_dir: Optional[str] = None, pages: int = 2):
+    """Create the per-process parser, engines and text store once per worker."""
+    global _worker_parser, _worker_engines, _worker_store, _worker_thesis_codes, _worker_pages
+    _worker_parser = TranscriptParser()
+    _worker_engines = resolve_engines(engine_specs)
+    _worker_store = TranscriptTextStore(text_store_dir) if text_store_dir else None
+    _worker_thesis_codes = load_thesis_codes()
+    _worker_pages = pages
+
+
+def _load_item(item: Item) -> Tuple[str, List[str]]:
+    """Return (name, lines) for a corpus item."""
+    kind = item[0]
+    if kind == 'synthetic':
+        _, seed, variant = item
+        transcript = generate_transcript(seed, _worker_pages, flexible=variant == 'flexible',
+                                         thesis_codes=_worker_thesis_codes, tabular=variant == 'tabular')
+        return f"synthetic:{variant}:{seed}", transcript.lines
+    if kind == 'file':
+        with open(item[1], encoding='utf-8') as f:
+            return item[1], f.read().split('\n')
+    lines = _worker_store.get(item[1])
+    if lines is None:
+        raise KeyError(f"Transcript {item[1]} is not in the text store")
+    return _worker_store.source(item[1]) or item[1], lines
+
+
+def _unit_mismatches(reference: List[Dict], units: List[Dict]) -> List[Dict]:
+    """Differences between two engines' units.
+
+    Units are aligned by code sequence, so one unit found by only one
+    engine shows up as a single ``missing`` or ``extra`` unit rather than
+    shifting every unit after it. Aligned units are compared field by field.
+    """
+    matcher = SequenceMatcher(None, [unit['code'] for unit in reference], [unit['code'] for unit in units],
+                              autojunk=False)
+    mismatches = []
+    for tag, ref_start, ref_stop, start, stop in matcher.get_opcodes():
+        if tag == 'equal':
+            for index, expected, actual in zip(range(ref_start, ref_stop), reference[ref_start:ref_stop],
+                                               units[start:stop]):
+                mismatches.extend({'field': field, 'index': index,
+                                   'reference': expected[field], 'value': actual[field]}
+                                  for field in COMPARED_FIELDS if expected[field] != actual[field])
+            continue
+        mismatches.extend({'field': 'missing', 'index': index, 'reference': reference[index]['code'],
+                           'value': None} for index in range(ref_start, ref_stop))
+        mismatches.extend({'field': 'extra', 'index': None, 'reference': None, 'value': units[index]['code']}
+                          for index in range(start, stop))
+    return mismatches
+
+
+def _diff_item(item: Item) -> Dict:
+    """Run every engine over one transcript and compare each with the first."""
+    try:
+        name, lines = _load_item(item)
+    except Exception as e:
+        return {'item': str(item[-1]), 'lines': 0, 'engines': {}, 'mismatches': [],
+                'error': f"{type(e).__name__}: {e}"}
+
+    outcomes = {}
+    for engine, parse in _worker_engines.items():
+        start = time.perf_counter()
+        try:
+            units = list(parse(_worker_parser, lines))
+        except Exception as e:
+            outcomes[engine] = {'seconds': time.perf_counter() - start, 'units': None,
+                                'error': f"{type(e).__name__}: {e}"}
+            continue
+        seconds = time.perf_counter() - start
+        # Compared before the rules engine adds weights and exclusions
+        unit_fields = [{field: unit.get(field) for field in COMPARED_FIELDS} for unit in units]
+        result = _worker_parser.evaluate_units(units)
+        outcomes[engine] = {'seconds': seconds, 'units': unit_fields, 'error': None,
+                            **{field: result[field] for field in RESULT_FIELDS}}
+
+    reference = next(iter(outcomes.values()))
+    mismatches = []
+    for engine, outcome in list(outcomes.items())[1:]:
+        if reference['error'] or outcome['error']:
+            if reference['error'] != outcome['error']:
+                found = [{'field': 'error', 'index': None, 'reference': reference['error'],
+                          'value': outcome['error']}]
+            else:
+                found = []
+        else:
+            found = _unit_mismatches(reference['units'], outcome['units'])
+            found.extend({'field': field, 'index': None, 'reference': reference[field], 'value': outcome[field]}
+                         for field in RESULT_FIELDS if reference[field] != outcome[field])
+        mismatches.extend(dict(mismatch, engine=engine) for mismatch in found)
+
+    return {
+        'item': name,
+        'lines': len(lines),
+        'engines': {engine: {'seconds': outcome['seconds'],
+                             'units': len(outcome['units']) if outcome['units'] is not None else 0,
+                             'error': outcome['error']}
+                    for engine, outcome in outcomes.items()},
+        'mismatches': mismatches,
+        'error': None,
+    }
+
+
+def build_corpus(synthetic: int = 0, seed: int = 0, variants: Sequence[str] = SYNTHETIC_VARIANTS,
+                 text_dirs: Sequence[str] = (), text_store_dir: Optional[str] = None) -> List[Item]:
+    """List the corpus items: synthetic transcripts, .txt files and text store entries."""
+    items: List[Item] = [('synthetic', seed + index, variant)
+                         for index in range(synthetic) for variant in variants]
+    for directory in text_dirs:
+        for root, _, files in os.walk(directory):
+            items.extend(('file', os.path.join(root, name)) for name in sorted(files) if name.endswith('.txt'))
+    if text_store_dir:
+        store = TranscriptTextStore(text_store_dir)
+        try:
+            items.extend(('store', pdf_hash) for pdf_hash in store.hashes())
+        finally:
+            store.close()
+    return items
+
+
+def run_corpus(items: Sequence[Item], engine_specs: Sequence[str], workers: Optional[int] = None,
+               text_store_dir: Optional[str] = None, pages: int = 2, chunk_size: int = 20) -> Iterator[Dict]:
+    """Yield one diff per corpus item, in corpus order, on a process pool.
+
+    With ``workers=1`` everything runs in this process, which is easier
+    to debug an engine in.
+    """
+    initargs = (list(engine_specs), text_store_dir, pages)
+    if workers == 1:
+        _init_worker(*initargs)
+        yield from map(_diff_item, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        yield from pool.map(_diff_item, items, chunksize=chunk_size)
+
+
+def summarise(diffs: Iterable[Dict], engine_names: Sequence[str], examples: int = 5) -> Dict:
+    """Fold per-item diffs into per-engine throughput and mismatch counts."""
+    engines = {name: {'seconds': 0.0, 'lines': 0, 'units': 0, 'errors': 0,
+                      'mismatched_items': 0, 'mismatches': {}, 'examples': {}}
+               for name in engine_names}
+    items = lines = 0
+    load_errors = []
+    for diff in diffs:
+        items += 1
+        if diff['error']:
+            load_errors.append({'item': diff['item'], 'error': diff['error']})
+            continue
+        lines += diff['lines']
+        for name, outcome in diff['engines'].items():
+            totals = engines[name]
+            if outcome['error'] is not None:
+                # Failed runs would skew throughput
+                totals['errors'] += 1
+                continue
+            totals['seconds'] += outcome['seconds']
+            totals['lines'] += diff['lines']
+            totals['units'] += outcome['units']
+        for name in {mismatch['engine'] for mismatch in diff['mismatches']}:
+            engines[name]['mismatched_items'] += 1
+        for mismatch in diff['mismatches']:
+            totals = engines[mismatch['engine']]
+            field = mismatch['field']
+            totals['mismatches'][field] = totals['mismatches'].get(field, 0) + 1
+            kept = totals['examples'].setdefault(field, [])
+            if len(kept) < examples:
+                kept.append({'item': diff['item'], 'index': mismatch['index'],
+                             'reference': mismatch['reference'], 'value': mismatch['value']})
+
+    for totals in engines.values():
+        seconds = totals['seconds']
+        totals['lines_per_second'] = round(totals['lines'] / seconds, 1) if seconds > 0 else None
+        totals['units_per_second'] = round(totals['units'] / seconds, 1) if seconds > 0 else None
+        totals['seconds'] = round(seconds, 6)
+    return {
+        'reference': engine_names[0],
+        'items': items,
+        'lines': lines,
+        'load_errors': load_errors,
+        'engines': engines,
+    }
+
+
+def print_summary(report: Dict):
+    print(f"🔍 {report['items']} transcripts, {report['lines']:,} lines; reference: {report['reference']}")
+    for name, totals in report['engines'].items():
+        rate = f"{totals['lines_per_second']:,.0f} lines/sec" if totals['lines_per_second'] else "n/a"
+        print(f"   - {name}: {rate}, {totals['units']:,} units, {totals['errors']} errors")
+        if name == report['reference']:
+            continue
+        if not totals['mismatches']:
+            print("     ✅ matches the reference")
+            continue
+        print(f"     ❌ differs on {totals['mismatched_items']} transcripts:")
+        for field, count in sorted(totals['mismatches'].items(), key=lambda entry: -entry[1]):
+            example = totals['examples'][field][0]
+            print(f"        {field}: {count:,} (e.g. {example['item']}"
+                  f"{'' if example['index'] is None else ' unit ' + str(example['index'])}: "
+                  f"{example['reference']!r} -> {example['value']!r})")
+    for failure in report['load_errors'][:5]:
+        print(f"   ⚠️  Could not read {failure['item']}: {failure['error']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(
+        description="Run the unit parsers over a transcript corpus and report where they disagree.")
+    arg_parser.add_argument('--engines', default=','.join(ENGINES),
+                            help="Comma-separated engines to run; the first is the reference. Built-in: "
+                                 f"{', '.join(ENGINES)}; add others as name=module:function")
+    arg_parser.add_argument('--synthetic', type=int, default=1000,
+                            help="Synthetic transcripts per variant (default: 1000)")
+    arg_parser.add_argument('--variants', default=','.join(SYNTHETIC_VARIANTS),
+                            help="Synthetic transcript formats: standard, flexible, tabular")
+    arg_parser.add_argument('--pages', type=int, default=2, help="Pages per synthetic transcript")
+    arg_parser.add_argument('--seed', type=int, default=0, help="Seed of the first synthetic transcript")
+    arg_parser.add_argument('--texts', action='append', default=[],
+                            help="Directory of anonymised transcript texts (*.txt); may be repeated")
+    arg_parser.add_argument('--text-store', help="Also diff every transcript in this text store")
+    arg_parser.add_argument('-w', '--workers', type=int, help="Worker processes (default: CPU count)")
+    arg_parser.add_argument('--examples', type=int, default=5, help="Examples kept per mismatch kind")
+    arg_parser.add_argument('-o', '--output', help="Write the JSON report here")
+    arg_parser.add_argument('--check', action='store_true',
+                            help="Exit with status 1 if any engine disagrees with the reference")
+    args = arg_parser.parse_args(argv)
+
+    engine_specs = [spec.strip() for spec in args.engines.split(',') if spec.strip()]
+    variants = [variant.strip() for variant in args.variants.split(',') if variant.strip()]
+    unknown = set(variants) - set(SYNTHETIC_VARIANTS)
+    if unknown:
+        arg_parser.error(f"unknown synthetic variants: {', '.join(sorted(unknown))}")
+    try:
+        engine_names = list(resolve_engines(engine_specs))
+    except (ValueError, ImportError, AttributeError) as e:
+        arg_parser.error(str(e))
+
+    items = build_corpus(args.synthetic, args.seed, variants, args.texts, args.text_store)
+    if not items:
+        print("❌ The corpus is empty")
+        return 1
+
+    start = time.perf_counter()
+    report = summarise(run_corpus(items, engine_specs, args.workers, args.text_store, args.pages),
+                       engine_names, args.examples)
+    report['elapsed'] = round(time.perf_counter() - start, 2)
+    print_summary(report)
+    print(f"⏱️  {report['elapsed']}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.check and any(totals['mismatches'] for totals in report['engines'].values()):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Durable SQLite job queue for resumable transcript ingestion
+"""
+
+import json
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Job statuses; a job that failed but will be retried is pending again
+STATUSES = ('pending', 'running', 'done', 'quarantined')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    -- The job's final summary row (JSON), once it is done or quarantined
+    result TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, next_attempt, id);
+"""
+
+
+class IngestQueue:
+    """Per-file ingest status that survives crashes and restarts.
+
+    Files are added once and claimed in batches in the order they were
+    added. A failed file goes back to pending with exponential backoff
+    (``backoff`` seconds, doubling up to ``max_backoff``), and after
+    ``max_attempts`` failures it is quarantined and not tried again until
+    ``requeue``. Files still marked running when the queue is opened were
+    interrupted by a crash or restart; they are made pending again without
+    counting an attempt, so the next run resumes exactly where the last
+    one stopped. One runner should use a queue at a time.
+    """
+
+    def __init__(self, path: str = ':memory:', max_attempts: int = 3, backoff: float = 5.0,
+                 max_backoff: float = 300.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            # Commits (one per finished file) skip the fsync; WAL still survives a process crash
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        # Files that were mid-parse when the previous run stopped
+        self.recovered = self._release("status = 'running'")
+
+    def _release(self, where: str, params: Iterable = ()) -> int:
+        """Make matching running jobs pending again without counting an attempt."""
+        with self.connection:
+            return self.connection.execute(
+                f"UPDATE jobs SET status = 'pending', updated_at = ? WHERE {where}", (time.time(), *params)
+            ).rowcount
+
+    def add(self, paths: Iterable[str]) -> int:
+        """Queue ``paths``; files already in the queue (in any status) are left as they are.
+
+        Returns the number of files newly added.
+        """
+        now = time.time()
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO jobs (path, updated_at) VALUES (?, ?)", ((path, now) for path in paths)
+            )
+            return self.connection.total_changes - before
+
+    def claim(self, limit: int) -> List[str]:
+        """Mark up to ``limit`` pending files whose retry time has come as running and return them."""
+        now = time.time()
+        with self.connection:
+            rows = self.connection.execute(
+                "SELECT id, path FROM jobs WHERE status = 'pending' AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", ((now, row['id']) for row in rows)
+            )
+        return [row['path'] for row in rows]
+
+    def drain(self, batch_size: int = 32) -> Iterator[str]:
+        """Yield ready files, claiming ``batch_size`` at a time, until none are ready.
+
+        Claims are made lazily, so files whose backoff expires during a
+        long run are picked up by it. Files claimed but never yielded (the
+        consumer stopped early) are released.
+        """
+        batch: List[str] = []
+        try:
+            while True:
+                batch = self.claim(batch_size)
+                if not batch:
+                    return
+                while batch:
+                    yield batch[0]
+                    batch.pop(0)
+        finally:
+            # The file being yielded when the consumer stopped was taken, so it is not released
+            unstarted = batch[1:]
+            if unstarted:
+                placeholders = ', '.join('?' * len(unstarted))
+                self._release(f"status = 'running' AND path IN ({placeholders})", unstarted)
+
+    def record(self, row: Dict) -> str:
+        """Record a ``BatchProcessor`` summary row for its file and return the file's new status.
+
+        An ``ok`` row finishes the file (``done``). Any other row counts a
+        failed attempt: the file is pending again after its backoff, or
+        ``quarantined`` once it has failed ``max_attempts`` times.
+        """
+        path = row['file']
+        now = time.time()
+        stored = {key: value for key, value in row.items() if key != 'units'}
+        with self.connection:
+            if row['status'] == 'ok':
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'done', attempts = attempts + 1, error = NULL, result = ?, "
+                    "updated_at = ? WHERE path = ?", (json.dumps(stored), now, path)
+                )
+                return 'done'
+            (attempts,) = self.connection.execute("SELECT attempts FROM jobs WHERE path = ?", (path,)).fetchone()
+            attempts += 1
+            if attempts >= self.max_attempts:
+                stored.update(status='quarantined', attempts=attempts)
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'quarantined', attempts = ?, error = ?, result = ?, updated_at = ? "
+                    "WHERE path = ?", (attempts, row.get('error'), json.dumps(stored), now, path)
+                )
+                return 'quarantined'
+            delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+            self.connection.execute(
+                "UPDATE jobs SET status = 'pending', attempts = ?, error = ?, next_attempt = ?, updated_at = ? "
+                "WHERE path = ?", (attempts, row.get('error'), now + delay, now, path)
+            )
+            return 'pending'
+
+    def next_retry(self) -> Optional[float]:
+        """Seconds until the next pending file is due (0 if one is ready now), or None if none are pending."""
+        (next_attempt,) = self.connection.execute(
+            "SELECT MIN(next_attempt) FROM jobs WHERE status = 'pending'"
+        ).fetchone()
+        return None if next_attempt is None else max(next_attempt - time.time(), 0.0)
+
+    def requeue(self, status: str = 'quarantined') -> int:
+        """Give every file in ``status`` a fresh set of attempts; returns how many were requeued."""
+        with self.connection:
+            return self.connection.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, next_attempt = 0, error = NULL, result = NULL, "
+                "updated_at = ? WHERE status = ?", (time.time(), status)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """Number of files in each status."""
+        counts = dict.fromkeys(STATUSES, 0)
+        for row in self.connection.execute("SELECT status, COUNT(*) AS files FROM jobs GROUP BY status"):
+            counts[row['status']] = row['files']
+        return counts
+
+    def results(self) -> Iterator[Dict]:
+        """Final summary rows of every done or quarantined file, in the order files were added."""
+        cursor = self.connection.execute(
+            "SELECT result FROM jobs WHERE status IN ('done', 'quarantined') ORDER BY id"
+        )
+        for (result,) in cursor:
+            yield json.loads(result)
+
+    def quarantined(self) -> List[Dict]:
+        """Path, attempts and last error of each quarantined file."""
+        return [dict(row) for row in self.connection.execute(
+            "SELECT path, attempts, error FROM jobs WHERE status = 'quarantined' ORDER BY id"
+        )]
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
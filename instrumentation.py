@@ -0,0 +1,224 @@
+"""
+Per-stage timing and counters for transcript parsing, with pluggable sinks
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class Instrumentation:
+    """Collects timings and counters for one ``parse_transcript`` call.
+
+    Stages are timed with ``stage()``, pages with ``page_time()``, and
+    ``count()`` adds to named counters. ``report()`` returns everything as a
+    plain dict and ``emit()`` sends it to each sink. Create a new instance
+    per parse; sinks can be shared.
+    """
+
+    enabled = True
+
+    def __init__(self, sinks: Sequence = ()):
+        self.sinks = list(sinks)
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.pages: List[Dict] = []
+        self.counters: Dict[str, int] = defaultdict(int)
+        # Page count of the PDF being parsed, once it has been opened
+        self.expected_pages: Optional[int] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - start
+
+    def add_time(self, name: str, seconds: float):
+        self.stages[name] += seconds
+
+    def page_time(self, index: int, seconds: float, source: str = 'text'):
+        """Record how long page ``index`` took to extract.
+
+        ``source`` is 'text', 'ocr', 'layout' or 'cache' (a page answered
+        from the page cache). An OCR'd page is recorded twice: once for the
+        empty text extraction and once for OCR.
+        """
+        self.pages.append({'page': index, 'seconds': seconds, 'source': source})
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def expect_pages(self, total: int):
+        """Record how many pages the PDF has, so progress can be reported against it."""
+        self.expected_pages = total
+
+    def report(self) -> Dict:
+        return {
+            'stages': {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            'pages': [dict(page, seconds=round(page['seconds'], 6)) for page in self.pages],
+            'counters': dict(self.counters),
+        }
+
+    def emit(self) -> Dict:
+        """Send the report to every sink and return it."""
+        report = self.report()
+        for sink in self.sinks:
+            try:
+                sink.record(report)
+            except Exception:
+                # Diagnostics must never break parsing
+                logger.exception("Instrumentation sink %r failed", sink)
+        return report
+
+
+class NullInstrumentation:
+    """Disabled instrumentation: every call is a no-op.
+
+    Hot loops check ``enabled`` before doing any timing work, so parsing
+    without instrumentation costs one attribute read per page.
+    """
+
+    enabled = False
+    _null_context = nullcontext()
+
+    def stage(self, name: str):
+        return self._null_context
+
+    def add_time(self, name: str, seconds: float):
+        pass
+
+    def page_time(self, index: int, seconds: float, source: str = 'text'):
+        pass
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+    def expect_pages(self, total: int):
+        pass
+
+    def report(self) -> Dict:
+        return {}
+
+    def emit(self) -> Dict:
+        return {}
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class LoggingSink:
+    """Log each parse report as one line at the given level."""
+
+    def __init__(self, log: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.log = log or logger
+        self.level = level
+
+    def record(self, report: Dict):
+        stages = ' '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in report['stages'].items())
+        counters = ' '.join(f"{name}={value}" for name, value in sorted(report['counters'].items()))
+        self.log.log(self.level, "parse_transcript pages=%d %s %s", len(report['pages']), stages, counters)
+
+
+class HistogramSink:
+    """Keep in-memory histograms of stage and page durations across parses."""
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # name -> [count per bucket (+inf last), total count, total seconds]
+        self.histograms: Dict[str, list] = {}
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _observe(self, name: str, seconds: float):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+        histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[1] += 1
+        histogram[2] += seconds
+
+    def record(self, report: Dict):
+        with self._lock:
+            for name, seconds in report['stages'].items():
+                self._observe(name, seconds)
+            for page in report['pages']:
+                self._observe(f"page_{page['source']}", page['seconds'])
+            for name, value in report['counters'].items():
+                self.counters[name] += value
+
+    def summary(self) -> Dict[str, Dict]:
+        """Count, mean and approximate p50/p95 (bucket upper bounds) per histogram."""
+        summary = {}
+        with self._lock:
+            for name, (bucket_counts, count, total) in self.histograms.items():
+                bounds = list(self.buckets) + [float('inf')]
+
+                def quantile(fraction: float) -> float:
+                    running = 0
+                    for bound, bucket_count in zip(bounds, bucket_counts):
+                        running += bucket_count
+                        if running >= fraction * count:
+                            return bound
+                    return bounds[-1]
+
+                summary[name] = {'count': count, 'mean': total / count if count else 0.0,
+                                 'p50': quantile(0.5), 'p95': quantile(0.95)}
+        return summary
+
+
+class PrometheusTextFileSink:
+    """Write cumulative metrics in Prometheus text format for the node_exporter textfile collector.
+
+    The file is rewritten atomically after every parse.
+    """
+
+    def __init__(self, path: str, prefix: str = 'eihwam', buckets: Sequence[float] = HistogramSink.DEFAULT_BUCKETS):
+        self.path = path
+        self.prefix = prefix
+        self.histograms = HistogramSink(buckets)
+        self.parses = 0
+        self._lock = threading.Lock()
+
+    def record(self, report: Dict):
+        self.histograms.record(report)
+        with self._lock:
+            self.parses += 1
+            self._write()
+
+    def _write(self):
+        prefix = self.prefix
+        lines = [
+            f"# HELP {prefix}_parses_total Transcripts parsed.",
+            f"# TYPE {prefix}_parses_total counter",
+            f"{prefix}_parses_total {self.parses}",
+            f"# HELP {prefix}_duration_seconds Time spent per parse stage and per page.",
+            f"# TYPE {prefix}_duration_seconds histogram",
+        ]
+        for name, (bucket_counts, count, total) in sorted(self.histograms.histograms.items()):
+            running = 0
+            for bound, bucket_count in zip(self.histograms.buckets, bucket_counts):
+                running += bucket_count
+                lines.append(f'{prefix}_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {running}')
+            lines.append(f'{prefix}_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_duration_seconds_sum{{stage="{name}"}} {total}')
+            lines.append(f'{prefix}_duration_seconds_count{{stage="{name}"}} {count}')
+        lines.append(f"# HELP {prefix}_events_total Parse counters (lines scanned, matches, exclusions).")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(self.histograms.counters.items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{prefix}_events_total{{event="{label}"}} {value}')
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,101 @@
+"""
+Precompiled single-pass matcher for transcript lines
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# Year Session UnitCode Title Mark Grade CreditPoints
+# Example: 2021 S1C ENGG1810 Introduction to Engineering Computing 74.0 CR 6
+TRANSCRIPT_LINE = re.compile(
+    r'(\d{4})\s+([A-Z0-9]+)\s+([A-Z]{4}\d{4})\s+(.*?)\s+(\d+\.?\d*)\s+([A-Z]+)\s+(\d+)'
+)
+
+# Unit code: 4 letters followed by 4 digits
+UNIT_CODE = re.compile(r'\b([A-Z]{4}\d{4})\b')
+
+# Common USYD credit point values (6, 12, 3 or 0)
+CREDIT_POINTS = re.compile(r'\b(6|12|3|0)\b')
+
+# Numbers that are likely marks (0-100)
+MARK = re.compile(r'\b(\d{1,2}\.\d|\d{1,2}|100)\b')
+
+# Grade patterns in order of preference
+GRADES = (
+    re.compile(r'\b(HD|D|C|P|F|AF|DF|DC|CR|NC|W|AW|FW|SR|DI)\b', re.IGNORECASE),
+    re.compile(r'\b(High Distinction|Distinction|Credit|Pass|Fail)\b', re.IGNORECASE),
+    re.compile(r'\b(HD|D|C|P|F)\b', re.IGNORECASE),
+)
+
+LEADING_DASH = re.compile(r'^\s*[-–]\s*')
+
+# Year, session, code, title, mark, grade, credit points
+StrictFields = Tuple[str, str, str, str, float, str, int]
+
+# Code, title, credit points, mark, grade
+FlexibleFields = Tuple[str, str, Optional[int], Optional[int], Optional[str]]
+
+
+class TranscriptLineMatcher:
+    """Extract unit fields from transcript lines with shared, precompiled patterns.
+
+    ``match_strict`` pulls every field of a standard USYD line out of a single
+    regex match. ``match_flexible`` reproduces the fallback parser's field
+    guesses, but scans the line for credit points, mark and grade once per
+    line rather than once per unit code found on it.
+    """
+
+    def match_strict(self, line: str) -> Optional[StrictFields]:
+        """Return the fields of a standard transcript line, or None."""
+        match = TRANSCRIPT_LINE.search(line)
+        if match is None:
+            return None
+        year, session, code, title, mark, grade, credit_points = match.groups()
+        return year, session, code, title.strip(), float(mark), grade, int(credit_points)
+
+    def match_flexible(self, line: str) -> List[FlexibleFields]:
+        """Return the best-effort fields of every unit code on the line."""
+        code_matches = list(UNIT_CODE.finditer(line))
+        if not code_matches:
+            return []
+
+        # Take the last credit point value as it's usually at the end of the line
+        cp_matches = CREDIT_POINTS.findall(line)
+        credit_points = int(cp_matches[-1]) if cp_matches else None
+
+        mark_match = MARK.search(line)
+        mark = None
+        if mark_match:
+            potential_mark = float(mark_match.group(1))
+            if 0 <= potential_mark <= 100:
+                mark = int(potential_mark)
+
+        grade = None
+        grade_match = None
+        for pattern in GRADES:
+            grade_match = pattern.search(line)
+            if grade_match:
+                grade = grade_match.group(1).upper()
+                break
+
+        # Only units with at least a grade or mark are reported
+        if mark is None and grade is None:
+            return []
+
+        if grade_match:
+            title_end = grade_match.start()
+        elif mark_match:
+            title_end = mark_match.start()
+        else:
+            title_end = len(line)
+
+        results = []
+        for match in code_matches:
+            code = match.group(1)
+            title = LEADING_DASH.sub('', line[match.end():title_end].strip())
+            results.append((code, title, credit_points, mark, grade))
+        return results
+
+
+# Shared by every TranscriptParser instance
+default_matcher = TranscriptLineMatcher()
@@ -0,0 +1,214 @@
+"""
+OCR fallback for transcript pages that have no text layer
+"""
+
+import hashlib
+import shutil
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+
+from cache import MemoryBackend
+from instrumentation import NULL_INSTRUMENTATION
+
+
+def page_content_hash(page) -> str:
+    """Hash a pdfplumber page by its raw content, font and image streams.
+
+    This identifies a page without rasterising it or extracting its text,
+    so repeated uploads of the same scan hit the OCR cache, and unchanged
+    pages hit the page text cache, before any work is done. Fonts are
+    included because the same content stream drawn with a differently
+    subset font can spell different text.
+    """
+    from pdfminer.pdftypes import resolve1
+
+    digest = hashlib.sha256()
+    page_obj = page.page_obj
+    resources = resolve1(page_obj.resources) or {}
+    for stream in page_obj.contents or []:
+        digest.update(resolve1(stream).get_rawdata() or b'')
+    fonts = resolve1(resources.get('Font')) or {}
+    for name in sorted(fonts):
+        font = resolve1(fonts[name])
+        if isinstance(font, dict):
+            digest.update(repr((name, font.get('BaseFont'), resolve1(font.get('Encoding')))).encode('utf-8'))
+            to_unicode = resolve1(font.get('ToUnicode'))
+            if hasattr(to_unicode, 'get_rawdata'):
+                digest.update(to_unicode.get_rawdata() or b'')
+    xobjects = resolve1(resources.get('XObject')) or {}
+    for name in sorted(xobjects):
+        xobject = resolve1(xobjects[name])
+        if hasattr(xobject, 'get_rawdata'):
+            digest.update(name.encode('utf-8') if isinstance(name, str) else bytes(name))
+            digest.update(xobject.get_rawdata() or b'')
+    digest.update(repr(tuple(page.bbox)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _ocr_page(source, page_index: int, resolution: int, lang: str, timeout: float) -> tuple:
+    """Rasterise and OCR one page in a worker process; returns (text, seconds).
+
+    ``source`` is a path, bytes or a ``SharedPDF`` handle.
+    """
+    import pdfplumber
+    import pytesseract
+    from pdf_buffer import open_stream
+
+    start = time.perf_counter()
+    stream = open_stream(source)
+    try:
+        with pdfplumber.open(stream) as pdf:
+            page = pdf.pages[page_index]
+            image = page.to_image(resolution=resolution).original
+            page.close()
+    finally:
+        if stream is not source:
+            stream.close()
+    text = pytesseract.image_to_string(image, lang=lang, timeout=timeout)
+    return text, time.perf_counter() - start
+
+
+class OCRStats:
+    """Per-page OCR latency and overall throughput."""
+
+    def __init__(self):
+        self.pages = 0
+        self.cache_hits = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.latencies: List[float] = []
+        self._first_submit: Optional[float] = None
+        self._last_done: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def submitted(self):
+        with self._lock:
+            if self._first_submit is None:
+                self._first_submit = time.perf_counter()
+
+    def completed(self, latency: float):
+        with self._lock:
+            self.pages += 1
+            self.latencies.append(latency)
+            self._last_done = time.perf_counter()
+
+    def summary(self) -> Dict:
+        """Pages OCR'd, cache hits, timeouts, pages/sec and latency percentiles."""
+        latencies = sorted(self.latencies)
+        elapsed = (self._last_done - self._first_submit) if self._last_done and self._first_submit else 0.0
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))], 3)
+
+        return {
+            'pages': self.pages,
+            'cache_hits': self.cache_hits,
+            'timeouts': self.timeouts,
+            'failures': self.failures,
+            'pages_per_second': round(self.pages / elapsed, 3) if elapsed > 0 else None,
+            'latency_p50': percentile(0.5),
+            'latency_p95': percentile(0.95),
+            'latency_max': round(latencies[-1], 3) if latencies else None,
+        }
+
+
+class OCRFallback:
+    """Rasterise and OCR pages with no text layer on a bounded process pool.
+
+    Only pages where pdfplumber finds no text are sent here. Each page runs
+    with a timeout: a page that times out or fails yields no text rather
+    than holding up the rest of the document. OCR output is cached in
+    memory by ``page_content_hash``.
+    """
+
+    def __init__(self, workers: int = 2, page_timeout: float = 60, resolution: int = 300,
+                 lang: str = 'eng', cache_entries: int = 512):
+        self.workers = workers
+        self.page_timeout = page_timeout
+        self.resolution = resolution
+        self.lang = lang
+        self.cache = MemoryBackend(cache_entries)
+        self.stats = OCRStats()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        """Whether the tesseract binary needed for OCR is installed."""
+        return shutil.which('tesseract') is not None
+
+    def _pool(self):
+        # Imported here so parsers without scanned pages never load multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, source, page_index: int, page_hash: str) -> Future:
+        """Start OCR for one page; the future resolves to (text, seconds)."""
+        cached = self.cache.get(page_hash)
+        if cached is not None:
+            self.stats.cache_hits += 1
+            future = Future()
+            future.set_result((cached[1], 0.0))
+            future.page_hash = None
+            future.page_index = page_index
+            future.executor = None
+            return future
+        self.stats.submitted()
+        executor = self._pool()
+        future = executor.submit(_ocr_page, source, page_index, self.resolution, self.lang, self.page_timeout)
+        future.page_hash = page_hash
+        future.page_index = page_index
+        future.executor = executor
+        return future
+
+    def result(self, future: Future, instrumentation=NULL_INSTRUMENTATION) -> str:
+        """Wait for a page's OCR text; empty if it timed out or failed.
+
+        The page's OCR time is recorded in ``instrumentation`` with source
+        ``'ocr'`` (zero for a page answered from the cache).
+        """
+        from concurrent.futures.process import BrokenProcessPool
+        
+        try:
+            # Tesseract is killed after page_timeout; allow time to rasterise too
+            text, latency = future.result(timeout=self.page_timeout * 2)
+        except FutureTimeoutError:
+            future.cancel()
+            self.stats.timeouts += 1
+            return ''
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            self.stats.failures += 1
+            with self._lock:
+                # Other pages of the same broken pool may get here after it was replaced
+                if self._executor is not None and self._executor is future.executor:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = None
+            return ''
+        except Exception as e:
+            # pytesseract raises RuntimeError when tesseract hits its timeout; anything else
+            # (TesseractError, a PIL error, a missing binary) fails just this page
+            if isinstance(e, RuntimeError) and 'timeout' in str(e).lower():
+                self.stats.timeouts += 1
+            else:
+                self.stats.failures += 1
+            return ''
+        if future.page_hash is not None:
+            self.stats.completed(latency)
+            self.cache.put(future.page_hash, time.time(), text)
+        instrumentation.page_time(future.page_index, latency, 'ocr')
+        return text
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,144 @@
+"""
+Shared, bounded background parsing for the web front end
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Sequence
+
+from cache import ResultCache, hash_pdf_bytes
+from instrumentation import Instrumentation
+from pdf_buffer import pdf_view
+from preflight import PreflightLimits, TranscriptRejected, preflight
+
+
+class ParseJob:
+    """One transcript being parsed in the background.
+
+    ``future`` resolves to the ``parse_transcript`` result. Progress is read
+    from the job's ``Instrumentation`` as pages are extracted, so it can be
+    polled from another thread while the parse runs.
+    """
+
+    def __init__(self, key: str, instrumentation: Optional[Instrumentation], future: Future):
+        self.key = key
+        self.instrumentation = instrumentation
+        self.future = future
+        # Sessions currently waiting on this job
+        self.watchers = 0
+
+    @property
+    def cached(self) -> bool:
+        """True if the result came straight from the cache and nothing was parsed."""
+        return self.instrumentation is None
+
+    @property
+    def pages_done(self) -> int:
+        """Distinct pages read so far, whether extracted, OCR'd or answered from the page cache."""
+        if self.instrumentation is None:
+            return 0
+        return len({page['page'] for page in list(self.instrumentation.pages)})
+
+    @property
+    def pages_total(self) -> Optional[int]:
+        return self.instrumentation.expected_pages if self.instrumentation is not None else None
+
+    @property
+    def progress(self) -> float:
+        """Fraction of pages extracted so far (1.0 once the result is ready)."""
+        if self.future.done():
+            return 1.0
+        total = self.pages_total
+        return min(self.pages_done / total, 1.0) if total else 0.0
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> Dict:
+        return self.future.result(timeout)
+
+
+class ParseJobManager:
+    """Run ``parse_transcript`` on a shared, bounded thread pool.
+
+    At most ``workers`` transcripts are parsed at once however many sessions
+    upload, and the caller's thread is free to report progress while they
+    run. Jobs are keyed like ``ResultCache`` entries (PDF hash and rules
+    version): a second upload of a PDF that is already being parsed joins
+    the running job, and a PDF parsed before is answered from the cache.
+    A queued job that every session has walked away from is cancelled.
+
+    With ``limits``, each new upload is pre-flighted before it is queued,
+    no more than ``max_concurrent`` jobs are queued or running at once, and
+    each parse stops after ``time_budget``; uploads that fail any of these
+    raise (or resolve to) ``TranscriptRejected``.
+    """
+
+    def __init__(self, parser, result_cache: Optional[ResultCache] = None, workers: int = 2,
+                 sinks: Sequence = (), limits: Optional[PreflightLimits] = None):
+        self.parser = parser
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        self.sinks = list(sinks)
+        self.limits = limits
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='parse-job')
+        self._jobs: Dict[str, ParseJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, pdf_file) -> ParseJob:
+        """Start (or join) parsing ``pdf_file`` and return its job without waiting.
+        
+        Raises ``TranscriptRejected`` if a new upload fails pre-flight or
+        too many jobs are already queued.
+        """
+        # Hashed and parsed from the same view of the upload; the bytes are never copied
+        data = pdf_view(pdf_file)
+        key = self.result_cache.make_key(hash_pdf_bytes(data), self.parser.rules_version)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.future.cancelled():
+                job.watchers += 1
+                return job
+        result = self.result_cache.get(key)
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+            return ParseJob(key, None, future)
+        if self.limits is not None:
+            # Outside the lock: other sessions can submit while this upload is checked
+            preflight(data, self.limits)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.future.cancelled():
+                max_concurrent = self.limits.max_concurrent if self.limits is not None else None
+                if max_concurrent is not None and len(self._jobs) >= max_concurrent:
+                    raise TranscriptRejected('busy', "The calculator is busy, please try again in a moment")
+                instrumentation = Instrumentation(self.sinks)
+                future = self._executor.submit(self._parse, key, data, instrumentation)
+                job = self._jobs[key] = ParseJob(key, instrumentation, future)
+            job.watchers += 1
+        return job
+
+    def _parse(self, key: str, data: memoryview, instrumentation: Instrumentation) -> Dict:
+        time_budget = self.limits.time_budget if self.limits is not None else None
+        try:
+            result = self.parser.parse_transcript(data, instrumentation=instrumentation, time_budget=time_budget)
+            self.result_cache.put(key, result)
+            return result
+        finally:
+            with self._lock:
+                self._jobs.pop(key, None)
+
+    def release(self, job: ParseJob):
+        """Stop watching ``job``; if nobody else is and it hasn't started, cancel it."""
+        with self._lock:
+            job.watchers = max(job.watchers - 1, 0)
+            if job.watchers == 0 and job.future.cancel():
+                self._jobs.pop(job.key, None)
+
+    def in_flight(self) -> int:
+        """Number of jobs queued or running."""
+        with self._lock:
+            return len(self._jobs)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,163 @@
+"""
+Zero-copy PDF buffers shared between hashing, extraction and worker processes
+"""
+
+import io
+import mmap
+import os
+from typing import Optional, Tuple, Union
+
+# In-memory PDF contents that can be viewed without copying
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+
+def pdf_view(pdf_file) -> memoryview:
+    """Return a read-only view of a PDF's bytes, copying nothing already in memory.
+
+    Bytes-like objects and mmaps are viewed in place; ``BytesIO`` objects
+    (including Streamlit's ``UploadedFile``) through ``getbuffer()``; paths
+    are memory-mapped; a ``SharedPDF`` is attached. Only other file objects
+    are read, once.
+    """
+    if isinstance(pdf_file, BUFFER_TYPES):
+        return memoryview(pdf_file).toreadonly()
+    if isinstance(pdf_file, SharedPDF):
+        return pdf_file.view()
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b'')
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    if isinstance(pdf_file, io.BytesIO):
+        return pdf_file.getbuffer().toreadonly()
+    pdf_file.seek(0)
+    return memoryview(pdf_file.read())
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable, read-only file over a buffer, so pdfplumber reads it in place.
+
+    Unlike ``io.BytesIO(data)``, wrapping a memoryview, bytearray or mmap
+    copies nothing; only the chunks pdfminer asks for are materialised.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        chunk = self._view[self._position:self._position + len(target)]
+        target[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(self._position + size, len(self._view))
+        data = self._view[self._position:end].tobytes()
+        self._position = max(end, self._position)
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        if self._position < 0:
+            raise ValueError("Negative seek position")
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            # Release the buffer so an mmap or shared memory segment can be closed
+            self._view.release()
+        super().close()
+
+
+class SharedPDF:
+    """A PDF placed once in shared memory for process-pool workers.
+
+    Pickling a ``SharedPDF`` sends only the segment's name and size, so
+    handing the same upload to many tasks (page ranges, OCR pages, a scoring
+    worker) never pickles the bytes. The creating process owns the segment
+    and must ``close()`` it (or use it as a context manager) once every task
+    using it has finished.
+    """
+
+    def __init__(self, data):
+        # Imported here so callers that never hand PDFs to workers don't load multiprocessing
+        from multiprocessing import shared_memory
+
+        view = pdf_view(data)
+        self.size = len(view)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        self._shm.buf[:self.size] = view
+        self.name = self._shm.name
+        self._owner = True
+
+    def __getstate__(self):
+        return {'name': self.name, 'size': self.size}
+
+    def __setstate__(self, state):
+        self.name = state['name']
+        self.size = state['size']
+        self._shm = None
+        self._owner = False
+
+    def view(self) -> memoryview:
+        """The PDF's bytes, attaching to the segment on first use in this process."""
+        if self._shm is None:
+            from multiprocessing import shared_memory
+
+            self._shm = shared_memory.SharedMemory(name=self.name)
+        return self._shm.buf[:self.size].toreadonly()
+
+    def close(self):
+        """Detach; the creating process also frees the segment."""
+        if self._shm is None:
+            return
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self) -> 'SharedPDF':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_stream(source) -> Union[str, os.PathLike, io.RawIOBase]:
+    """Turn a path, buffer or ``SharedPDF`` into something ``pdfplumber.open`` reads in place."""
+    if isinstance(source, SharedPDF):
+        return BufferReader(source.view())
+    if isinstance(source, BUFFER_TYPES):
+        return BufferReader(source)
+    return source
+
+
+def shareable(source) -> Tuple[object, Optional[SharedPDF]]:
+    """Return a form of ``source`` that is cheap to send to worker processes.
+
+    Paths and ``SharedPDF`` handles are returned as they are. Anything in
+    memory is copied once into a new ``SharedPDF``, returned second so the
+    caller can close it when its workers are done (None otherwise).
+    """
+    if isinstance(source, (str, os.PathLike, SharedPDF)):
+        return source, None
+    shared = SharedPDF(source)
+    return shared, shared
@@ -1,252 +1,553 @@
-import pdfplumber
-import re
-import pandas as pd
-from typing import List, Dict, Tuple, Optional
-import json
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import List, Dict, FrozenSet, Tuple, Optional, Iterable, Iterator, Union
+import time
+from sys import intern
+from units import Unit
+from cache import PageCache
+from line_matcher import TranscriptLineMatcher, default_matcher
+from ocr import OCRFallback, page_content_hash
+from pdf_buffer import SharedPDF, open_stream, pdf_view, shareable
+from instrumentation import Instrumentation, NULL_INSTRUMENTATION
+from table_layout import TableRow, extract_table_rows
+from student_boundaries import StudentBoundaryDetector
+from preflight import within_budget
+from rules import RuleIndex, load_rule_index
+
+# Bump whenever the parsing or EIHWAM rules change in a way that alters results
+RULES_VERSION = "1"
+# Likewise for layout-mode table extraction, which only layout results depend on
+LAYOUT_VERSION = "2"
+
+# Instrumentation stages spent in PDF extraction rather than line matching
+EXTRACTION_STAGES = ('pdf_open', 'page_hash', 'extract_text', 'extract_words', 'ocr_wait', 'parallel_extract_wait')
+
+
+def _read_pdf_source(pdf_file):
+    """Return something the PDF can be reopened from: a path, or a zero-copy view of its bytes."""
+    if isinstance(pdf_file, (str, SharedPDF)):
+        return pdf_file
+    return pdf_view(pdf_file)
+
+
+@contextmanager
+def _open_pdf(source, pages: Optional[List[int]] = None):
+    """Open a path, buffer, ``SharedPDF`` or file-like object with pdfplumber (optionally only ``pages``, 1-based).
+    
+    Buffers are read in place, never copied into a ``BytesIO``.
+    """
+    # Imported on first use: pdfplumber (and pdfminer) dominate import time,
+    # and text-only callers never need them
+    import pdfplumber
+    
+    stream = open_stream(source)
+    try:
+        with pdfplumber.open(stream, pages=pages) as pdf:
+            yield pdf
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def _extract_page_range(source, start: int, stop: int) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Extract pages ``start`` to ``stop`` (used by parallel workers).
+    
+    Returns (text, None) per page, or (None, page hash) for pages with no
+    text layer so the caller can send them to OCR.
+    """
+    pages = []
+    with _open_pdf(source) as pdf:
+        for page in pdf.pages[start:stop]:
+            page_text = page.extract_text()
+            pages.append((page_text, None) if page_text else (None, page_content_hash(page)))
+            page.close()
+    return pages
+
+
+def _extract_table_range(source, start: int, stop: int) -> List[List[TableRow]]:
+    """Read the results table rows of pages ``start`` to ``stop`` (used by parallel workers)."""
+    pages = []
+    with _open_pdf(source) as pdf:
+        for page in pdf.pages[start:stop]:
+            pages.append(extract_table_rows(page.extract_words()))
+            page.close()
+    return pages
+
 
 class TranscriptParser:
-    def __init__(self):
-        """Initialize the transcript parser with thesis codes."""
-        with open('thesis_codes.json', 'r') as f:
-            self.thesis_codes = json.load(f)['thesis_units']
+    # Precompiled line matcher shared by all parser instances
+    matcher: TranscriptLineMatcher = default_matcher
+    
+    def __init__(self, ocr: Optional[OCRFallback] = None, rules: Optional[RuleIndex] = None,
+                 layout: bool = False, page_cache: Optional[PageCache] = None):
+        """Initialize the transcript parser with its EIHWAM rule index.
+        
+        Pass an ``OCRFallback`` to OCR pages that have no text layer
+        (scanned transcripts); otherwise such pages are skipped. ``rules``
+        defaults to the index built from eihwam_rules.json. With ``layout``,
+        ``parse_transcript`` reads the results table from word positions
+        instead of matching lines of text. With a ``PageCache``, pages seen
+        before (e.g. in last semester's upload of the same transcript) are
+        neither extracted nor matched again.
+        """
+        self.rules = rules or load_rule_index()
+        self.ocr = ocr
+        self.layout = layout
+        self.page_cache = page_cache
+    
+    @property
+    def thesis_codes(self) -> FrozenSet[str]:
+        return self.rules.thesis_codes
+    
+    @property
+    def rules_version(self) -> str:
+        """Identify the rules and thesis codes in effect, for cache keys."""
+        version = f"{RULES_VERSION}-{self.rules.version}"
+        # Layout extraction can read units the text parser can't
+        return f"{version}-layout{LAYOUT_VERSION}" if self.layout else version
+    
+    def reload_rules(self, path: Optional[str] = None):
+        """Swap in the rules from ``path`` (default: eihwam_rules.json) if they changed on disk."""
+        self.rules = load_rule_index(path) if path else load_rule_index()
+    
+    def extract_text_from_pdf(self, pdf_file, workers: Optional[int] = None) -> str:
+        """Extract text from uploaded PDF file.
+        
+        ``pdf_file`` may be a path, a file object, or the PDF's bytes as
+        ``bytes``, ``bytearray``, ``memoryview``, ``mmap`` or ``SharedPDF``;
+        buffers are read in place rather than copied (the same holds for
+        every method taking ``pdf_file``).
+        """
+        return "".join(page_text + "\n" for page_text in self.iter_page_texts(pdf_file, workers))
+    
+    def iter_page_texts(self, pdf_file, workers: Optional[int] = None,
+                        executor: Optional[Executor] = None, pages_per_task: int = 4,
+                        instrumentation=NULL_INSTRUMENTATION) -> Iterator[str]:
+        """Yield the text of each non-empty page in order.
+        
+        Pages are extracted one at a time and their layout objects released as
+        soon as the text is read. When ``workers`` or ``executor`` is given,
+        page ranges are extracted in parallel worker processes instead, and
+        still yielded in page order. With OCR enabled, pages without a text
+        layer are OCR'd in the background while later pages are extracted.
+        With a ``page_cache``, pages extracted one at a time are looked up
+        by content hash first and only extracted on a miss.
+        """
+        try:
+            if workers is None and executor is None:
+                yield from self._iter_page_texts_sequential(pdf_file, instrumentation)
+            else:
+                yield from self._iter_page_texts_parallel(pdf_file, workers, executor, pages_per_task,
+                                                          instrumentation)
+        except Exception as e:
+            raise Exception(f"Error reading PDF: {str(e)}")
     
-    def extract_text_from_pdf(self, pdf_file) -> str:
-        """Extract text from uploaded PDF file."""
+    def _iter_page_texts_sequential(self, pdf_file, instrumentation) -> Iterator[str]:
+        """Extract pages one by one, yielding each as soon as it (and any OCR before it) is ready."""
+        timed = instrumentation.enabled
+        # Page texts, or OCR futures for pages with no text layer, in page order
+        pending = deque()
+        # OCR workers get the PDF as a path or one shared memory copy
+        ocr_source = shared = None
+        page_cache = self.page_cache
+        start = time.perf_counter()
         try:
-            with pdfplumber.open(pdf_file) as pdf:
-                text = ""
-                for page in pdf.pages:
+            with _open_pdf(pdf_file) as pdf:
+                pages = pdf.pages
+                if timed:
+                    instrumentation.add_time('pdf_open', time.perf_counter() - start)
+                    instrumentation.expect_pages(len(pages))
+                for index, page in enumerate(pages):
+                    if page_cache is not None:
+                        with instrumentation.stage('page_hash'):
+                            page_hash = page_content_hash(page)
+                        page_text = page_cache.get_text(page_hash)
+                        if page_text is not None:
+                            # Recorded as a page like any other, so progress doesn't stall on cached pages
+                            instrumentation.page_time(index, 0.0, 'cache')
+                            instrumentation.count('pages')
+                            instrumentation.count('page_cache_hits')
+                            pending.append(page_text)
+                            page.close()
+                            yield from self._drain_pages(pending, False, instrumentation)
+                            continue
+                    if timed:
+                        start = time.perf_counter()
                     page_text = page.extract_text()
+                    if timed:
+                        elapsed = time.perf_counter() - start
+                        instrumentation.add_time('extract_text', elapsed)
+                        instrumentation.page_time(index, elapsed)
+                        instrumentation.count('pages')
+                    if page_text and page_cache is not None:
+                        # Pages without a text layer are left to the OCR cache
+                        page_cache.put_text(page_hash, page_text)
                     if page_text:
-                        text += page_text + "\n"
-                return text
+                        pending.append(page_text)
+                    elif self.ocr is not None:
+                        if ocr_source is None:
+                            ocr_source, shared = shareable(_read_pdf_source(pdf_file))
+                        pending.append(self.ocr.submit(ocr_source, index, page_content_hash(page)))
+                        instrumentation.count('ocr_pages')
+                    page.close()
+                    yield from self._drain_pages(pending, False, instrumentation)
+            yield from self._drain_pages(pending, True, instrumentation)
+        finally:
+            if shared is not None:
+                shared.close()
+    
+    def _drain_pages(self, pending: deque, block: bool, instrumentation=NULL_INSTRUMENTATION) -> Iterator[str]:
+        """Yield ready pages from the front of ``pending``, waiting on OCR only if ``block``."""
+        while pending:
+            item = pending[0]
+            if isinstance(item, Future):
+                if not block and not item.done():
+                    return
+                with instrumentation.stage('ocr_wait'):
+                    item = self.ocr.result(item, instrumentation)
+            pending.popleft()
+            if item:
+                yield item
+    
+    def _iter_page_texts_parallel(self, pdf_file, workers: Optional[int], executor: Optional[Executor],
+                                  pages_per_task: int, instrumentation) -> Iterator[str]:
+        """Extract page ranges on a process pool, yielding pages in order."""
+        with instrumentation.stage('pdf_open'):
+            source = _read_pdf_source(pdf_file)
+            with _open_pdf(source) as pdf:
+                page_count = len(pdf.pages)
+        instrumentation.count('pages', page_count)
+        instrumentation.expect_pages(page_count)
+        
+        # Workers reopen a path, or attach to one shared memory copy of the bytes
+        source, shared = shareable(source)
+        own_executor = executor is None
+        if own_executor:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [
+                executor.submit(_extract_page_range, source, start, min(start + pages_per_task, page_count))
+                for start in range(0, page_count, pages_per_task)
+            ]
+            pending = deque()
+            for start, future in zip(range(0, page_count, pages_per_task), futures):
+                with instrumentation.stage('parallel_extract_wait'):
+                    page_results = future.result()
+                for index, (page_text, page_hash) in enumerate(page_results, start):
+                    if page_text:
+                        pending.append(page_text)
+                    elif self.ocr is not None:
+                        pending.append(self.ocr.submit(source, index, page_hash))
+                        instrumentation.count('ocr_pages')
+                yield from self._drain_pages(pending, False, instrumentation)
+            yield from self._drain_pages(pending, True, instrumentation)
+        finally:
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if shared is not None:
+                shared.close()
+    
+    def iter_pages_bounded(self, pdf_file, pages_per_open: int = 32,
+                           instrumentation=NULL_INSTRUMENTATION) -> Iterator[Tuple[int, str]]:
+        """Yield (page index, text) for each non-empty page, in bounded memory.
+        
+        The document is reopened every ``pages_per_open`` pages, so pdfminer's
+        object cache never holds more than one window of the file, and each
+        page's layout objects are released as soon as its text is read. Pass
+        a path (or an open file) rather than bytes to keep the file itself
+        out of memory. Pages with no text layer are OCR'd in place when OCR
+        is enabled.
+        """
+        source = pdf_file
+        ocr_source = shared = None
+        try:
+            with instrumentation.stage('pdf_open'):
+                with _open_pdf(source) as pdf:
+                    page_count = len(pdf.pages)
+            instrumentation.count('pages', page_count)
+            instrumentation.expect_pages(page_count)
+            for window_start in range(0, page_count, pages_per_open):
+                window = list(range(window_start + 1, min(window_start + pages_per_open, page_count) + 1))
+                with _open_pdf(source, window) as pdf:
+                    for index, page in enumerate(pdf.pages, window_start):
+                        with instrumentation.stage('extract_text'):
+                            page_text = page.extract_text()
+                        ocr_future = None
+                        if not page_text and self.ocr is not None:
+                            if ocr_source is None:
+                                ocr_source, shared = shareable(_read_pdf_source(pdf_file))
+                            ocr_future = self.ocr.submit(ocr_source, index, page_content_hash(page))
+                            instrumentation.count('ocr_pages')
+                        page.close()
+                        if ocr_future is not None:
+                            with instrumentation.stage('ocr_wait'):
+                                page_text = self.ocr.result(ocr_future, instrumentation)
+                        if page_text:
+                            yield index, page_text
         except Exception as e:
             raise Exception(f"Error reading PDF: {str(e)}")
+        finally:
+            if shared is not None:
+                shared.close()
+    
+    def iter_lines(self, pdf_file, workers: Optional[int] = None, executor: Optional[Executor] = None,
+                   instrumentation=NULL_INSTRUMENTATION) -> Iterator[str]:
+        """Yield transcript lines page by page without building the full text."""
+        for page_text in self.iter_page_texts(pdf_file, workers, executor, instrumentation=instrumentation):
+            yield from page_text.split('\n')
     
-    def parse_units(self, text: str) -> List[Dict]:
-        """Parse units from transcript text using regex patterns."""
+    def iter_table_rows(self, pdf_file, workers: Optional[int] = None, executor: Optional[Executor] = None,
+                        pages_per_task: int = 4, instrumentation=NULL_INSTRUMENTATION) -> Iterator[TableRow]:
+        """Yield the results table rows of each page in order.
+        
+        Each page's positioned words are read once, its column boundaries
+        inferred from them, and its rows emitted as structured fields, so no
+        line regex runs at all. Pages with no results table (or no text
+        layer) yield nothing. ``workers`` and ``executor`` work as for
+        ``iter_page_texts``.
+        """
+        try:
+            if workers is None and executor is None:
+                yield from self._iter_table_rows_sequential(pdf_file, instrumentation)
+            else:
+                yield from self._iter_table_rows_parallel(pdf_file, workers, executor, pages_per_task,
+                                                          instrumentation)
+        except Exception as e:
+            raise Exception(f"Error reading PDF: {str(e)}")
+    
+    def _iter_table_rows_sequential(self, pdf_file, instrumentation) -> Iterator[TableRow]:
+        timed = instrumentation.enabled
+        start = time.perf_counter()
+        with _open_pdf(pdf_file) as pdf:
+            pages = pdf.pages
+            if timed:
+                instrumentation.add_time('pdf_open', time.perf_counter() - start)
+                instrumentation.expect_pages(len(pages))
+            for index, page in enumerate(pages):
+                if timed:
+                    start = time.perf_counter()
+                rows = extract_table_rows(page.extract_words())
+                if timed:
+                    elapsed = time.perf_counter() - start
+                    instrumentation.add_time('extract_words', elapsed)
+                    instrumentation.page_time(index, elapsed, 'layout')
+                    instrumentation.count('pages')
+                    instrumentation.count('table_rows', len(rows))
+                page.close()
+                yield from rows
+    
+    def _iter_table_rows_parallel(self, pdf_file, workers: Optional[int], executor: Optional[Executor],
+                                  pages_per_task: int, instrumentation) -> Iterator[TableRow]:
+        with instrumentation.stage('pdf_open'):
+            source = _read_pdf_source(pdf_file)
+            with _open_pdf(source) as pdf:
+                page_count = len(pdf.pages)
+        instrumentation.count('pages', page_count)
+        instrumentation.expect_pages(page_count)
+        
+        source, shared = shareable(source)
+        own_executor = executor is None
+        if own_executor:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [
+                executor.submit(_extract_table_range, source, start, min(start + pages_per_task, page_count))
+                for start in range(0, page_count, pages_per_task)
+            ]
+            for future in futures:
+                with instrumentation.stage('parallel_extract_wait'):
+                    page_rows = future.result()
+                for rows in page_rows:
+                    instrumentation.count('table_rows', len(rows))
+                    yield from rows
+        finally:
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if shared is not None:
+                shared.close()
+    
+    def units_from_table_rows(self, rows: Iterable[TableRow]) -> List[Unit]:
+        """Build units from structured rows (see ``iter_table_rows``; strict line matches have the same fields)."""
         units = []
+        code_info = self.rules.code_info
+        for year, session, unit_code, title, mark, grade, credit_points in rows:
+            level, is_thesis, credit_point_override = code_info(unit_code)
+            unit = Unit(
+                code=intern(unit_code),
+                title=title,
+                credit_points=credit_points if credit_point_override is None else credit_point_override,
+                mark=None if mark is None else int(mark),
+                grade=intern(grade),
+                level=level,
+                is_thesis=is_thesis,
+                included_in_eihwam=True,  # Will be updated by rules engine
+                exclusion_reason=None,
+                year=intern(year),
+                session=intern(session)
+            )
+            if credit_point_override is not None:
+                unit.raw_credit_points = credit_points
+            units.append(unit)
+        return units
+    
+    def parse_units(self, text: Union[str, Iterable[str]], instrumentation=NULL_INSTRUMENTATION) -> List[Unit]:
+        """Parse units from transcript text (or an iterable of lines) using regex patterns."""
+        return list(self.iter_units(text, instrumentation))
+    
+    def iter_units(self, text: Union[str, Iterable[str]], instrumentation=NULL_INSTRUMENTATION) -> Iterator[Unit]:
+        """Yield units as soon as their transcript line is matched.
+        
+        ``text`` may be the full transcript text or an iterable of lines such
+        as ``iter_lines``. Lines are only buffered until the first strict
+        match; if none match, the buffered lines go to the flexible parser.
+        """
+        found = False
+        buffered = []
+        lines_scanned = 0
+        strict_matches = 0
         
         # Look for the specific USYD transcript format:
         # Year Session UnitCode Title Mark Grade CreditPoints
         # Example: 2021 S1C ENGG1810 Introduction to Engineering Computing 74.0 CR 6
+        match_strict = self.matcher.match_strict
+        code_info = self.rules.code_info
         
-        # Pattern to match the transcript line format
-        transcript_pattern = r'(\d{4})\s+([A-Z0-9]+)\s+([A-Z]{4}\d{4})\s+(.*?)\s+(\d+\.?\d*)\s+([A-Z]+)\s+(\d+)'
-        
-        lines = text.split('\n')
+        lines = text.split('\n') if isinstance(text, str) else text
         
         for line in lines:
-            match = re.search(transcript_pattern, line)
-            if match:
-                year = match.group(1)
-                session = match.group(2)
-                unit_code = match.group(3)
-                title = match.group(4).strip()
-                mark = float(match.group(5))
-                grade = match.group(6)
-                credit_points = int(match.group(7))
-                
-                # For PEP units, explicitly set credit points to 0
-                if unit_code.startswith('ENGP'):
-                    credit_points = 0
+            lines_scanned += 1
+            if not found:
+                buffered.append(line)
+            fields = match_strict(line)
+            if fields:
+                strict_matches += 1
+                year, session, unit_code, title, mark, grade, credit_points = fields
+                level, is_thesis, credit_point_override = code_info(unit_code)
                 
-                unit = {
-                    'code': unit_code,
-                    'title': title,
-                    'credit_points': credit_points,
-                    'mark': int(mark),
-                    'grade': grade,
-                    'level': self._determine_level(unit_code),
-                    'is_thesis': unit_code in self.thesis_codes,
-                    'included_in_eihwam': True,  # Will be updated by rules engine
-                    'exclusion_reason': None,
-                    'year': year,
-                    'session': session
-                }
-                units.append(unit)
+                unit = Unit(
+                    code=intern(unit_code),
+                    title=title,
+                    # Prefix rules, e.g. PEP (ENGP) units always count as 0 credit points
+                    credit_points=credit_points if credit_point_override is None else credit_point_override,
+                    mark=int(mark),
+                    grade=intern(grade),
+                    level=level,
+                    is_thesis=is_thesis,
+                    included_in_eihwam=True,  # Will be updated by rules engine
+                    exclusion_reason=None,
+                    year=intern(year),
+                    session=intern(session)
+                )
+                if credit_point_override is not None:
+                    # Kept so other rule sets can start from the printed value
+                    unit.raw_credit_points = credit_points
+                found = True
+                buffered = None
+                yield unit
+        
+        instrumentation.count('lines_scanned', lines_scanned)
+        instrumentation.count('strict_matches', strict_matches)
         
         # If the strict pattern didn't work, try a more flexible approach
-        if not units:
-            units = self._parse_units_flexible(text)
+        if not found:
+            instrumentation.count('flexible_fallbacks')
+            with instrumentation.stage('parse_units_flexible'):
+                units = self._parse_units_flexible(buffered)
+            instrumentation.count('flexible_matches', len(units))
+            yield from units
+    
+    def parse_units_by_page(self, page_texts: Iterable[str], instrumentation=NULL_INSTRUMENTATION) -> List[Unit]:
+        """Parse units page by page, reusing each page's strict matches from ``page_cache``.
+        
+        Gives the same units as ``parse_units`` on the joined pages: rows
+        from every page in order, or the flexible parser over all lines if
+        no page has a strict match. Only pages whose text isn't cached are
+        matched.
+        """
+        page_cache = self.page_cache
+        match_strict = self.matcher.match_strict
+        rows: List[tuple] = []
+        pages: List[str] = []
+        lines_scanned = 0
+        for page_text in page_texts:
+            page_rows = page_cache.get_rows(page_text)
+            if page_rows is None:
+                page_lines = page_text.split('\n')
+                lines_scanned += len(page_lines)
+                page_rows = tuple(fields for fields in map(match_strict, page_lines) if fields)
+                page_cache.put_rows(page_text, page_rows)
+            else:
+                instrumentation.count('page_rows_cached')
+            rows.extend(page_rows)
+            if not rows:
+                # Only needed for the flexible fallback
+                pages.append(page_text)
+        instrumentation.count('lines_scanned', lines_scanned)
+        instrumentation.count('strict_matches', len(rows))
+        if rows:
+            return self.units_from_table_rows(rows)
         
+        instrumentation.count('flexible_fallbacks')
+        with instrumentation.stage('parse_units_flexible'):
+            units = self._parse_units_flexible(line for page_text in pages for line in page_text.split('\n'))
+        instrumentation.count('flexible_matches', len(units))
         return units
     
-    def _parse_units_flexible(self, text: str) -> List[Dict]:
+    def _parse_units_flexible(self, text: Union[str, Iterable[str]]) -> List[Unit]:
         """Fallback parsing method for more flexible transcript formats."""
         units = []
+        match_flexible = self.matcher.match_flexible
+        code_info = self.rules.code_info
         
-        # Unit code pattern: 4 letters followed by 4 digits
-        unit_code_pattern = r'\b([A-Z]{4}\d{4})\b'
-        
-        lines = text.split('\n')
+        lines = text.split('\n') if isinstance(text, str) else text
         
         for line in lines:
-            # Find unit codes in the line
-            unit_matches = re.finditer(unit_code_pattern, line)
-            
-            for match in unit_matches:
-                unit_code = match.group(1)
-                
-                # Extract credit points - look for common credit point values
-                # Look for 6, 12, 3, or 0 credit points (most common USYD values)
-                cp_matches = re.findall(r'\b(6|12|3|0)\b', line)
-                credit_points = None
-                if cp_matches:
-                    # Take the last match as it's usually at the end of the line
-                    credit_points = int(cp_matches[-1])
-                
-                # For PEP units, explicitly set credit points to 0
-                if unit_code.startswith('ENGP'):
-                    credit_points = 0
-                
-                # Extract mark (0-100) - look for decimal numbers that are likely marks
-                mark_match = re.search(r'\b(\d{1,2}\.\d|\d{1,2}|100)\b', line)
-                mark = None
-                if mark_match:
-                    potential_mark = float(mark_match.group(1))
-                    # Only accept marks that are reasonable (0-100)
-                    if 0 <= potential_mark <= 100:
-                        mark = int(potential_mark)
-                
-                # Extract grade (HD, D, C, P, F, AF, DF, etc.)
-                grade_patterns = [
-                    r'\b(HD|D|C|P|F|AF|DF|DC|CR|NC|W|AW|FW|SR|DI)\b',
-                    r'\b(High Distinction|Distinction|Credit|Pass|Fail)\b',
-                    r'\b(HD|D|C|P|F)\b'
-                ]
-                
-                grade = None
-                for pattern in grade_patterns:
-                    grade_match = re.search(pattern, line, re.IGNORECASE)
-                    if grade_match:
-                        grade = grade_match.group(1).upper()
-                        break
-                
-                # Extract unit title (text between unit code and grade/mark)
-                title_start = match.end()
-                title_end = len(line)
-                if grade_match:
-                    title_end = grade_match.start()
-                elif mark_match:
-                    title_end = mark_match.start()
-                
-                title = line[title_start:title_end].strip()
-                title = re.sub(r'^\s*[-–]\s*', '', title)  # Remove leading dashes
-                
-                # Only add unit if we have at least a grade or mark
-                if unit_code and (mark is not None or grade is not None):
-                    unit = {
-                        'code': unit_code,
-                        'title': title,
-                        'credit_points': credit_points,
-                        'mark': mark,
-                        'grade': grade,
-                        'level': self._determine_level(unit_code),
-                        'is_thesis': unit_code in self.thesis_codes,
-                        'included_in_eihwam': True,  # Will be updated by rules engine
-                        'exclusion_reason': None
-                    }
-                    units.append(unit)
+            # Every unit code on the line that has at least a grade or mark
+            for unit_code, title, credit_points, mark, grade in match_flexible(line):
+                level, is_thesis, credit_point_override = code_info(unit_code)
+                unit = Unit(
+                    code=intern(unit_code),
+                    title=title,
+                    credit_points=credit_points if credit_point_override is None else credit_point_override,
+                    mark=mark,
+                    grade=grade and intern(grade),
+                    level=level,
+                    is_thesis=is_thesis,
+                    included_in_eihwam=True,  # Will be updated by rules engine
+                    exclusion_reason=None
+                )
+                if credit_point_override is not None:
+                    unit.raw_credit_points = credit_points
+                units.append(unit)
         
         return units
     
     def _determine_level(self, unit_code: str) -> int:
-        """Determine the level of a unit from its code."""
-        # USYD unit code format: 4 letters + 4 digits
-        # The first digit indicates the level:
-        # ENGG1810 -> level 1 (1000-level)
-        # MATH2021 -> level 2 (2000-level)
-        # AMME3700 -> level 3 (3000-level)
-        # ENGG4000 -> level 4 (4000-level)
-        
-        # Extract the first digit after the letters
-        level_match = re.search(r'[A-Z]{4}(\d)\d{3}$', unit_code)
-        if level_match:
-            level = int(level_match.group(1))
-            return level
-        
-        return 0
+        """Determine the level of a unit from its code (ENGG1810 -> 1)."""
+        return self.rules.level(unit_code)
     
     def apply_eihwam_rules(self, units: List[Dict]) -> List[Dict]:
         """Apply EIHWAM inclusion/exclusion rules."""
+        apply_rules = self.rules.apply_rules
         for unit in units:
-            # Exclude pass/fail only units
-            if unit['grade'] in ['P', 'F', 'CR', 'NC'] and unit['mark'] is None:
-                unit['included_in_eihwam'] = False
-                unit['exclusion_reason'] = 'Pass/Fail only unit'
-            
-            # Exclude DC (Discontinued)
-            elif unit['grade'] == 'DC':
-                unit['included_in_eihwam'] = False
-                unit['exclusion_reason'] = 'Discontinued unit'
-            
-            # Exclude W (Withdrawn)
-            elif unit['grade'] in ['W', 'AW', 'FW']:
-                unit['included_in_eihwam'] = False
-                unit['exclusion_reason'] = 'Withdrawn unit'
-            
-            # Exclude SR (Satisfactory Requirements) - typically for PEP units
-            elif unit['grade'] == 'SR':
-                unit['included_in_eihwam'] = False
-                unit['exclusion_reason'] = 'Satisfactory Requirements (PEP unit)'
-            
-            # Set mark to 0 for AF/DF
-            elif unit['grade'] in ['AF', 'DF']:
-                unit['mark'] = 0
-            
-            # Exclude 1000-level units (weight = 0)
-            elif unit['level'] == 1:
-                unit['included_in_eihwam'] = False
-                unit['exclusion_reason'] = '1000-level unit (weight = 0)'
-            
-            # Exclude units without credit points or marks
-            elif unit['credit_points'] is None or unit['mark'] is None:
-                unit['included_in_eihwam'] = False
-                unit['exclusion_reason'] = 'Missing credit points or mark'
-            
-            # Exclude 0 credit point units (like PEP units)
-            elif unit['credit_points'] == 0:
-                unit['included_in_eihwam'] = False
-                unit['exclusion_reason'] = '0 credit point unit'
-        
+            apply_rules(unit)
         return units
     
     def calculate_weights(self, units: List[Dict]) -> List[Dict]:
         """Calculate weights for each unit based on level and thesis status."""
+        apply_weights = self.rules.apply_weights
         for unit in units:
-            # EIHWAM weights (1000-level = 0)
-            if unit['level'] == 1:
-                unit['weight'] = 0
-            elif unit['level'] == 2:
-                unit['weight'] = 2
-            elif unit['level'] == 3:
-                unit['weight'] = 3
-            elif unit['level'] >= 4:
-                unit['weight'] = 4
-            else:
-                unit['weight'] = 0
-            
-            # Double weight for thesis units in EIHWAM
-            if unit['is_thesis']:
-                unit['weight'] *= 2
-            
-            # WAM weights (1000-level = 1)
-            if unit['level'] == 1:
-                unit['wam_weight'] = 1
-            elif unit['level'] == 2:
-                unit['wam_weight'] = 2
-            elif unit['level'] == 3:
-                unit['wam_weight'] = 3
-            elif unit['level'] >= 4:
-                unit['wam_weight'] = 4
-            else:
-                unit['wam_weight'] = 1
-            
-            # Double weight for thesis units in WAM
-            if unit['is_thesis']:
-                unit['wam_weight'] *= 2
-        
+            apply_weights(unit)
+        return units
+    
+    def classify_units(self, units: List[Dict]) -> List[Dict]:
+        """Apply rules and weights to each unit in one pass over the list."""
+        classify = self.rules.classify
+        for unit in units:
+            classify(unit)
         return units
     
     def calculate_eihwam(self, units: List[Dict]) -> Tuple[float, float]:
@@ -289,35 +590,120 @@ class TranscriptParser:
     
     def determine_honours_class(self, eihwam: float) -> str:
         """Determine honours class based on EIHWAM."""
-        if eihwam >= 75:
-            return "Class I"
-        elif eihwam >= 70:
-            return "Class II Division 1"
-        elif eihwam >= 65:
-            return "Class II Division 2"
-        else:
-            return "Class III"
+        return self.rules.honours_class(eihwam)
     
-    def parse_transcript(self, pdf_file) -> Dict:
-        """Main method to parse transcript and calculate EIHWAM."""
-        # Extract text from PDF
-        text = self.extract_text_from_pdf(pdf_file)
+    def parse_transcript(self, pdf_file, workers: Optional[int] = None,
+                         instrumentation: Optional[Instrumentation] = None,
+                         time_budget: Optional[float] = None) -> Dict:
+        """Main method to parse transcript and calculate EIHWAM.
+        
+        Pass an ``Instrumentation`` to collect per-stage and per-page
+        timings and counters; its report is emitted to its sinks at the end.
+        In ``layout`` mode units come from ``iter_table_rows``, falling back
+        to text extraction if no results table is found. With a
+        ``page_cache``, only new or changed pages are extracted and matched.
+        With a ``time_budget`` (seconds), extraction stops with
+        ``TranscriptRejected`` once it runs over.
+        """
+        instrumentation = instrumentation or NULL_INSTRUMENTATION
+        start = time.perf_counter()
+        started = time.monotonic()
+        
+        units = None
+        if self.layout:
+            units = self.units_from_table_rows(within_budget(
+                self.iter_table_rows(pdf_file, workers, instrumentation=instrumentation), time_budget, started))
+            if not units:
+                # No results table found (e.g. a scanned transcript): fall back to the text parser
+                instrumentation.count('layout_fallbacks')
+        if not units:
+            page_texts = within_budget(self.iter_page_texts(pdf_file, workers, instrumentation=instrumentation),
+                                       time_budget, started)
+            if self.page_cache is not None:
+                units = self.parse_units_by_page(page_texts, instrumentation)
+            else:
+                # Stream lines from the PDF straight into the unit matcher
+                units = self.parse_units((line for page_text in page_texts for line in page_text.split('\n')),
+                                         instrumentation)
         
-        # Parse units
-        units = self.parse_units(text)
+        if instrumentation.enabled:
+            # Extraction and matching interleave; matching is what extraction didn't use
+            streamed = time.perf_counter() - start
+            extraction = sum(instrumentation.stages.get(name, 0.0) for name in EXTRACTION_STAGES)
+            instrumentation.add_time('parse_units', max(streamed - extraction, 0.0))
         
-        # Apply rules
-        units = self.apply_eihwam_rules(units)
+        result = self.evaluate_units(units, instrumentation)
+        instrumentation.add_time('total', time.perf_counter() - start)
+        instrumentation.emit()
+        return result
+    
+    def parse_transcript_text(self, text: Union[str, Iterable[str]],
+                              instrumentation: Optional[Instrumentation] = None) -> Dict:
+        """Parse already-extracted transcript text and calculate EIHWAM."""
+        instrumentation = instrumentation or NULL_INSTRUMENTATION
+        start = time.perf_counter()
+        with instrumentation.stage('parse_units'):
+            units = self.parse_units(text, instrumentation)
+        result = self.evaluate_units(units, instrumentation)
+        instrumentation.add_time('total', time.perf_counter() - start)
+        instrumentation.emit()
+        return result
+    
+    def iter_student_results(self, pdf_file, pages_per_open: int = 32,
+                             instrumentation: Optional[Instrumentation] = None) -> Iterator[Dict]:
+        """Parse a PDF of concatenated transcripts, yielding one result per student.
         
-        # Calculate weights
-        units = self.calculate_weights(units)
+        Pages are read with ``iter_pages_bounded`` and split into students
+        by ``StudentBoundaryDetector``. Each student's result (as from
+        ``parse_transcript``, plus ``student_id``, ``first_page`` and
+        ``last_page``, 1-based) is yielded as soon as the next student's
+        first page is seen, and only the current student's lines are held,
+        so memory stays bounded however large the file is.
+        """
+        instrumentation = instrumentation or NULL_INSTRUMENTATION
+        detector = StudentBoundaryDetector()
+        lines: List[str] = []
+        student_id = first_page = last_page = None
+        for index, page_text in self.iter_pages_bounded(pdf_file, pages_per_open, instrumentation):
+            if detector.starts_new_student(page_text) and lines:
+                yield self._student_result(lines, student_id, first_page, last_page, instrumentation)
+                lines = []
+            if not lines:
+                first_page = index
+            lines.extend(page_text.split('\n'))
+            student_id, last_page = detector.student_id, index
+        if lines:
+            yield self._student_result(lines, student_id, first_page, last_page, instrumentation)
+        instrumentation.emit()
+    
+    def _student_result(self, lines: List[str], student_id: Optional[str], first_page: int, last_page: int,
+                        instrumentation) -> Dict:
+        instrumentation.count('students')
+        with instrumentation.stage('parse_students'):
+            result = self.parse_transcript_text(lines)
+        result['student_id'] = student_id
+        result['first_page'] = first_page + 1
+        result['last_page'] = last_page + 1
+        return result
+    
+    def evaluate_units(self, units: List[Dict], instrumentation=NULL_INSTRUMENTATION) -> Dict:
+        """Apply the EIHWAM rules to parsed units and summarise the result."""
+        # Apply rules and weights
+        with instrumentation.stage('classify_units'):
+            units = self.classify_units(units)
         
         # Calculate EIHWAM and WAM
-        eihwam, wam = self.calculate_eihwam(units)
+        with instrumentation.stage('calculate_eihwam'):
+            eihwam, wam = self.calculate_eihwam(units)
         
         # Determine honours class
         honours_class = self.determine_honours_class(eihwam)
         
+        if instrumentation.enabled:
+            for unit in units:
+                if not unit['included_in_eihwam']:
+                    instrumentation.count(f"excluded: {unit['exclusion_reason']}")
+        
         return {
             'units': units,
             'eihwam': eihwam,
@@ -0,0 +1,140 @@
+"""
+Cheap pre-flight checks and admission limits for uploaded PDFs
+"""
+
+import re
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional, TypeVar
+
+from pdf_buffer import BufferReader, pdf_view
+
+# Found on the first page of every USYD transcript (any one will do). Only the
+# headings ignore case: unit codes are upper case, or "June2024" would be one
+TRANSCRIPT_MARKERS = re.compile(
+    r'(?i:University\s+of\s+Sydney|Academic\s+Transcript|Student\s*(?:ID|Number))|\b[A-Z]{4}\d{4}\b'
+)
+
+# The header may follow up to 1 KB of junk, as PDF readers allow
+HEADER_WINDOW = 1024
+
+T = TypeVar('T')
+
+
+class TranscriptRejected(Exception):
+    """An upload refused before or during parsing.
+
+    ``reason`` is one of ``too_large``, ``not_pdf``, ``encrypted``,
+    ``unreadable``, ``too_many_pages``, ``not_transcript``, ``busy`` or
+    ``time_budget``; ``message`` is fit to show the user.
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.message = message
+
+    def __reduce__(self):
+        # Raised in pool workers too, so it must survive pickling
+        return type(self), (self.reason, self.message)
+
+
+class PreflightLimits:
+    """Limits an upload must meet before, and while, it is parsed.
+
+    ``max_bytes`` and ``max_pages`` are checked by ``preflight``;
+    ``time_budget`` (seconds) bounds page extraction in
+    ``parse_transcript``; ``max_concurrent`` caps the parses a front end
+    queues or runs at once. With ``require_markers``, a first page with a
+    text layer but no sign of being a USYD transcript is rejected. Any
+    limit can be None to disable it.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = 10 * 1024 * 1024, max_pages: Optional[int] = 50,
+                 time_budget: Optional[float] = 60, max_concurrent: Optional[int] = 8,
+                 require_markers: bool = True):
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.time_budget = time_budget
+        self.max_concurrent = max_concurrent
+        self.require_markers = require_markers
+
+
+def preflight(pdf_file, limits: Optional[PreflightLimits] = None) -> Dict:
+    """Check an upload in milliseconds, before any full extraction.
+
+    Sniffs the size and header, opens the document structure (which finds
+    password-protected files), counts pages up to ``max_pages``, and
+    extracts the first page only to look for transcript markers. Raises
+    ``TranscriptRejected`` on the first failed check; otherwise returns
+    ``bytes``, ``pages``, ``encrypted`` (readable without a password) and
+    ``text_layer`` (False for a scanned first page, whose markers can't be
+    checked without OCR).
+    """
+    # Imported on first use, as in pdf_parser
+    from pdfminer.pdfdocument import PDFDocument, PDFPasswordIncorrect
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    import pdfplumber
+
+    limits = limits or PreflightLimits()
+    data = pdf_view(pdf_file)
+    if limits.max_bytes is not None and len(data) > limits.max_bytes:
+        raise TranscriptRejected('too_large', f"File is larger than {limits.max_bytes // (1024 * 1024)} MB")
+    if b'%PDF-' not in data[:HEADER_WINDOW].tobytes():
+        raise TranscriptRejected('not_pdf', "File is not a PDF")
+
+    try:
+        document = PDFDocument(PDFParser(BufferReader(data)))
+        # Stop counting as soon as the limit is passed, however many pages the file claims
+        limit = limits.max_pages + 1 if limits.max_pages is not None else None
+        pages = sum(1 for _ in islice(PDFPage.create_pages(document), limit))
+    except PDFPasswordIncorrect:
+        raise TranscriptRejected('encrypted', "PDF is password protected")
+    except Exception as e:
+        raise TranscriptRejected('unreadable', f"PDF could not be read: {e}")
+    if pages == 0:
+        raise TranscriptRejected('unreadable', "PDF has no pages")
+    if limits.max_pages is not None and pages > limits.max_pages:
+        raise TranscriptRejected('too_many_pages', f"PDF has more than {limits.max_pages} pages")
+
+    try:
+        with pdfplumber.open(BufferReader(data), pages=[1]) as pdf:
+            first_page = pdf.pages[0].extract_text() or ''
+    except Exception as e:
+        raise TranscriptRejected('unreadable', f"PDF could not be read: {e}")
+    if first_page and limits.require_markers and not TRANSCRIPT_MARKERS.search(first_page):
+        raise TranscriptRejected('not_transcript', "This doesn't look like a USYD academic transcript")
+
+    return {
+        'bytes': len(data),
+        'pages': pages,
+        'encrypted': document.encryption is not None,
+        'text_layer': bool(first_page),
+    }
+
+
+def within_budget(items: Iterable[T], time_budget: Optional[float],
+                  started: Optional[float] = None) -> Iterator[T]:
+    """Yield ``items``, raising ``TranscriptRejected`` once ``time_budget`` seconds have passed.
+
+    The budget runs from ``started`` (a ``time.monotonic()`` reading; now
+    by default), so several passes over one document can share it. It is
+    checked between items (pages or rows), so work already underway
+    finishes first.
+    """
+    if time_budget is None:
+        yield from items
+        return
+    deadline = (time.monotonic() if started is None else started) + time_budget
+    iterator = iter(items)
+    try:
+        for item in iterator:
+            if time.monotonic() > deadline:
+                raise TranscriptRejected('time_budget', f"Took longer than {time_budget:g} seconds to read")
+            yield item
+    finally:
+        # Release the PDF (and any shared memory) held by the source generator
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
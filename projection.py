@@ -0,0 +1,208 @@
+"""
+Vectorized Monte Carlo projection of final EIHWAM and honours class
+"""
+
+import math
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from rules import RuleIndex, load_rule_index
+
+# Used for levels (and students) with too little history to fit
+DEFAULT_MEAN = 65.0
+DEFAULT_STD = 12.0
+# Narrower spreads than this come from too few marks rather than real consistency
+MIN_STD = 4.0
+
+# A remaining unit: its code (6 credit points), or a mapping with 'code' and optional 'credit_points'
+RemainingUnit = Union[str, Mapping]
+
+
+def _history_marks(units: Iterable[Mapping], rules: RuleIndex) -> List[Tuple[int, int]]:
+    """(level, mark) for every unit whose mark reflects performance.
+
+    That is units counted in EIHWAM, plus those left out only because of
+    their level (1000-level marks still say how a student performs).
+    Accepts parsed unit dicts or ``CohortStore.units()`` rows.
+    """
+    level_reasons = set(rules.excluded_levels.values())
+    history = []
+    for unit in units:
+        mark, credit_points = unit.get('mark'), unit.get('credit_points')
+        if mark is None or not credit_points or credit_points <= 0:
+            continue
+        included = unit.get('included_in_eihwam', unit.get('included'))
+        if included or unit.get('exclusion_reason') in level_reasons:
+            history.append((unit['level'], mark))
+    return history
+
+
+class MarkDistribution:
+    """Per-level mark distributions to sample remaining units from.
+
+    Marks at each level are normal with that level's mean and standard
+    deviation, rounded to whole marks and clipped to 0-100. ``spread`` is
+    the uncertainty in the student's overall standard: each scenario draws
+    one shift shared by all its units, so a good or bad semester moves
+    every remaining mark together rather than averaging out.
+    """
+
+    def __init__(self, levels: Mapping[int, Tuple[float, float]], mean: float = DEFAULT_MEAN,
+                 std: float = DEFAULT_STD, spread: float = 0.0):
+        # level -> (mean, standard deviation)
+        self.levels = dict(levels)
+        # Used for levels with no entry
+        self.mean = mean
+        self.std = std
+        self.spread = spread
+
+    @classmethod
+    def fit(cls, units: Iterable[Mapping], rules: Optional[RuleIndex] = None, min_units: int = 3,
+            prior: Optional['MarkDistribution'] = None) -> 'MarkDistribution':
+        """Fit to the marks of a student's weighted units, or a whole cohort's.
+
+        Levels with fewer than ``min_units`` marks use the fit over all
+        levels; with fewer than ``min_units`` marks in total, ``prior``
+        (e.g. a cohort fit) or the defaults are used instead.
+        """
+        rules = rules or load_rule_index()
+        history = _history_marks(units, rules)
+        if len(history) < min_units:
+            if prior is not None:
+                return prior
+            return cls({}, spread=DEFAULT_STD)
+
+        marks = np.array([mark for _, mark in history], dtype=float)
+        mean, std = float(marks.mean()), max(float(marks.std(ddof=1)), MIN_STD)
+        by_level: Dict[int, List[int]] = {}
+        for level, mark in history:
+            by_level.setdefault(level, []).append(mark)
+        levels = {
+            level: (float(np.mean(level_marks)), max(float(np.std(level_marks, ddof=1)), MIN_STD))
+            for level, level_marks in by_level.items() if len(level_marks) >= min_units
+        }
+        # Standard error of the mean: how far the student's true standard may be from their history
+        return cls(levels, mean, std, spread=std / math.sqrt(len(history)))
+
+    def parameters(self, levels: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean and standard deviation arrays for units at ``levels``."""
+        fitted = [self.levels.get(level, (self.mean, self.std)) for level in levels]
+        return (np.array([mean for mean, _ in fitted], dtype=float),
+                np.array([std for _, std in fitted], dtype=float))
+
+    def sample(self, levels: Sequence[int], scenarios: int, rng: np.random.Generator) -> np.ndarray:
+        """A (scenarios, units) array of whole marks for units at ``levels``."""
+        means, stds = self.parameters(levels)
+        marks = rng.standard_normal((scenarios, len(levels)))
+        marks *= stds
+        marks += means
+        if self.spread:
+            marks += rng.normal(0.0, self.spread, size=(scenarios, 1))
+        np.rint(marks, out=marks)
+        return np.clip(marks, 0, 100, out=marks)
+
+
+class EIHWAMProjection:
+    """Simulate final EIHWAM over many plausible mark sets for the remaining units.
+
+    Completed units are folded into one EIHWAM numerator and denominator
+    up front, as in ``WhatIfSimulator``. Each scenario then needs only its
+    sampled marks dotted with the remaining units' weight x credit points,
+    so every scenario is computed in one matrix-vector product.
+    """
+
+    def __init__(self, numerator: float, denominator: float, levels: Sequence[int],
+                 weighted_credit_points: Sequence[float], distribution: MarkDistribution,
+                 rules: Optional[RuleIndex] = None):
+        self.numerator = numerator
+        self.denominator = denominator
+        self.levels = list(levels)
+        self.weighted_credit_points = np.asarray(weighted_credit_points, dtype=float)
+        self.distribution = distribution
+        self.rules = rules or load_rule_index()
+
+    @classmethod
+    def from_units(cls, units: Iterable[Mapping], remaining: Iterable[RemainingUnit],
+                   distribution: Optional[MarkDistribution] = None,
+                   rules: Optional[RuleIndex] = None) -> 'EIHWAMProjection':
+        """Project from weighted units (as from ``calculate_weights``) and the units still to come.
+
+        ``distribution`` defaults to a fit of the student's own history.
+        """
+        rules = rules or load_rule_index()
+        units = list(units)
+        numerator = denominator = 0
+        for unit in units:
+            mark, credit_points = unit['mark'], unit['credit_points']
+            if unit['included_in_eihwam'] and mark is not None and credit_points and credit_points > 0:
+                numerator += unit['weight'] * credit_points * mark
+                denominator += unit['weight'] * credit_points
+
+        levels, weighted_credit_points = [], []
+        for entry in remaining:
+            code, credit_points = (entry, 6) if isinstance(entry, str) else (entry['code'],
+                                                                            entry.get('credit_points', 6))
+            level, is_thesis, credit_point_override = rules.code_info(code)
+            if credit_point_override is not None:
+                credit_points = credit_point_override
+            counts = credit_points and credit_points > 0 and level not in rules.excluded_levels
+            levels.append(level)
+            weighted_credit_points.append(rules.weights(level, is_thesis)[0] * credit_points if counts else 0)
+
+        distribution = distribution or MarkDistribution.fit(units, rules)
+        return cls(numerator, denominator, levels, weighted_credit_points, distribution, rules)
+
+    @classmethod
+    def from_simulator(cls, simulator, distribution: MarkDistribution) -> 'EIHWAMProjection':
+        """Project a ``WhatIfSimulator``'s pending units (those with no mark yet).
+
+        Completed units and hypothetical units with a mark are taken as given.
+        """
+        pending = [(unit, eihwam_weighted) for unit, eihwam_weighted, _ in simulator.hypothetical.values()
+                   if unit.mark is None]
+        return cls(simulator.eihwam_numerator, simulator.eihwam_denominator,
+                   [unit['level'] for unit, _ in pending], [weighted for _, weighted in pending],
+                   distribution, simulator.parser.rules)
+
+    def sample_eihwam(self, scenarios: int = 100_000, seed: Optional[int] = None) -> np.ndarray:
+        """Final EIHWAM of each scenario, rounded to 2 decimal places as reported."""
+        rng = np.random.default_rng(seed)
+        denominator = self.denominator + self.weighted_credit_points.sum()
+        if denominator <= 0:
+            return np.zeros(scenarios)
+        if not self.levels:
+            return np.full(scenarios, round(self.numerator / denominator, 2))
+        marks = self.distribution.sample(self.levels, scenarios, rng)
+        eihwam = (marks @ self.weighted_credit_points + self.numerator) / denominator
+        # NumPy rounds a few exact halves differently from round(); immaterial to probabilities
+        return np.round(eihwam, 2)
+
+    def project(self, scenarios: int = 100_000, seed: Optional[int] = None) -> Dict:
+        """Summarise ``scenarios`` simulated outcomes.
+
+        Returns the current EIHWAM, the mean, standard deviation and 5th to
+        95th percentiles of the final EIHWAM, and the probability of each
+        honours class (highest first) under ``determine_honours_class``'s
+        thresholds.
+        """
+        eihwam = self.sample_eihwam(scenarios, seed)
+        probabilities = {}
+        reached = 0.0
+        for threshold, honours_class in self.rules.honours_thresholds:
+            at_least = float(np.count_nonzero(eihwam >= threshold)) / scenarios
+            probabilities[honours_class] = round(at_least - reached, 4)
+            reached = at_least
+        probabilities[self.rules.lowest_honours_class] = round(1.0 - reached, 4)
+
+        percentiles = np.percentile(eihwam, [5, 25, 50, 75, 95])
+        return {
+            'scenarios': scenarios,
+            'remaining_units': len(self.levels),
+            'current_eihwam': round(self.numerator / self.denominator, 2) if self.denominator > 0 else 0.0,
+            'mean': round(float(eihwam.mean()), 2),
+            'std': round(float(eihwam.std()), 2),
+            'percentiles': {f"p{q}": round(float(value), 2) for q, value in zip((5, 25, 50, 75, 95), percentiles)},
+            'class_probabilities': probabilities,
+            'most_likely_class': max(probabilities, key=probabilities.get),
+        }
@@ -0,0 +1,250 @@
+"""
+Per-handbook and per-degree EIHWAM rule sets, compiled once and cached by version
+"""
+
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pdf_parser import TranscriptParser
+from rules import RuleIndex
+from units import Unit, printed_credit_points
+
+DEFAULT_RULE_SETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rule_sets.json')
+
+# Degree line on a transcript header, e.g. "Bachelor of Engineering (Honours)"
+DEGREE_LINE = re.compile(r'^\s*((?:Bachelor|Master|Doctor)\b.*?)\s*$')
+
+
+def transcript_profile(units: Iterable, lines: Iterable[str] = ()) -> Tuple[Optional[str], Optional[int]]:
+    """Guess (degree, handbook year) from a parsed transcript.
+
+    The degree is the first "Bachelor of ..." style header line; the
+    handbook year is the year of the earliest unit, i.e. the year the
+    student commenced.
+    """
+    degree = None
+    for line in lines:
+        match = DEGREE_LINE.match(line)
+        if match:
+            degree = match.group(1)
+            break
+    years = [int(unit['year']) for unit in units if unit.get('year')]
+    return degree, min(years) if years else None
+
+
+class RuleSetRegistry:
+    """Declarative rule-set definitions from ``rule_sets.json``.
+
+    Each definition names a base ``rules_file`` (or ``extends`` another rule
+    set) and may override any top-level key of it under ``rules``, e.g. a
+    different ``honours_classes`` table for a combined degree. It applies to
+    the ``handbook_years`` range (null bounds are open) and ``degrees``
+    listed (empty means any degree). A definition marked ``"verified":
+    false`` is never selected automatically; it applies only when asked
+    for by id.
+
+    ``compile`` turns a definition into a ``RuleIndex``. Compiled indexes
+    are cached by the digest of the fully merged definition, so editing
+    ``rule_sets.json`` or a rules file produces a new version while
+    unchanged rule sets are never rebuilt. Evaluation reuses parsed units:
+    the PDF is read once however many rule sets a transcript is scored
+    against.
+    """
+
+    def __init__(self, path: str = DEFAULT_RULE_SETS_PATH, max_compiled: int = 32):
+        self.path = os.path.abspath(path)
+        self.max_compiled = max_compiled
+        self._definitions: Dict[str, Dict] = {}
+        self._stamp = None
+        self._compiled: 'OrderedDict[str, TranscriptParser]' = OrderedDict()
+        # rule set id -> (mtimes of every file its definition was built from, version)
+        self._versions: Dict[str, Tuple[tuple, str]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """(Re)read the definitions file if it changed."""
+        stamp = os.stat(self.path).st_mtime_ns
+        if stamp == self._stamp:
+            return
+        with open(self.path, 'r') as f:
+            entries = json.load(f)['rule_sets']
+        definitions = OrderedDict()
+        for entry in entries:
+            if entry['id'] in definitions:
+                raise ValueError(f"Duplicate rule set id {entry['id']!r} in {self.path}")
+            definitions[entry['id']] = entry
+        self._definitions = definitions
+        self._stamp = stamp
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            self._load()
+            return list(self._definitions)
+
+    def definition(self, rule_set_id: str) -> Dict:
+        """The rules-file JSON for ``rule_set_id`` with its base and overrides merged."""
+        with self._lock:
+            self._load()
+            return self._merged(rule_set_id, (), [])
+
+    def _merged(self, rule_set_id: str, seen: Tuple[str, ...], files: List[str]) -> Dict:
+        if rule_set_id in seen:
+            raise ValueError(f"Rule set {rule_set_id!r} extends itself")
+        try:
+            entry = self._definitions[rule_set_id]
+        except KeyError:
+            raise KeyError(f"Unknown rule set {rule_set_id!r}") from None
+
+        base_dir = os.path.dirname(self.path)
+        if 'extends' in entry:
+            merged = self._merged(entry['extends'], seen + (rule_set_id,), files)
+        else:
+            rules_path = os.path.join(base_dir, entry['rules_file'])
+            files.append(rules_path)
+            with open(rules_path, 'r') as f:
+                merged = json.load(f)
+            if 'thesis_codes' not in merged:
+                # Resolve now so the digest changes when the thesis list does
+                thesis_path = os.path.join(base_dir, merged.pop('thesis_codes_file', 'thesis_codes.json'))
+                files.append(thesis_path)
+                with open(thesis_path, 'r') as f:
+                    merged['thesis_codes'] = json.load(f)['thesis_units']
+        merged.update(copy.deepcopy(entry.get('rules', {})))
+        merged['name'] = entry.get('name', rule_set_id)
+        return merged
+
+    def compile(self, rule_set_id: str) -> RuleIndex:
+        """The compiled rule index for ``rule_set_id``."""
+        return self.parser(rule_set_id).rules
+
+    def parser(self, rule_set_id: str) -> TranscriptParser:
+        """A parser bound to ``rule_set_id``'s rules (compiled once per version)."""
+        with self._lock:
+            self._load()
+            cached = self._versions.get(rule_set_id)
+            if cached is not None and cached[0][0] == self._stamp and all(
+                    os.stat(path).st_mtime_ns == stamp for path, stamp in cached[0][1:]):
+                parser = self._compiled.get(cached[1])
+                if parser is not None:
+                    self._compiled.move_to_end(cached[1])
+                    return parser
+
+            files = []
+            merged = self._merged(rule_set_id, (), files)
+            stamps = (self._stamp,) + tuple((path, os.stat(path).st_mtime_ns) for path in files)
+            version = hashlib.sha256(json.dumps(merged, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+            self._versions[rule_set_id] = (stamps, version)
+            parser = self._compiled.get(version)
+            if parser is None:
+                rules = RuleIndex.from_dict(merged, os.path.dirname(self.path))
+                parser = self._compiled[version] = TranscriptParser(rules=rules)
+                while len(self._compiled) > self.max_compiled:
+                    self._compiled.popitem(last=False)
+            else:
+                self._compiled.move_to_end(version)
+            return parser
+
+    def select(self, handbook_year: Optional[int] = None, degree: Optional[str] = None) -> str:
+        """Id of the rule set that applies to a student.
+
+        Degree-specific rule sets beat generic ones, then the narrowest
+        handbook-year range wins; remaining ties go to the earlier entry.
+        With no handbook year, ranges aren't compared, so the earlier entry
+        (the general rule set) wins rather than a narrow historical one.
+        Unverified rule sets are skipped.
+        """
+        with self._lock:
+            self._load()
+            definitions = list(self._definitions.values())
+
+        candidates = []
+        for order, entry in enumerate(definitions):
+            if not entry.get('verified', True):
+                continue
+            first, last = entry.get('handbook_years', [None, None])
+            if handbook_year is not None and ((first is not None and handbook_year < first)
+                                              or (last is not None and handbook_year > last)):
+                continue
+            degrees = [name.lower() for name in entry.get('degrees', [])]
+            if degrees and not (degree and any(name in degree.lower() for name in degrees)):
+                continue
+            span = 0
+            if handbook_year is not None:
+                span = (last if last is not None else 9999) - (first if first is not None else 0)
+            candidates.append((not degrees, span, order, entry['id']))
+        if not candidates:
+            raise LookupError(f"No rule set applies to degree {degree!r}, handbook year {handbook_year}")
+        return min(candidates)[3]
+
+    # Evaluation
+
+    @staticmethod
+    def _fresh_units(units: Iterable, rules: RuleIndex) -> List[Unit]:
+        """Unclassified copies of parsed units, with thesis status and overrides from ``rules``.
+
+        Credit points start from the printed value (see
+        ``units.printed_credit_points``), so results don't depend on which
+        rules the units were parsed or scored under before.
+        """
+        fresh = []
+        for unit in units:
+            level, is_thesis, credit_point_override = rules.code_info(unit['code'])
+            raw_credit_points = printed_credit_points(unit)
+            copy_unit = Unit(
+                code=unit['code'],
+                title=unit['title'],
+                credit_points=raw_credit_points if credit_point_override is None else credit_point_override,
+                mark=unit['mark'],
+                grade=unit['grade'],
+                level=level,
+                is_thesis=is_thesis,
+            )
+            for field in ('year', 'session'):
+                if unit.get(field) is not None:
+                    copy_unit[field] = unit[field]
+            if credit_point_override is not None:
+                copy_unit.raw_credit_points = raw_credit_points
+            fresh.append(copy_unit)
+        return fresh
+
+    def evaluate(self, units: Iterable, rule_set_id: Optional[str] = None, degree: Optional[str] = None,
+                 lines: Iterable[str] = ()) -> Dict:
+        """Score parsed units under one rule set (by default, the one that applies to them).
+
+        ``units`` should come from ``parse_units`` (before rules are applied):
+        rules that fix a mark, such as AF/DF -> 0, can't be undone.
+        """
+        units = list(units)
+        if rule_set_id is None:
+            profile_degree, handbook_year = transcript_profile(units, lines)
+            rule_set_id = self.select(handbook_year, degree or profile_degree)
+        parser = self.parser(rule_set_id)
+        result = parser.evaluate_units(self._fresh_units(units, parser.rules))
+        result['rule_set'] = rule_set_id
+        result['rules_version'] = parser.rules_version
+        return result
+
+    def compare(self, units: Iterable, rule_set_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+        """Score the same parsed units under several rule sets (default: all of them)."""
+        units = list(units)
+        return {
+            rule_set_id: self.evaluate(units, rule_set_id)
+            for rule_set_id in (rule_set_ids or self.ids())
+        }
+
+
+_default_registry: Optional[RuleSetRegistry] = None
+
+
+def default_registry() -> RuleSetRegistry:
+    """The process-wide registry for ``rule_sets.json``."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = RuleSetRegistry()
+    return _default_registry
@@ -0,0 +1,265 @@
+"""
+Precomputed EIHWAM rule index, loaded from a JSON rules file
+"""
+
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Resolved against this file so the parser works from any working directory
+THESIS_CODES_PATH = os.path.join(_HERE, 'thesis_codes.json')
+DEFAULT_RULES_PATH = os.path.join(_HERE, 'eihwam_rules.json')
+
+# Minimum EIHWAM for each honours class, highest first, for rules files that don't set their own
+HONOURS_THRESHOLDS = [
+    (75, "Class I"),
+    (70, "Class II Division 1"),
+    (65, "Class II Division 2"),
+]
+LOWEST_HONOURS_CLASS = "Class III"
+
+# Checks every rule set ends with, after its grade and level rules
+MISSING_VALUES_REASON = 'Missing credit points or mark'
+ZERO_CREDIT_POINTS_REASON = '0 credit point unit'
+
+
+@lru_cache(maxsize=None)
+def load_thesis_codes(path: str = THESIS_CODES_PATH) -> Tuple[str, ...]:
+    """Read the thesis unit codes once per process."""
+    with open(path, 'r') as f:
+        return tuple(json.load(f)['thesis_units'])
+
+
+class GradeRule:
+    """One entry of ``grade_rules``: exclude a unit, or fix its mark, by grade."""
+
+    __slots__ = ('grades', 'without_mark', 'exclude', 'mark')
+
+    def __init__(self, grades: Sequence[str], without_mark: bool = False, exclude: Optional[str] = None,
+                 mark: Optional[int] = None):
+        if (exclude is None) == (mark is None):
+            raise ValueError(f"Grade rule for {list(grades)} needs exactly one of 'exclude' or 'mark'")
+        self.grades = tuple(grades)
+        self.without_mark = without_mark
+        self.exclude = exclude
+        self.mark = mark
+
+
+class RuleIndex:
+    """EIHWAM rules compiled into lookup tables.
+
+    Built once from a rules file (see ``eihwam_rules.json``), then every
+    unit is classified with constant-time lookups in a single pass:
+
+    - thesis codes are a frozenset;
+    - ``credit_point_overrides`` map a code prefix (e.g. ENGP) to fixed
+      credit points, looked up with one dict hit per prefix length;
+    - ``grade_rules`` become a grade -> rules dict, applied in file order;
+    - levels index into EIHWAM and WAM weight arrays (levels past the end
+      use the last weight) and an excluded-level table.
+
+    Rules are checked in the order the original if/elif chain used: grade
+    rules, excluded levels, missing credit points or mark, 0 credit points.
+    The first rule that matches decides, so a grade rule that fixes the
+    mark (AF/DF) also skips the later checks.
+    """
+
+    def __init__(self, thesis_codes: Sequence[str], grade_rules: Sequence[GradeRule],
+                 excluded_levels: Mapping[int, str], eihwam_weights: Sequence[int], wam_weights: Sequence[int],
+                 thesis_multiplier: int = 2, credit_point_overrides: Optional[Mapping[str, int]] = None,
+                 honours_thresholds: Sequence[Tuple[float, str]] = HONOURS_THRESHOLDS,
+                 lowest_honours_class: str = LOWEST_HONOURS_CLASS, name: str = '', version: Optional[str] = None):
+        self.name = name
+        self.thesis_codes: FrozenSet[str] = frozenset(thesis_codes)
+        self.grade_rules: List[GradeRule] = list(grade_rules)
+        self.excluded_levels: Dict[int, str] = dict(excluded_levels)
+        self.eihwam_weights: Tuple[int, ...] = tuple(eihwam_weights)
+        self.wam_weights: Tuple[int, ...] = tuple(wam_weights)
+        self.thesis_multiplier = thesis_multiplier
+        self.credit_point_overrides: Dict[str, int] = dict(credit_point_overrides or {})
+        # Highest threshold first, so the first one reached is the class awarded
+        self.honours_thresholds: List[Tuple[float, str]] = sorted(
+            ((threshold, honours_class) for threshold, honours_class in honours_thresholds),
+            key=lambda entry: entry[0], reverse=True)
+        self.lowest_honours_class = lowest_honours_class
+        self.version = version or self._digest()
+
+        # grade -> rules for that grade, in file order
+        self._by_grade: Dict[str, Tuple[GradeRule, ...]] = {}
+        for rule in self.grade_rules:
+            for grade in rule.grades:
+                self._by_grade[grade] = self._by_grade.get(grade, ()) + (rule,)
+        # Overrides keyed by prefix length, so a lookup is one slice + dict hit per length
+        self._override_lengths = sorted({len(prefix) for prefix in self.credit_point_overrides}, reverse=True)
+        # unit code -> (level, is_thesis, credit point override), filled as codes are seen
+        self._code_info: Dict[str, Tuple[int, bool, Optional[int]]] = {}
+        # (level, is_thesis) -> (EIHWAM weight, WAM weight) for every level a code can have
+        self._weights = {(level, thesis): self._compute_weights(level, thesis)
+                         for level in range(10) for thesis in (False, True)}
+
+    def _digest(self) -> str:
+        data = {
+            'thesis_codes': sorted(self.thesis_codes),
+            'grade_rules': [[rule.grades, rule.without_mark, rule.exclude, rule.mark] for rule in self.grade_rules],
+            'excluded_levels': sorted(self.excluded_levels.items()),
+            'weights': [self.eihwam_weights, self.wam_weights, self.thesis_multiplier],
+            'credit_point_overrides': sorted(self.credit_point_overrides.items()),
+            'honours': [self.honours_thresholds, self.lowest_honours_class],
+        }
+        return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def from_dict(cls, data: Mapping, base_dir: str = _HERE) -> 'RuleIndex':
+        """Build an index from parsed rules-file JSON; relative paths resolve against ``base_dir``."""
+        if 'thesis_codes' in data:
+            thesis_codes = data['thesis_codes']
+        else:
+            thesis_codes = load_thesis_codes(os.path.join(base_dir, data.get('thesis_codes_file', 'thesis_codes.json')))
+        weights = data['level_weights']
+        honours = data.get('honours_classes', {})
+        return cls(
+            thesis_codes=thesis_codes,
+            grade_rules=[GradeRule(**rule) for rule in data.get('grade_rules', [])],
+            excluded_levels={int(level): reason for level, reason in data.get('excluded_levels', {}).items()},
+            eihwam_weights=weights['eihwam'],
+            wam_weights=weights['wam'],
+            thesis_multiplier=data.get('thesis_multiplier', 2),
+            credit_point_overrides=data.get('credit_point_overrides'),
+            honours_thresholds=honours.get('thresholds', HONOURS_THRESHOLDS),
+            lowest_honours_class=honours.get('lowest', LOWEST_HONOURS_CLASS),
+            name=data.get('name', ''),
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> 'RuleIndex':
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f), os.path.dirname(os.path.abspath(path)))
+
+    # Per-code lookups
+
+    @staticmethod
+    def level(unit_code: str) -> int:
+        """The level digit of a unit code (ENGG1810 -> 1), or 0 if it has none."""
+        digit = unit_code[4:5]
+        return int(digit) if digit.isdigit() else 0
+
+    def code_info(self, unit_code: str) -> Tuple[int, bool, Optional[int]]:
+        """(level, is_thesis, credit point override or None) for a unit code, memoised."""
+        info = self._code_info.get(unit_code)
+        if info is None:
+            info = self._code_info[unit_code] = (
+                self.level(unit_code), unit_code in self.thesis_codes, self.credit_points(unit_code, None))
+        return info
+
+    def is_thesis(self, unit_code: str) -> bool:
+        return unit_code in self.thesis_codes
+
+    def credit_points(self, unit_code: str, credit_points: Optional[int]) -> Optional[int]:
+        """Credit points after any prefix override (ENGP units count as 0 CP)."""
+        overrides = self.credit_point_overrides
+        for length in self._override_lengths:
+            override = overrides.get(unit_code[:length])
+            if override is not None:
+                return override
+        return credit_points
+
+    def weights(self, level: int, is_thesis: bool) -> Tuple[int, int]:
+        """(EIHWAM weight, WAM weight) for a unit."""
+        weights = self._weights.get((level, is_thesis))
+        return weights if weights is not None else self._compute_weights(level, is_thesis)
+
+    def _compute_weights(self, level: int, is_thesis: bool) -> Tuple[int, int]:
+        eihwam_weight = self.eihwam_weights[min(max(level, 0), len(self.eihwam_weights) - 1)]
+        wam_weight = self.wam_weights[min(max(level, 0), len(self.wam_weights) - 1)]
+        if is_thesis:
+            return eihwam_weight * self.thesis_multiplier, wam_weight * self.thesis_multiplier
+        return eihwam_weight, wam_weight
+
+    def honours_class(self, eihwam: float) -> str:
+        for threshold, honours_class in self.honours_thresholds:
+            if eihwam >= threshold:
+                return honours_class
+        return self.lowest_honours_class
+
+    # Whole-unit classification
+
+    def grade_rule(self, grade: Optional[str], mark: Optional[int]) -> Optional[GradeRule]:
+        """The first grade rule that applies to a unit with ``grade`` and ``mark``, if any."""
+        for rule in self._by_grade.get(grade, ()):
+            if rule.without_mark and mark is not None:
+                continue
+            return rule
+        return None
+
+    def apply_rules(self, unit):
+        """Set ``included_in_eihwam``/``exclusion_reason`` (and fixed marks) on one unit.
+
+        Credit point overrides are applied when units are parsed, not here.
+        """
+        mark = unit['mark']
+        reason = None
+        rule = self.grade_rule(unit['grade'], mark)
+        if rule is not None:
+            if rule.exclude is not None:
+                reason = rule.exclude
+            else:
+                unit['mark'] = rule.mark
+        else:
+            reason = self.excluded_levels.get(unit['level'])
+            if reason is None:
+                credit_points = unit['credit_points']
+                if credit_points is None or mark is None:
+                    reason = MISSING_VALUES_REASON
+                elif credit_points == 0:
+                    reason = ZERO_CREDIT_POINTS_REASON
+
+        if reason is not None:
+            unit['included_in_eihwam'] = False
+            unit['exclusion_reason'] = reason
+        return unit
+
+    def apply_weights(self, unit):
+        """Set ``weight`` and ``wam_weight`` on one unit."""
+        unit['weight'], unit['wam_weight'] = self.weights(unit['level'], unit['is_thesis'])
+        return unit
+
+    def classify(self, unit):
+        """Apply rules and weights to one unit in a single pass."""
+        self.apply_rules(unit)
+        return self.apply_weights(unit)
+
+
+_loaded: Dict[str, Tuple[tuple, RuleIndex]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_rule_index(path: str = DEFAULT_RULES_PATH) -> RuleIndex:
+    """Load a rules file once per process.
+
+    The index is rebuilt when the rules file or its thesis-code file changes
+    on disk, so calling this again (as ``TranscriptParser.reload_rules``
+    does) picks up edited rules without a restart.
+    """
+    path = os.path.abspath(path)
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and all(os.stat(file_path).st_mtime_ns == stamp for file_path, stamp in cached[0]):
+            return cached[1]
+
+        stamps = [(path, os.stat(path).st_mtime_ns)]
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if 'thesis_codes' not in data:
+            thesis_path = os.path.join(os.path.dirname(path), data.get('thesis_codes_file', 'thesis_codes.json'))
+            stamps.append((thesis_path, os.stat(thesis_path).st_mtime_ns))
+            if cached is not None:
+                # The thesis list may be what changed
+                load_thesis_codes.cache_clear()
+        index = RuleIndex.from_dict(data, os.path.dirname(path))
+        _loaded[path] = (tuple(stamps), index)
+        return index
@@ -0,0 +1,162 @@
+"""
+Incremental what-if EIHWAM simulator
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+from pdf_parser import TranscriptParser
+from units import Unit
+
+
+class WhatIfSimulator:
+    """Project EIHWAM and WAM with hypothetical units, updated in O(1).
+
+    The simulator keeps running numerator/denominator sums for EIHWAM and
+    WAM. Completed units are folded in once; hypothetical units can then be
+    added, changed or removed, each touching only its own contribution.
+    A hypothetical unit with ``mark=None`` is pending: it counts towards
+    nothing until given a mark, and ``required_mark`` solves for the mark
+    the pending units need.
+    """
+
+    def __init__(self, parser: TranscriptParser, units: Iterable = ()):
+        self.parser = parser
+        self.eihwam_numerator = 0
+        self.eihwam_denominator = 0
+        self.wam_numerator = 0
+        self.wam_denominator = 0
+        # key -> (unit, EIHWAM weight x CP, WAM weight x CP)
+        self.hypothetical: Dict[str, tuple] = {}
+        for unit in units:
+            self._add_to_sums(unit.get('mark'), *self._weighted_credit_points(unit))
+
+    @classmethod
+    def from_result(cls, parser: TranscriptParser, result: Dict) -> 'WhatIfSimulator':
+        """Start from a ``parse_transcript`` result."""
+        return cls(parser, result['units'])
+
+    def _weighted_credit_points(self, unit) -> tuple:
+        """Return the (EIHWAM, WAM) weight x credit points a weighted unit carries."""
+        credit_points = unit['credit_points']
+        if credit_points is None or credit_points <= 0 or unit['mark'] is None:
+            return 0, 0
+        eihwam_weighted = unit['weight'] * credit_points if unit['included_in_eihwam'] else 0
+        return eihwam_weighted, unit['wam_weight'] * credit_points
+
+    def _add_to_sums(self, mark: Optional[int], eihwam_weighted: int, wam_weighted: int, sign: int = 1):
+        if mark is None:
+            return
+        self.eihwam_numerator += sign * eihwam_weighted * mark
+        self.eihwam_denominator += sign * eihwam_weighted
+        self.wam_numerator += sign * wam_weighted * mark
+        self.wam_denominator += sign * wam_weighted
+
+    def _classify(self, code: str, credit_points: int, grade: Optional[str], title: str) -> Unit:
+        """Run a hypothetical unit through the parser's rules and weights."""
+        unit = Unit(
+            code=code,
+            title=title,
+            credit_points=self.parser.rules.credit_points(code, credit_points),
+            # A placeholder mark so pending units are classified as if marked
+            mark=0,
+            grade=grade,
+            level=self.parser.rules.level(code),
+            is_thesis=code in self.parser.thesis_codes,
+        )
+        return self.parser.rules.classify(unit)
+
+    def _fixed_mark(self, grade: Optional[str], mark: Optional[int]) -> Optional[int]:
+        """``mark``, unless a grade rule fixes the mark for ``grade`` (AF/DF -> 0 by default)."""
+        # Classified with the placeholder mark, so rules for unmarked units never apply here either
+        rule = self.parser.rules.grade_rule(grade, 0)
+        if rule is None or rule.exclude is not None:
+            return mark
+        return rule.mark
+
+    def add_unit(self, key: str, code: str, credit_points: int = 6, mark: Optional[int] = None,
+                 grade: Optional[str] = None, title: str = 'Hypothetical unit'):
+        """Add (or replace) a hypothetical unit under ``key``."""
+        if key in self.hypothetical:
+            self.remove_unit(key)
+        unit = self._classify(code, credit_points, grade, title)
+        eihwam_weighted, wam_weighted = self._weighted_credit_points(unit)
+        unit.mark = self._fixed_mark(grade, mark)
+        self.hypothetical[key] = (unit, eihwam_weighted, wam_weighted)
+        self._add_to_sums(unit.mark, eihwam_weighted, wam_weighted)
+
+    def set_mark(self, key: str, mark: Optional[int]):
+        """Change the mark of a hypothetical unit (None makes it pending)."""
+        unit, eihwam_weighted, wam_weighted = self.hypothetical[key]
+        self._add_to_sums(unit.mark, eihwam_weighted, wam_weighted, sign=-1)
+        unit.mark = self._fixed_mark(unit.grade, mark)
+        self._add_to_sums(unit.mark, eihwam_weighted, wam_weighted)
+
+    def remove_unit(self, key: str):
+        """Remove a hypothetical unit."""
+        unit, eihwam_weighted, wam_weighted = self.hypothetical.pop(key)
+        self._add_to_sums(unit.mark, eihwam_weighted, wam_weighted, sign=-1)
+
+    @property
+    def eihwam(self) -> float:
+        if self.eihwam_denominator <= 0:
+            return 0.0
+        return round(self.eihwam_numerator / self.eihwam_denominator, 2)
+
+    @property
+    def wam(self) -> float:
+        if self.wam_denominator <= 0:
+            return 0.0
+        return round(self.wam_numerator / self.wam_denominator, 2)
+
+    @property
+    def honours_class(self) -> str:
+        return self.parser.determine_honours_class(self.eihwam)
+
+    def _pending_weighted_credit_points(self, metric: str) -> int:
+        index = 1 if metric == 'eihwam' else 2
+        return sum(entry[index] for entry in self.hypothetical.values() if entry[0].mark is None)
+
+    def _projected(self, metric: str, mark: int, pending_weighted: int) -> float:
+        if metric == 'eihwam':
+            numerator, denominator = self.eihwam_numerator, self.eihwam_denominator
+        else:
+            numerator, denominator = self.wam_numerator, self.wam_denominator
+        denominator += pending_weighted
+        if denominator <= 0:
+            return 0.0
+        return round((numerator + pending_weighted * mark) / denominator, 2)
+
+    def required_mark(self, target: float, metric: str = 'eihwam') -> Optional[int]:
+        """Minimum whole mark every pending unit needs for ``metric`` to reach ``target``.
+
+        Solves (N + m·P) / (D + P) >= target for m in closed form, where P is
+        the weighted credit points of the pending units, then checks the
+        neighbouring whole marks against the rounded result. Returns 0 if the
+        target is already secured, or None if it cannot be reached with marks
+        up to 100 (or no pending unit counts towards ``metric``).
+        """
+        pending_weighted = self._pending_weighted_credit_points(metric)
+        if pending_weighted <= 0:
+            return None
+        if metric == 'eihwam':
+            numerator, denominator = self.eihwam_numerator, self.eihwam_denominator
+        else:
+            numerator, denominator = self.wam_numerator, self.wam_denominator
+
+        # Results are rounded to 2 decimal places before comparison
+        effective_target = target - 0.005
+        mark = math.ceil((effective_target * (denominator + pending_weighted) - numerator) / pending_weighted)
+        mark = min(max(mark, 0), 101)
+        while mark > 0 and self._projected(metric, mark - 1, pending_weighted) >= target:
+            mark -= 1
+        while mark <= 100 and self._projected(metric, mark, pending_weighted) < target:
+            mark += 1
+        return mark if mark <= 100 else None
+
+    def required_marks(self, metric: str = 'eihwam') -> Dict[str, Optional[int]]:
+        """Minimum mark the pending units need for each honours class."""
+        return {
+            honours_class: self.required_mark(threshold, metric)
+            for threshold, honours_class in self.parser.rules.honours_thresholds
+        }
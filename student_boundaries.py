@@ -0,0 +1,37 @@
+"""
+Detect where one student's transcript ends and the next begins in a merged PDF
+"""
+
+import re
+from typing import Optional
+
+# "Student ID: 512345678", "Student Number 512345678", "SID: 512345678"
+STUDENT_ID = re.compile(r'\b(?:Student\s*(?:ID|Number|No\.?)|SID)\s*[:#]?\s*(\d{6,10})\b', re.IGNORECASE)
+
+# "Page 1 of 3"
+PAGE_NUMBER = re.compile(r'\bPage\s+(\d+)\s+of\s+\d+\b', re.IGNORECASE)
+
+
+class StudentBoundaryDetector:
+    """Decide, page by page, whether a page starts a new student's transcript.
+
+    A page starts a new transcript when it names a different student ID
+    from the current one, or when it is numbered "Page 1 of N". Pages
+    with neither belong to the current transcript, so exports without
+    IDs or page numbers are treated as a single student.
+    """
+
+    def __init__(self):
+        self.student_id: Optional[str] = None
+
+    def starts_new_student(self, page_text: str) -> bool:
+        """Return whether ``page_text`` begins a new transcript, updating ``student_id``."""
+        match = STUDENT_ID.search(page_text)
+        page_id = match.group(1) if match else None
+        page_number = PAGE_NUMBER.search(page_text)
+        first_page = page_number is not None and page_number.group(1) == '1'
+
+        new_student = first_page or (page_id is not None and page_id != self.student_id)
+        if new_student or page_id is not None:
+            self.student_id = page_id
+        return new_student
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Synthetic USYD-format transcript generator for benchmarks and corpus testing
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from typing import List, Optional, Sequence, Union
+
+SUBJECTS = ['AMME', 'BMET', 'CHNG', 'CIVL', 'COMP', 'ELEC', 'ENGG', 'MATH', 'MECH', 'PHYS']
+TITLES = [
+    'Introduction to Engineering Computing', 'Engineering Mechanics', 'Linear Mathematics',
+    'Fluid Mechanics', 'Signals and Systems', 'Materials 1', 'Design 3 - Advanced',
+    'Professional Engagement', 'Thermodynamics and Heat Transfer', 'Control Systems',
+    'Engineering Project Management and Professional Practice in a Global Context',
+]
+SESSIONS = ['S1C', 'S2C', 'S1CIAP', 'S2CIAP', 'WIN', 'SUM']
+
+# Every grade the rules engine treats specially, plus ordinary graded results.
+# (grade, mark range or None for "no mark printed")
+GRADES = [
+    ('HD', (85, 100)), ('D', (75, 84)), ('CR', (65, 74)), ('P', (50, 64)), ('F', (0, 49)),
+    ('P', None), ('F', None), ('CR', None), ('NC', None),
+    ('AF', (0, 49)), ('DF', (0, 49)),
+    ('DC', (0, 0)), ('W', (0, 0)), ('AW', (0, 0)), ('FW', (0, 0)),
+    ('SR', (0, 0)),
+]
+
+LINES_PER_PAGE = 40
+
+# Left edge (points) of each results-table column when rendered as a table:
+# year, session, unit code, title, mark, grade, credit points
+TABLE_COLUMNS = (36, 66, 106, 156, 420, 460, 490)
+# Titles longer than this wrap onto a continuation row in table layout
+TABLE_TITLE_CHARS = 48
+
+# A rendered line: plain text, or a row of table cells (one per TABLE_COLUMNS entry)
+Line = Union[str, Sequence[str]]
+_THESIS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thesis_codes.json')
+
+
+def load_thesis_codes() -> List[str]:
+    with open(_THESIS_PATH, 'r') as f:
+        return json.load(f)['thesis_units']
+
+
+class SyntheticTranscript:
+    """A generated transcript: its header and unit lines, split into pages."""
+
+    def __init__(self, student_id: str, pages: List[List[Line]]):
+        self.student_id = student_id
+        self.pages = pages
+
+    @property
+    def lines(self) -> List[str]:
+        return [_line_text(line) for page in self.pages for line in page]
+
+    @property
+    def text(self) -> str:
+        """The text ``extract_text_from_pdf`` would return for ``to_pdf()``."""
+        return ''.join('\n'.join(_line_text(line) for line in page) + '\n' for page in self.pages if page)
+
+    def to_pdf(self) -> bytes:
+        return render_pdf(self.pages)
+
+
+def _line_text(line: Line) -> str:
+    return line if isinstance(line, str) else ' '.join(cell for cell in line if cell)
+
+
+def _unit_line(rng: random.Random, code: str, year: int, grade: str, mark_range: Optional[tuple],
+               credit_points: int, flexible: bool, tabular: bool = False) -> List[Line]:
+    title = rng.choice(TITLES)
+    session = rng.choice(SESSIONS)
+    if tabular:
+        mark = '' if mark_range is None else f"{rng.randint(*mark_range)}.0"
+        if len(title) <= TABLE_TITLE_CHARS:
+            return [(str(year), session, code, title, mark, grade, str(credit_points))]
+        # Wrap at a word boundary; the rest goes on a title-only continuation row
+        cut = title.rindex(' ', 0, TABLE_TITLE_CHARS)
+        return [(str(year), session, code, title[:cut], mark, grade, str(credit_points)),
+                ('', '', '', title[cut + 1:], '', '', '')]
+    if mark_range is None:
+        mark = ''
+    else:
+        mark = f"{rng.randint(*mark_range)}.0 " if not flexible else f"{rng.randint(*mark_range)} "
+    if flexible:
+        # Formats the strict pattern can't read: dashes, no year/session, grade last
+        return [f"{code} - {title} {mark}{credit_points} {grade}"]
+    return [f"{year} {session} {code} {title} {mark}{grade} {credit_points}"]
+
+
+def generate_transcript(seed: int = 0, pages: int = 2, flexible: bool = False,
+                        student_id: Optional[str] = None, thesis_codes: Optional[List[str]] = None,
+                        tabular: bool = False) -> SyntheticTranscript:
+    """Generate one transcript with about ``pages`` pages of results.
+
+    Covers every grade handled by ``apply_eihwam_rules`` (with and without
+    printed marks), 1000- to 4000-level units, thesis units from
+    thesis_codes.json and 0 credit point ENGP (PEP) units. ``flexible``
+    produces lines only the fallback parser can read. ``tabular`` renders
+    results as an aligned table, wrapping long titles onto a second row,
+    as the real transcript does.
+    """
+    rng = random.Random(seed)
+    thesis_codes = thesis_codes if thesis_codes is not None else load_thesis_codes()
+    student_id = student_id or f"5{rng.randint(0, 99999999):08d}"
+    header = [
+        "The University of Sydney",
+        "Academic Transcript",
+        f"Student ID: {student_id}",
+        "Bachelor of Engineering (Honours)",
+    ]
+
+    body_lines = pages * LINES_PER_PAGE - len(header) - pages
+    unit_lines = []
+    year = 2018 + rng.randint(0, 3)
+    for index in range(body_lines):
+        if index % 12 == 11:
+            year += 1
+            unit_lines.append(f"Session results {year}")
+            continue
+        roll = rng.random()
+        if roll < 0.04 and thesis_codes:
+            code, credit_points = rng.choice(thesis_codes), 12
+        elif roll < 0.08:
+            code, credit_points = f"ENGP{rng.randint(1, 3)}{rng.randint(0, 999):03d}", 0
+        else:
+            code = f"{rng.choice(SUBJECTS)}{rng.randint(1, 4)}{rng.randint(0, 999):03d}"
+            credit_points = rng.choice([6, 6, 6, 12, 3])
+        grade, mark_range = GRADES[index % len(GRADES)] if rng.random() < 0.5 else rng.choice(GRADES[:5])
+        if code.startswith('ENGP'):
+            grade, mark_range = 'SR', (0, 0)
+        unit_lines.extend(_unit_line(rng, code, year, grade, mark_range, credit_points, flexible, tabular))
+
+    result_pages = []
+    per_page = LINES_PER_PAGE - 1
+    body = header + unit_lines
+    start = 0
+    while start < len(body):
+        stop = min(start + per_page, len(body))
+        if stop < len(body) and not isinstance(body[stop], str) and not body[stop][0]:
+            # Keep a wrapped title's continuation row on the same page as its unit
+            stop -= 1
+        result_pages.append(body[start:stop] + [f"Page {len(result_pages) + 1} of {pages}"])
+        start = stop
+    return SyntheticTranscript(student_id, result_pages)
+
+
+def _pdf_escape(line: str) -> bytes:
+    escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return escaped.encode('latin-1', 'replace')
+
+
+def render_pdf(pages: List[List[Line]]) -> bytes:
+    """Render pages of text lines as a minimal, valid PDF (Helvetica, A4).
+
+    Written by hand so benchmarks and tests need no PDF-writing dependency.
+    A line may be a tuple of table cells, placed at ``TABLE_COLUMNS``.
+    An empty page list entry produces a page with no text layer.
+    """
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    content_ids = []
+    for lines in pages:
+        stream = b"BT /F1 8 Tf\n"
+        for row, line in enumerate(lines):
+            y = 806 - 10 * row
+            cells = [(TABLE_COLUMNS[0], line)] if isinstance(line, str) else zip(TABLE_COLUMNS, line)
+            for x, cell in cells:
+                if cell:
+                    stream += b"1 0 0 1 %d %d Tm (" % (x, y) + _pdf_escape(cell) + b") Tj\n"
+        stream += b"ET"
+        content_ids.append(add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"))
+
+    pages_id = len(objects) + len(pages) + 1
+    page_ids = [
+        add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id))
+        for content_id in content_ids
+    ]
+    add(b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+        + b"] /Count %d >>" % len(page_ids))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset)
+    return bytes(output)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="Write synthetic USYD transcript PDFs.")
+    arg_parser.add_argument('output_dir', help="Directory to write PDFs into")
+    arg_parser.add_argument('-n', '--count', type=int, default=10, help="Number of transcripts")
+    arg_parser.add_argument('--pages', type=int, default=2, help="Pages per transcript")
+    arg_parser.add_argument('--flexible', action='store_true', help="Use formats only the flexible parser reads")
+    arg_parser.add_argument('--tabular', action='store_true', help="Lay results out as an aligned table")
+    arg_parser.add_argument('--seed', type=int, default=0, help="Seed of the first transcript")
+    args = arg_parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    thesis_codes = load_thesis_codes()
+    for index in range(args.count):
+        transcript = generate_transcript(args.seed + index, args.pages, args.flexible, thesis_codes=thesis_codes,
+                                         tabular=args.tabular)
+        with open(os.path.join(args.output_dir, f"transcript-{args.seed + index:05d}.pdf"), 'wb') as f:
+            f.write(transcript.to_pdf())
+    print(f"✅ Wrote {args.count} transcripts to {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
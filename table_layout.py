@@ -0,0 +1,194 @@
+"""
+Layout-aware extraction of the results table from positioned PDF words
+"""
+
+import re
+from bisect import bisect_right
+from statistics import median
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Year, session, code, title, mark (None if not printed), grade, credit points
+TableRow = Tuple[str, str, str, str, Optional[float], str, int]
+
+# Field positions within a table row
+YEAR, SESSION, CODE, TITLE, MARK, GRADE, CREDIT_POINTS = range(7)
+
+YEAR_TEXT = re.compile(r'\d{4}$')
+SESSION_TEXT = re.compile(r'[A-Z0-9]+$')
+CODE_TEXT = re.compile(r'[A-Z]{4}\d{4}$')
+MARK_TEXT = re.compile(r'\d+(?:\.\d+)?$')
+GRADE_TEXT = re.compile(r'[A-Z]+$')
+CREDIT_POINTS_TEXT = re.compile(r'\d+$')
+
+# Words whose tops are this close (points) are on the same row
+ROW_TOLERANCE = 3.0
+# A column starts this far (points) left of its leftmost word
+COLUMN_TOLERANCE = 2.0
+# Column starts further than this (points) from the column's median start are
+# ignored, e.g. a title ending in a number mistaken for a mark
+COLUMN_SPREAD = 15.0
+# A title-only row continues the unit above if it is at most this many row pitches below it
+CONTINUATION_PITCHES = 1.5
+
+
+def group_rows(words: Sequence[Dict], tolerance: float = ROW_TOLERANCE) -> List[List[Dict]]:
+    """Group pdfplumber words into rows by their top edge, each sorted left to right."""
+    rows: List[List[Dict]] = []
+    row_top = None
+    for word in sorted(words, key=lambda w: (w['top'], w['x0'])):
+        if not rows or word['top'] - row_top > tolerance:
+            rows.append([])
+            row_top = word['top']
+        rows[-1].append(word)
+    for row in rows:
+        row.sort(key=lambda w: w['x0'])
+    return rows
+
+
+def _anchor_starts(row: List[Dict]) -> Optional[List[Optional[float]]]:
+    """Return the start of each field if ``row`` reads as a complete unit row, else None.
+
+    An anchor row is: year, session, unit code, one or more title words, an
+    optional mark, grade and credit points. The mark start is None when the
+    row has no mark.
+    """
+    if len(row) < 6:
+        return None
+    texts = [word['text'] for word in row]
+    if not (YEAR_TEXT.match(texts[0]) and SESSION_TEXT.match(texts[1]) and CODE_TEXT.match(texts[2])
+            and GRADE_TEXT.match(texts[-2]) and CREDIT_POINTS_TEXT.match(texts[-1])):
+        return None
+    has_mark = len(row) >= 7 and MARK_TEXT.match(texts[-3])
+    return [row[0]['x0'], row[1]['x0'], row[2]['x0'], row[3]['x0'],
+            row[-3]['x0'] if has_mark else None, row[-2]['x0'], row[-1]['x0']]
+
+
+def _row_from_words(row: List[Dict], starts: List[Optional[float]]) -> TableRow:
+    """Read an anchor row by word order alone (for pages that aren't laid out in columns)."""
+    texts = [word['text'] for word in row]
+    title_end = -3 if starts[MARK] is not None else -2
+    return (texts[0], texts[1], texts[2], ' '.join(texts[3:title_end]),
+            float(texts[-3]) if starts[MARK] is not None else None, texts[-2], int(texts[-1]))
+
+
+def _column_start(starts: List[float]) -> float:
+    """Leftmost start near the median, so ragged (right-aligned) columns still fit.
+
+    When no start is near the median (e.g. two anchor rows that disagree),
+    the leftmost start is used; ``extract_table_rows`` then finds the
+    columns don't fit and reads the page by word order.
+    """
+    middle = median(starts)
+    near = [x for x in starts if abs(x - middle) <= COLUMN_SPREAD] or starts
+    return min(near) - COLUMN_TOLERANCE
+
+
+class TableColumns:
+    """Column boundaries of the results table on one page.
+
+    Inferred once per page from its anchor rows (rows that read as a
+    complete unit), then used to assign every word in the table region to
+    a field by position alone.
+    """
+
+    __slots__ = ('left', 'edges', 'pitch')
+
+    def __init__(self, left: float, edges: Tuple[float, ...], pitch: Optional[float]):
+        # Start of the year column; anything further left is outside the table
+        self.left = left
+        # Start of the session, code, title, mark, grade and credit point columns
+        self.edges = edges
+        # Typical distance between unit rows (None with a single row)
+        self.pitch = pitch
+
+    @classmethod
+    def infer(cls, anchors: List[Tuple[List[Dict], List[Optional[float]]]]) -> 'TableColumns':
+        columns = [_column_start([starts[field] for _, starts in anchors if starts[field] is not None])
+                   if any(starts[field] is not None for _, starts in anchors) else None
+                   for field in range(7)]
+        # No marks printed on this page: the mark column is empty
+        if columns[MARK] is None:
+            columns[MARK] = columns[GRADE]
+        tops = [row[0]['top'] for row, _ in anchors]
+        pitch = median(b - a for a, b in zip(tops, tops[1:])) if len(tops) > 1 else None
+        return cls(columns[YEAR], tuple(columns[SESSION:]), pitch)
+
+    def split(self, row: List[Dict]) -> List[str]:
+        """Return the text of each field in ``row``, ignoring words left of the table."""
+        cells: List[List[str]] = [[] for _ in range(7)]
+        for word in row:
+            if word['x0'] >= self.left:
+                cells[bisect_right(self.edges, word['x0'])].append(word['text'])
+        return [' '.join(cell) for cell in cells]
+
+
+def _to_table_row(cells: List[str]) -> Optional[TableRow]:
+    if not (YEAR_TEXT.match(cells[YEAR]) and CODE_TEXT.match(cells[CODE]) and cells[SESSION]
+            and GRADE_TEXT.match(cells[GRADE]) and CREDIT_POINTS_TEXT.match(cells[CREDIT_POINTS])):
+        return None
+    mark = cells[MARK]
+    if mark and not MARK_TEXT.match(mark):
+        return None
+    return (cells[YEAR], cells[SESSION], cells[CODE], cells[TITLE], float(mark) if mark else None,
+            cells[GRADE], int(cells[CREDIT_POINTS]))
+
+
+def _fits(by_column: Optional[TableRow], by_order: TableRow) -> bool:
+    """Whether a row read by column agrees with the same row read by word order."""
+    return by_column is not None and all(by_column[field] == by_order[field]
+                                         for field in (YEAR, SESSION, CODE, GRADE, CREDIT_POINTS))
+
+
+def extract_table_rows(words: Sequence[Dict]) -> List[TableRow]:
+    """Read the results table from one page's positioned words.
+
+    ``words`` are pdfplumber word dicts (``text``, ``x0``, ``top``), as
+    returned by ``page.extract_words()``. The table region runs from the
+    first anchor row to the last anchor row and its continuation rows,
+    starting at the year column; words outside it are ignored. Titles
+    wrapped onto title-only rows are joined back onto their unit. Pages
+    with no anchor rows return no rows.
+
+    If the inferred columns don't reproduce every anchor row's year,
+    session, code, grade and credit points, the page isn't laid out as a
+    table (e.g. free-flowing text lines), and its anchor rows are read by
+    word order instead. Titles and marks aren't compared: word order can't
+    tell a title ending in a number from a mark, which is what the columns
+    are for.
+    """
+    rows = group_rows(words)
+    anchors = [(index, starts) for index, starts in
+               ((index, _anchor_starts(row)) for index, row in enumerate(rows)) if starts]
+    if not anchors:
+        return []
+    columns = TableColumns.infer([(rows[index], starts) for index, starts in anchors])
+    by_order = [_row_from_words(rows[index], starts) for index, starts in anchors]
+    if not all(_fits(_to_table_row(columns.split(rows[index])), row) for (index, _), row in zip(anchors, by_order)):
+        return by_order
+    anchor_rows = {index for index, _ in anchors}
+    max_gap = columns.pitch * CONTINUATION_PITCHES if columns.pitch else None
+
+    table_rows: List[TableRow] = []
+    current: Optional[List[str]] = None
+    previous_top = None
+    for index in range(anchors[0][0], len(rows)):
+        row = rows[index]
+        cells = columns.split(row)
+        if index in anchor_rows:
+            if current is not None:
+                table_rows.append(_to_table_row(current))
+            current = cells
+        elif (current is not None and cells[TITLE] and not any(cells[:TITLE]) and not any(cells[MARK:])
+              and (max_gap is None or row[0]['top'] - previous_top <= max_gap)):
+            current[TITLE] = f"{current[TITLE]} {cells[TITLE]}".strip()
+        else:
+            # Anything else (session headings, footers) ends the unit above
+            if current is not None:
+                table_rows.append(_to_table_row(current))
+            current = None
+            if index > anchors[-1][0]:
+                break
+        previous_top = row[0]['top']
+    if current is not None:
+        table_rows.append(_to_table_row(current))
+    return [row for row in table_rows if row is not None]
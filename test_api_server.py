@@ -0,0 +1,141 @@
+"""
+Tests for the HTTP/JSON scoring API, over real sockets
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from api_server import ScoringServer
+from conftest import scores
+
+
+async def request(port, method, path, body=b'', headers=None, connection=None):
+    """Send one request; returns (status, payload, connection) so the connection can be reused."""
+    reader, writer = connection or await asyncio.open_connection('127.0.0.1', port)
+    head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+    head += ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    writer.write(head.encode('latin-1') + b'\r\n' + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    response_headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        response_headers[name.lower()] = value.strip()
+    payload = json.loads(await reader.readexactly(int(response_headers['content-length'])))
+    return int(status_line.split()[1]), payload, (reader, writer)
+
+
+def serve(server, client):
+    """Run ``client(port)`` against ``server`` listening on a free port."""
+    async def main():
+        listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        try:
+            return await client(listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            await listener.wait_closed()
+    try:
+        return asyncio.run(main())
+    finally:
+        server.close()
+
+
+def test_scores_pdf_and_text_like_the_parser(transcript, transcript_pdf, baseline):
+    server = ScoringServer(workers=1)
+
+    async def client(port):
+        status, pdf_result, connection = await request(port, 'POST', '/score', transcript_pdf,
+                                                       {'Content-Type': 'application/pdf'})
+        assert status == 200
+        # Same connection (keep-alive); answered from the result cache
+        status, cached, connection = await request(port, 'POST', '/score', transcript_pdf, connection=connection)
+        assert status == 200 and cached == pdf_result
+        connection[1].close()
+
+        body = json.dumps({'text': transcript.lines}).encode()
+        status, text_result, _ = await request(port, 'POST', '/score/text', body,
+                                               {'Content-Type': 'application/json'})
+        assert status == 200
+        status, health, _ = await request(port, 'GET', '/healthz')
+        assert health['served'] == 3 and health['cached_results'] == 1
+        return pdf_result, text_result
+
+    pdf_result, text_result = serve(server, client)
+    assert scores(pdf_result) == scores(text_result) == scores(baseline)
+    assert len(pdf_result['units']) == baseline['total_units']
+
+
+def test_slow_text_does_not_block_the_server():
+    # Lines the matcher backtracks over for seconds, well under any body limit
+    body = b'2021 S1C ENGG1810 ' * 3500
+    server = ScoringServer(workers=1, request_timeout=1)
+    server._warm_pool()
+
+    async def client(port):
+        scoring = asyncio.create_task(request(port, 'POST', '/score/text', body, {'Content-Type': 'text/plain'}))
+        await asyncio.sleep(0.2)
+        started = time.monotonic()
+        health_status, health, _ = await request(port, 'GET', '/healthz')
+        elapsed = time.monotonic() - started
+        status, _, _ = await scoring
+        return health_status, health, elapsed, status
+
+    health_status, health, elapsed, status = serve(server, client)
+    assert health_status == 200 and health['in_flight'] == 1
+    assert elapsed < 0.5
+    assert status == 504
+
+
+@pytest.mark.parametrize('method, path, body, headers, expected', [
+    ('GET', '/missing', b'', {}, 404),
+    ('GET', '/score', b'', {}, 405),
+    ('POST', '/healthz', b'', {}, 405),
+    ('POST', '/score', b'x' * 2048, {}, 413),
+    ('POST', '/score', b'not a pdf', {}, 415),
+    ('POST', '/score/text', b'{"lines": []}', {'Content-Type': 'application/json'}, 400),
+    ('POST', '/score/text', b'\xff\xfe', {'Content-Type': 'text/plain'}, 400),
+])
+def test_error_responses(method, path, body, headers, expected):
+    server = ScoringServer(workers=1, max_body_bytes=1024)
+
+    async def client(port):
+        status, payload, _ = await request(port, method, path, body, headers)
+        return status, payload
+
+    status, payload = serve(server, client)
+    assert status == expected
+    assert payload['error']
+
+
+def test_busy_server_answers_503():
+    server = ScoringServer(workers=1, max_in_flight=1)
+    server.in_flight = 1
+
+    async def client(port):
+        return await request(port, 'POST', '/score/text', b'2021 S1C ENGG1810 Computing 74.0 CR 6')
+
+    status, _, _ = serve(server, client)
+    assert status == 503
+
+
+def test_crashed_worker_pool_is_replaced(transcript_pdf, baseline):
+    server = ScoringServer(workers=1)
+    server._warm_pool()
+
+    async def client(port):
+        for process in list(server._executor._processes.values()):
+            process.kill()
+            process.join()
+        crashed, _, _ = await request(port, 'POST', '/score', transcript_pdf)
+        status, result, _ = await request(port, 'POST', '/score', transcript_pdf)
+        return crashed, status, result
+
+    crashed, status, result = serve(server, client)
+    assert crashed == 500
+    assert status == 200 and scores(result) == scores(baseline)
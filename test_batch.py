@@ -0,0 +1,68 @@
+"""
+Tests for batch transcript processing
+"""
+
+import csv
+import json
+import os
+
+from batch import BatchProcessor, ResultWriter, SUMMARY_FIELDS, discover_pdfs, main
+from conftest import scores
+
+
+def test_discover_pdfs_directory_and_manifests(pdf_dir, tmp_path):
+    paths = discover_pdfs(pdf_dir)
+    assert [os.path.basename(path) for path in paths] == ['transcript-1.pdf', 'transcript-2.pdf',
+                                                           'transcript-3.pdf']
+
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text(f"# cohort\n{paths[0]}\n\n{paths[2]}\n")
+    assert discover_pdfs(str(manifest)) == [paths[0], paths[2]]
+
+    csv_manifest = tmp_path / 'manifest.csv'
+    csv_manifest.write_text(f"path,major\n{paths[1]},Software\n")
+    assert discover_pdfs(str(csv_manifest)) == [paths[1]]
+
+
+def test_batch_rows_match_parse_transcript(parser, pdf_dir):
+    paths = discover_pdfs(pdf_dir)
+    rows = {row['file']: row for row in BatchProcessor(workers=2).run(paths)}
+
+    assert sorted(rows) == paths
+    for path in paths:
+        assert rows[path]['status'] == 'ok'
+        assert scores(rows[path]) == scores(parser.parse_transcript(path))
+
+
+def test_unreadable_pdf_is_one_error_row(pdf_dir, tmp_path):
+    broken = tmp_path / 'broken.pdf'
+    broken.write_bytes(b'%PDF-1.4 not really a pdf')
+    paths = discover_pdfs(pdf_dir)[:1] + [str(broken)]
+
+    rows = {row['file']: row for row in BatchProcessor(workers=1).run(paths)}
+
+    assert rows[paths[0]]['status'] == 'ok'
+    assert rows[str(broken)]['status'] == 'error'
+    assert rows[str(broken)]['error']
+
+
+def test_result_writer_formats(tmp_path):
+    row = {'file': 'a.pdf', 'status': 'ok', 'eihwam': 71.5, 'units': []}
+    with ResultWriter(str(tmp_path / 'out.csv')) as writer:
+        writer.write(row)
+    with ResultWriter(str(tmp_path / 'out.jsonl')) as writer:
+        writer.write(row)
+
+    with open(tmp_path / 'out.csv', newline='') as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == SUMMARY_FIELDS
+        assert next(reader)['eihwam'] == '71.5'
+    assert json.loads((tmp_path / 'out.jsonl').read_text()) == row
+
+
+def test_cli_writes_one_row_per_pdf(pdf_dir, tmp_path):
+    output = tmp_path / 'results.jsonl'
+    assert main([pdf_dir, '-o', str(output), '-j', '1']) == 0
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(rows) == 3
+    assert {row['status'] for row in rows} == {'ok'}
@@ -0,0 +1,122 @@
+"""
+Tests for the transcript result and page caches and their backends
+"""
+
+import os
+import re
+
+import pytest
+
+from cache import DiskBackend, MemoryBackend, PageCache, ResultCache, hash_pdf_bytes
+from conftest import scores
+from instrumentation import Instrumentation
+from pdf_parser import TranscriptParser
+from synthetic_transcripts import generate_transcript, render_pdf
+
+UNIT_ROW = re.compile(r'^\d{4} ')
+
+
+def test_cached_result_matches_parse_and_is_a_copy(parser, transcript_pdf, baseline):
+    cache = ResultCache()
+    first = cache.parse_transcript(parser, transcript_pdf)
+    first['units'].clear()
+    second = cache.parse_transcript(parser, bytearray(transcript_pdf))
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert scores(second) == scores(baseline)
+    assert second['units'] == baseline['units']
+
+
+def test_key_depends_on_pdf_and_rules_version(transcript_pdf):
+    pdf_hash = hash_pdf_bytes(transcript_pdf)
+    assert pdf_hash == hash_pdf_bytes(memoryview(transcript_pdf))
+    key = ResultCache.make_key(pdf_hash, TranscriptParser().rules_version)
+    assert key != ResultCache.make_key(pdf_hash, TranscriptParser(layout=True).rules_version)
+    assert key != ResultCache.make_key(hash_pdf_bytes(transcript_pdf + b'\n'), TranscriptParser().rules_version)
+
+
+def test_expired_entries_are_misses():
+    cache = ResultCache(ttl=-1)
+    cache.put('key', {'eihwam': 70.0})
+    assert cache.get('key') is None
+    assert len(cache) == 0
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.put('a', 0, {})
+    backend.put('b', 0, {})
+    backend.get('a')
+    backend.put('c', 0, {})
+    assert backend.get('b') is None
+    assert backend.get('a') is not None and backend.get('c') is not None
+
+
+def test_disk_backend_survives_restart(parser, transcript_pdf, baseline, tmp_path):
+    ResultCache(DiskBackend(str(tmp_path))).parse_transcript(parser, transcript_pdf)
+
+    cache = ResultCache(DiskBackend(str(tmp_path)))
+    result = cache.parse_transcript(parser, transcript_pdf)
+    assert cache.hits == 1
+    assert scores(result) == scores(baseline)
+    assert result['units'] == baseline['units']
+
+
+def test_disk_backend_evicts_oldest(tmp_path):
+    backend = DiskBackend(str(tmp_path), max_entries=2)
+    for index, key in enumerate(('a', 'b', 'c')):
+        backend.put(key, 0, {})
+        os.utime(os.path.join(tmp_path, f"{key}.json"), (index, index))
+    backend.put('d', 0, {})
+    assert len(backend) == 2
+    assert backend.get('a') is None and backend.get('b') is None
+
+
+def test_encrypted_disk_backend(parser, transcript_pdf, baseline, tmp_path):
+    fernet = pytest.importorskip('cryptography.fernet')
+    key = fernet.Fernet.generate_key()
+    ResultCache(DiskBackend(str(tmp_path), encryption_key=key)).parse_transcript(parser, transcript_pdf)
+
+    (entry,) = os.listdir(tmp_path)
+    assert entry.endswith('.enc')
+    stored = (tmp_path / entry).read_bytes()
+    assert baseline['units'][0]['code'].encode() not in stored
+
+    cache = ResultCache(DiskBackend(str(tmp_path), encryption_key=key))
+    assert cache.parse_transcript(parser, transcript_pdf)['units'] == baseline['units']
+    assert cache.hits == 1
+
+    # Entries written under another key can't be read, so they are misses
+    other = ResultCache(DiskBackend(str(tmp_path), encryption_key=fernet.Fernet.generate_key()))
+    assert other.get(ResultCache.make_key(hash_pdf_bytes(transcript_pdf), parser.rules_version)) is None
+
+
+def test_page_cache_reparses_only_new_pages(parser, transcript):
+    # The next semester's transcript: the same pages plus one of new results
+    new_page = [line for line in generate_transcript(seed=7, pages=1).pages[0] if UNIT_ROW.match(line)]
+    updated_pdf = render_pdf(transcript.pages + [new_page])
+    cached_parser = TranscriptParser(page_cache=PageCache())
+    assert cached_parser.parse_transcript(transcript.to_pdf()) == parser.parse_transcript(transcript.to_pdf())
+
+    instrumentation = Instrumentation()
+    result = cached_parser.parse_transcript(updated_pdf, instrumentation=instrumentation)
+    assert result == parser.parse_transcript(updated_pdf)
+    assert instrumentation.counters['page_cache_hits'] == len(transcript.pages)
+    assert instrumentation.counters['page_rows_cached'] == len(transcript.pages)
+    assert instrumentation.counters['lines_scanned'] == len(new_page)
+
+
+def test_page_cache_keeps_the_flexible_fallback(parser):
+    pdf = generate_transcript(seed=3, flexible=True).to_pdf()
+    cached_parser = TranscriptParser(page_cache=PageCache())
+    for _ in range(2):
+        assert cached_parser.parse_transcript(pdf) == parser.parse_transcript(pdf)
+    assert cached_parser.page_cache.hits == len(cached_parser.page_cache)
+
+
+def test_expired_pages_are_misses():
+    page_cache = PageCache(ttl=-1)
+    page_cache.put_text('hash', 'text')
+    page_cache.put_rows('text', ())
+    assert page_cache.get_text('hash') is None and page_cache.get_rows('text') is None
+    assert (page_cache.hits, page_cache.misses) == (0, 1)
@@ -0,0 +1,105 @@
+"""
+Tests for the cohort analytics store and its trigger-maintained aggregates
+"""
+
+from collections import Counter
+
+import pytest
+
+from batch import BatchProcessor, discover_pdfs
+from cohort_store import CohortStore
+from conftest import scores
+from synthetic_transcripts import generate_transcript
+
+
+@pytest.fixture(scope='module')
+def results(parser, pdf_dir):
+    return {path: parser.parse_transcript(path) for path in discover_pdfs(pdf_dir)}
+
+
+def fill(store, results):
+    for index, (source, result) in enumerate(sorted(results.items())):
+        store.ingest(source, result, major=['Software', 'Civil'][index % 2])
+    return store
+
+
+def expected_aggregates(results):
+    """Per-unit attempts, exclusions and mean marks, and exclusion reasons, counted from the results."""
+    units = [unit for result in results.values() for unit in result['units']]
+    attempts = Counter(unit['code'] for unit in units)
+    exclusions = Counter(unit['code'] for unit in units if not unit['included_in_eihwam'])
+    reasons = Counter(unit['exclusion_reason'] for unit in units if not unit['included_in_eihwam'])
+    marks = {}
+    for unit in units:
+        if unit['mark'] is not None:
+            marks.setdefault(unit['code'], []).append(unit['mark'])
+    return attempts, exclusions, reasons, marks
+
+
+def check_aggregates(store, results):
+    attempts, exclusions, reasons, marks = expected_aggregates(results)
+    assert store.exclusion_reasons() == dict(reasons)
+    assert {row['code']: row['exclusions'] for row in store.most_excluded_units(limit=1000)} == dict(exclusions)
+    for code in attempts:
+        stats = store.unit_stats(code)
+        assert stats['attempts'] == attempts[code]
+        expected_mean = round(sum(marks[code]) / len(marks[code]), 2) if code in marks else None
+        assert stats['mean_mark'] == pytest.approx(expected_mean)
+
+    honours = Counter(result['honours_class'] for result in results.values())
+    assert {name: counts['students'] for name, counts in store.honours_counts().items()} == dict(honours)
+
+
+def test_ingested_results_and_aggregates(results):
+    with fill(CohortStore(), results) as store:
+        assert len(store) == len(results)
+        for row in store.students():
+            assert scores(row) == scores(results[row['source']])
+        assert [row['eihwam'] for row in store.students()] == \
+            sorted((result['eihwam'] for result in results.values()), reverse=True)
+        assert len(store.units()) == sum(result['total_units'] for result in results.values())
+        assert len(store.units(included=True)) == sum(result['included_units'] for result in results.values())
+        check_aggregates(store, results)
+
+        summary = store.eihwam_summary(by='major')
+        assert sum(group['students'] for group in summary.values()) == len(results)
+        assert sum(sum(bins.values()) for bins in store.eihwam_distribution(by=None).values()) == len(results)
+        with pytest.raises(ValueError):
+            store.eihwam_summary(by='eihwam; DROP TABLE students')
+
+
+def test_reingest_replaces_and_keeps_aggregates(parser, results):
+    replaced = dict(results)
+    source = sorted(results)[0]
+    replaced[source] = parser.parse_transcript_text(generate_transcript(seed=9).lines)
+
+    with fill(CohortStore(), results) as store:
+        fill(store, replaced)
+        assert len(store) == len(results)
+        stored = {row['source']: row for row in store.students()}
+        assert scores(stored[source]) == scores(replaced[source])
+        check_aggregates(store, replaced)
+
+        store.remove(source)
+        del replaced[source]
+        check_aggregates(store, replaced)
+
+
+def test_near_boundary(results):
+    with fill(CohortStore(), results) as store:
+        thresholds = [(result['eihwam'] + 0.5, 'Class X') for result in list(results.values())[:1]]
+        rows = store.near_boundary(within=1.0, thresholds=thresholds)
+        assert [row['gap'] for row in rows] == [-0.5]
+        assert rows[0]['boundary_class'] == 'Class X'
+
+
+def test_batch_rows_persist(pdf_dir, results, tmp_path):
+    path = str(tmp_path / 'cohort.db')
+    with CohortStore(path) as store:
+        for row in BatchProcessor(workers=1, keep_units=True).run(discover_pdfs(pdf_dir)):
+            store.ingest_row(row, row.pop('units'), major='Software')
+
+    with CohortStore(path) as store:
+        assert {row['source']: scores(row) for row in store.students(major='Software')} == \
+            {source: scores(result) for source, result in results.items()}
+        check_aggregates(store, results)
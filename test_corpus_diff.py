@@ -0,0 +1,93 @@
+"""
+Tests for differential testing of the unit parsers over a corpus
+"""
+
+import json
+
+import pytest
+
+from corpus_diff import _unit_mismatches, build_corpus, main, resolve_engines, run_corpus, summarise
+
+
+def same_engine(parser, lines):
+    return parser.parse_units(lines)
+
+
+def drop_first_unit(parser, lines):
+    """An engine that misses the first unit and reads every mark one higher."""
+    units = parser.parse_units(lines)[1:]
+    for unit in units:
+        if unit['mark'] is not None:
+            unit['mark'] += 1
+    return units
+
+
+def broken_engine(parser, lines):
+    raise RuntimeError('not implemented')
+
+
+def strip_diff(diff):
+    return {key: value for key, value in diff.items() if key != 'engines'}
+
+
+def test_engine_agrees_with_itself():
+    items = build_corpus(synthetic=2, variants=('standard', 'tabular'))
+    diffs = list(run_corpus(items, ['parse_units', 'same=test_corpus_diff:same_engine'], workers=1))
+    assert [diff['mismatches'] for diff in diffs] == [[], [], [], []]
+    report = summarise(diffs, ['parse_units', 'same'])
+    assert report['items'] == 4 and report['engines']['same']['mismatches'] == {}
+    assert report['engines']['parse_units']['units'] == report['engines']['same']['units'] > 0
+
+
+def test_mismatches_are_found_and_aligned(parser, transcript):
+    reference = parser.parse_units(transcript.lines)
+    items = [('synthetic', 1, 'standard')]
+    diff = next(run_corpus(items, ['parse_units', 'shifted=test_corpus_diff:drop_first_unit'], workers=1))
+
+    by_field = {}
+    for mismatch in diff['mismatches']:
+        by_field.setdefault(mismatch['field'], []).append(mismatch)
+    assert [mismatch['reference'] for mismatch in by_field['missing']] == [reference[0]['code']]
+    # Aligned by code, so only marks differ on the remaining units, never codes or titles
+    assert len(by_field['mark']) == sum(unit['mark'] is not None for unit in reference[1:])
+    assert 'code' not in by_field and 'title' not in by_field
+    assert 'wam' in by_field
+
+
+def test_unit_alignment():
+    def units(*codes):
+        return [{'code': code, 'title': '', 'credit_points': 6, 'mark': 70, 'grade': 'CR'} for code in codes]
+    mismatches = _unit_mismatches(units('A', 'B', 'C'), units('A', 'X', 'C'))
+    assert [(m['field'], m['reference'], m['value']) for m in mismatches] == [('missing', 'B', None),
+                                                                              ('extra', None, 'X')]
+
+
+def test_errors_and_text_files(tmp_path):
+    (tmp_path / 'one.txt').write_text('2021 S1C ENGG2111 Engineering Mechanics 74.0 D 6\n')
+    items = build_corpus(text_dirs=[str(tmp_path)]) + [('file', str(tmp_path / 'missing.txt'))]
+    report = summarise(run_corpus(items, ['parse_units', 'broken=test_corpus_diff:broken_engine'], workers=1),
+                       ['parse_units', 'broken'])
+    assert report['items'] == 2 and report['lines'] == 2
+    assert len(report['load_errors']) == 1
+    assert report['engines']['broken']['errors'] == 1
+    assert report['engines']['broken']['mismatches'] == {'error': 1}
+    assert report['engines']['parse_units']['units'] == 1
+
+    with pytest.raises(ValueError):
+        resolve_engines(['no_such_engine'])
+
+
+def test_parallel_run_matches_sequential():
+    items = build_corpus(synthetic=3, seed=5)
+    engines = ['parse_units', 'parse_units_flexible']
+    sequential = [strip_diff(diff) for diff in run_corpus(items, engines, workers=1)]
+    assert [strip_diff(diff) for diff in run_corpus(items, engines, workers=2, chunk_size=2)] == sequential
+
+
+def test_cli_check(tmp_path):
+    output = tmp_path / 'report.json'
+    args = ['--synthetic', '1', '--variants', 'standard', '-w', '1', '--check', '-o', str(output)]
+    assert main(args + ['--engines', 'parse_units,same=test_corpus_diff:same_engine']) == 0
+    assert main(args + ['--engines', 'parse_units,shifted=test_corpus_diff:drop_first_unit']) == 1
+    report = json.loads(output.read_text())
+    assert report['engines']['shifted']['mismatched_items'] == 1
@@ -0,0 +1,123 @@
+"""
+Tests for the durable ingest queue: retries, quarantine and resuming after a restart
+"""
+
+import time
+from itertools import islice
+
+import pytest
+
+import batch
+from batch import BatchProcessor, discover_pdfs, main, run_queue
+from conftest import scores
+from ingest_queue import IngestQueue
+from pdf_parser import TranscriptParser
+
+
+def failed(path, error='boom'):
+    return {'file': path, 'status': 'error', 'error': error}
+
+
+def test_add_and_claim_in_order():
+    with IngestQueue() as queue:
+        assert queue.add(['a.pdf', 'b.pdf', 'c.pdf']) == 3
+        assert queue.add(['b.pdf', 'd.pdf']) == 1
+        assert queue.claim(2) == ['a.pdf', 'b.pdf']
+        assert queue.claim(10) == ['c.pdf', 'd.pdf']
+        assert queue.counts() == {'pending': 0, 'running': 4, 'done': 0, 'quarantined': 0}
+
+        assert queue.record({'file': 'a.pdf', 'status': 'ok', 'eihwam': 70.0, 'units': []}) == 'done'
+        assert list(queue.results()) == [{'file': 'a.pdf', 'status': 'ok', 'eihwam': 70.0}]
+
+
+def test_backoff_and_quarantine():
+    with IngestQueue(max_attempts=3, backoff=60, max_backoff=90) as queue:
+        queue.add(['bad.pdf'])
+        queue.claim(1)
+        assert queue.record(failed('bad.pdf')) == 'pending'
+        assert queue.claim(1) == []
+        assert queue.next_retry() == pytest.approx(60, abs=1)
+
+        # Second failure doubles the delay, up to max_backoff
+        queue.connection.execute("UPDATE jobs SET next_attempt = 0")
+        assert queue.claim(1) == ['bad.pdf']
+        assert queue.record(failed('bad.pdf')) == 'pending'
+        assert queue.next_retry() == pytest.approx(90, abs=1)
+
+        queue.connection.execute("UPDATE jobs SET next_attempt = 0")
+        queue.claim(1)
+        assert queue.record(failed('bad.pdf', 'hung')) == 'quarantined'
+        assert queue.next_retry() is None
+        assert queue.quarantined() == [{'path': 'bad.pdf', 'attempts': 3, 'error': 'hung'}]
+        assert list(queue.results())[0]['status'] == 'quarantined'
+
+        assert queue.requeue() == 1
+        assert queue.claim(1) == ['bad.pdf']
+
+
+def test_interrupted_jobs_are_recovered(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    queue = IngestQueue(path)
+    queue.add(['a.pdf', 'b.pdf', 'c.pdf'])
+    queue.claim(2)
+    queue.record({'file': 'a.pdf', 'status': 'ok'})
+    # Crash with b.pdf mid-parse
+    queue.connection.close()
+
+    with IngestQueue(path) as queue:
+        assert queue.recovered == 1
+        assert queue.counts() == {'pending': 2, 'running': 0, 'done': 1, 'quarantined': 0}
+        assert queue.claim(10) == ['b.pdf', 'c.pdf']
+        assert queue.connection.execute("SELECT MAX(attempts) FROM jobs WHERE status = 'running'").fetchone()[0] == 0
+
+
+def test_drain_releases_unstarted_files():
+    with IngestQueue() as queue:
+        queue.add(['a.pdf', 'b.pdf', 'c.pdf', 'd.pdf'])
+        drain = queue.drain(batch_size=3)
+        assert next(drain) == 'a.pdf'
+        drain.close()
+        assert queue.counts()['running'] == 1
+        assert list(queue.drain(batch_size=2)) == ['b.pdf', 'c.pdf', 'd.pdf']
+
+
+def test_run_queue_quarantines_bad_files_and_resumes(parser, pdf_dir, tmp_path):
+    broken = tmp_path / 'broken.pdf'
+    broken.write_bytes(b'%PDF-1.4 not really a pdf')
+    paths = discover_pdfs(pdf_dir)
+    db = str(tmp_path / 'queue.db')
+
+    with IngestQueue(db, max_attempts=2, backoff=0) as queue:
+        queue.add([str(broken)] + paths)
+        # Stop after the first row, as if the process were killed
+        list(islice(run_queue(queue, BatchProcessor(workers=1), batch_size=2), 1))
+
+    with IngestQueue(db, max_attempts=2, backoff=0) as queue:
+        rows = list(run_queue(queue, BatchProcessor(workers=1), batch_size=2))
+        assert [row['status'] for row in rows if row['file'] == str(broken)][-1] == 'quarantined'
+        assert queue.counts() == {'pending': 0, 'running': 0, 'done': 3, 'quarantined': 1}
+
+        results = list(queue.results())
+        assert [row['file'] for row in results] == [str(broken)] + paths
+        for row in results[1:]:
+            assert scores(row) == scores(parser.parse_transcript(row['file']))
+        # Everything is finished, so another run does nothing
+        assert list(run_queue(queue, BatchProcessor(workers=1))) == []
+
+
+def hang(self, *args, **kwargs):
+    time.sleep(60)
+
+
+def test_hanging_transcript_is_quarantined(monkeypatch, pdf_dir, tmp_path):
+    # Forked pool workers inherit the patched parser and the shortened default timeout
+    monkeypatch.setattr(TranscriptParser, 'parse_transcript', hang)
+    monkeypatch.setattr(batch, 'QUEUE_TIMEOUT', 0.5)
+    db = str(tmp_path / 'queue.db')
+    path = discover_pdfs(pdf_dir)[0]
+
+    # No --timeout given: the queue's default stops the parse, and a quarantined file fails the run
+    assert main([path, '-o', str(tmp_path / 'results.jsonl'), '-j', '1', '--queue', db, '--max-attempts', '1']) == 2
+    with IngestQueue(db) as queue:
+        assert queue.counts()['quarantined'] == 1
+        assert 'Took longer than 0.5 seconds' in queue.quarantined()[0]['error']
@@ -0,0 +1,64 @@
+"""
+Tests for parse instrumentation and its sinks
+"""
+
+import logging
+
+from conftest import scores
+from instrumentation import HistogramSink, Instrumentation, LoggingSink, PrometheusTextFileSink
+
+
+def test_instrumented_parse_matches_and_reports(parser, transcript_pdf, transcript, baseline):
+    instrumentation = Instrumentation()
+    result = parser.parse_transcript(transcript_pdf, instrumentation=instrumentation)
+    assert scores(result) == scores(baseline)
+    assert result['units'] == baseline['units']
+
+    report = instrumentation.report()
+    assert {'pdf_open', 'extract_text', 'parse_units', 'classify_units', 'calculate_eihwam'} <= set(report['stages'])
+    assert [page['page'] for page in report['pages']] == list(range(len(transcript.pages)))
+    assert instrumentation.expected_pages == len(transcript.pages)
+    counters = report['counters']
+    assert counters['pages'] == len(transcript.pages)
+    assert counters['lines_scanned'] == len(transcript.lines)
+    assert counters['strict_matches'] == baseline['total_units']
+    assert sum(value for name, value in counters.items() if name.startswith('excluded: ')) == \
+        baseline['excluded_units']
+
+
+def test_sinks_receive_each_report(parser, transcript_pdf, tmp_path, caplog):
+    histograms = HistogramSink()
+    prometheus = PrometheusTextFileSink(str(tmp_path / 'eihwam.prom'))
+    for _ in range(2):
+        parser.parse_transcript(transcript_pdf, instrumentation=Instrumentation([histograms, prometheus]))
+
+    summary = histograms.summary()
+    assert summary['extract_text']['count'] == 2
+    assert summary['page_text']['count'] == 4
+    assert histograms.counters['pages'] == 4
+
+    metrics = (tmp_path / 'eihwam.prom').read_text()
+    assert 'eihwam_parses_total 2' in metrics
+    assert 'eihwam_duration_seconds_count{stage="extract_text"} 2' in metrics
+    assert 'eihwam_events_total{event="pages"} 4' in metrics
+
+    with caplog.at_level(logging.INFO):
+        parser.parse_transcript(transcript_pdf, instrumentation=Instrumentation([LoggingSink()]))
+    assert 'parse_transcript pages=2' in caplog.text
+
+
+def test_failing_sink_does_not_break_parsing(parser, transcript_pdf, baseline):
+    class BrokenSink:
+        def record(self, report):
+            raise RuntimeError('sink down')
+
+    result = parser.parse_transcript(transcript_pdf, instrumentation=Instrumentation([BrokenSink()]))
+    assert scores(result) == scores(baseline)
+
+
+def test_histogram_buckets():
+    sink = HistogramSink(buckets=(0.1, 1.0))
+    sink.record({'stages': {'total': 0.05}, 'pages': [], 'counters': {}})
+    sink.record({'stages': {'total': 5.0}, 'pages': [], 'counters': {}})
+    assert sink.histograms['total'][0] == [1, 0, 1]
+    assert sink.summary()['total'] == {'count': 2, 'mean': 2.525, 'p50': 0.1, 'p95': float('inf')}
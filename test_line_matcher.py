@@ -0,0 +1,70 @@
+"""
+Tests for the precompiled transcript line matcher against the original per-line regexes
+"""
+
+import re
+
+import pytest
+
+from line_matcher import TranscriptLineMatcher
+from synthetic_transcripts import generate_transcript
+
+matcher = TranscriptLineMatcher()
+
+
+def baseline_strict(line):
+    """The fields the original ``parse_units`` read from a line."""
+    match = re.search(r'(\d{4})\s+([A-Z0-9]+)\s+([A-Z]{4}\d{4})\s+(.*?)\s+(\d+\.?\d*)\s+([A-Z]+)\s+(\d+)', line)
+    if not match:
+        return None
+    year, session, code, title, mark, grade, credit_points = match.groups()
+    return year, session, code, title.strip(), float(mark), grade, int(credit_points)
+
+
+def baseline_flexible(line):
+    """The fields the original ``_parse_units_flexible`` read from a line, one set per unit code."""
+    results = []
+    for match in re.finditer(r'\b([A-Z]{4}\d{4})\b', line):
+        cp_matches = re.findall(r'\b(6|12|3|0)\b', line)
+        credit_points = int(cp_matches[-1]) if cp_matches else None
+        mark_match = re.search(r'\b(\d{1,2}\.\d|\d{1,2}|100)\b', line)
+        mark = None
+        if mark_match and 0 <= float(mark_match.group(1)) <= 100:
+            mark = int(float(mark_match.group(1)))
+        grade = None
+        for pattern in (r'\b(HD|D|C|P|F|AF|DF|DC|CR|NC|W|AW|FW|SR|DI)\b',
+                        r'\b(High Distinction|Distinction|Credit|Pass|Fail)\b', r'\b(HD|D|C|P|F)\b'):
+            grade_match = re.search(pattern, line, re.IGNORECASE)
+            if grade_match:
+                grade = grade_match.group(1).upper()
+                break
+        title_end = len(line)
+        if grade_match:
+            title_end = grade_match.start()
+        elif mark_match:
+            title_end = mark_match.start()
+        title = re.sub(r'^\s*[-–]\s*', '', line[match.end():title_end].strip())
+        if mark is not None or grade is not None:
+            results.append((match.group(1), title, credit_points, mark, grade))
+    return results
+
+
+@pytest.mark.parametrize('flexible', [False, True])
+def test_matches_original_regexes_on_synthetic_lines(flexible):
+    lines = [line for seed in range(5) for line in generate_transcript(seed=seed, flexible=flexible).lines]
+    for line in lines:
+        assert matcher.match_strict(line) == baseline_strict(line), line
+        assert matcher.match_flexible(line) == baseline_flexible(line), line
+
+
+@pytest.mark.parametrize('line', [
+    '2021 S1C ENGG1810 Introduction to Engineering Computing 74.0 CR 6',
+    'ENGG1810 - Introduction to Engineering Computing Credit 6',
+    'MATH1021 / MATH1023 Calculus 81 HD 3',
+    'Pass with no mark COMP2123 P 6',
+    'ELEC3305 Signals',
+    '',
+])
+def test_edge_lines_match_original_regexes(line):
+    assert matcher.match_strict(line) == baseline_strict(line)
+    assert matcher.match_flexible(line) == baseline_flexible(line)
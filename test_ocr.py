@@ -0,0 +1,104 @@
+"""
+Tests for the OCR fallback, with tesseract replaced by a thread-pool stand-in
+"""
+
+import io
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+import pytest
+
+import ocr
+from conftest import scores
+from instrumentation import Instrumentation
+from ocr import OCRFallback, page_content_hash
+from pdf_parser import TranscriptParser
+from synthetic_transcripts import generate_transcript, render_pdf
+
+SCANNED_LINE = '2025 S1C ELEC4702 Scanned Results 80.0 D 6'
+
+
+class ThreadOCR(OCRFallback):
+    """OCRFallback on threads, so ``ocr._ocr_page`` can be patched."""
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+
+@pytest.fixture
+def scanned(transcript):
+    """``transcript`` with an extra page that has no text layer."""
+    return render_pdf(transcript.pages + [[]])
+
+
+def failed_future(error, executor=None):
+    future = Future()
+    future.set_exception(error)
+    future.page_hash, future.page_index, future.executor = 'hash', 0, executor
+    return future
+
+
+def test_scanned_page_is_ocrd_and_cached(monkeypatch, transcript, scanned):
+    calls = []
+
+    def fake_ocr_page(source, page_index, resolution, lang, timeout):
+        calls.append(page_index)
+        return SCANNED_LINE, 0.25
+
+    monkeypatch.setattr(ocr, '_ocr_page', fake_ocr_page)
+    parser = TranscriptParser(ocr=ThreadOCR())
+    expected = scores(parser.parse_transcript_text(transcript.lines + [SCANNED_LINE]))
+    instrumentation = Instrumentation()
+
+    assert scores(parser.parse_transcript(scanned, instrumentation=instrumentation)) == expected
+    assert scores(parser.parse_transcript(scanned, workers=2)) == expected
+    assert calls == [len(transcript.pages)]
+    assert parser.ocr.stats.cache_hits == 1
+    assert {'page': len(transcript.pages), 'seconds': 0.25, 'source': 'ocr'} in instrumentation.report()['pages']
+    parser.ocr.shutdown()
+
+
+@pytest.mark.parametrize('error, counter', [
+    (RuntimeError('Tesseract process timeout'), 'timeouts'),
+    (RuntimeError('tesseract is not installed'), 'failures'),
+    (OSError('cannot identify image file'), 'failures'),
+])
+def test_ocr_errors_fail_only_the_page(error, counter):
+    fallback = OCRFallback()
+    assert fallback.result(failed_future(error)) == ''
+    assert getattr(fallback.stats, counter) == 1
+    assert len(fallback.cache) == 0
+
+
+def test_broken_pool_is_replaced():
+    fallback = ThreadOCR()
+    broken = fallback._pool()
+    assert fallback.result(failed_future(BrokenProcessPool('worker died'), broken)) == ''
+    # A second page from the same pool doesn't shut down its replacement
+    replacement = fallback._pool()
+    assert replacement is not broken
+    assert fallback.result(failed_future(BrokenProcessPool('worker died'), broken)) == ''
+    assert fallback._pool() is replacement
+    assert fallback.stats.failures == 2
+    fallback.shutdown()
+
+
+def test_unavailable_tesseract_leaves_the_page_blank(transcript, scanned, baseline):
+    if OCRFallback.available():
+        pytest.skip('tesseract is installed')
+    parser = TranscriptParser(ocr=OCRFallback(workers=1))
+    assert scores(parser.parse_transcript(scanned)) == scores(baseline)
+    assert parser.ocr.stats.failures == 1
+    parser.ocr.shutdown()
+
+
+def test_page_hash_identifies_page_content():
+    first = generate_transcript(seed=1, pages=2).to_pdf()
+    with pdfplumber.open(io.BytesIO(first)) as pdf, pdfplumber.open(io.BytesIO(bytes(first))) as again:
+        hashes = [page_content_hash(page) for page in pdf.pages]
+        assert hashes == [page_content_hash(page) for page in again.pages]
+    assert len(set(hashes)) == len(hashes)
@@ -0,0 +1,109 @@
+"""
+Tests for shared background parsing in the web front end
+"""
+
+import threading
+
+import pytest
+
+from conftest import scores
+from parse_jobs import ParseJobManager
+from pdf_parser import TranscriptParser
+from preflight import PreflightLimits, TranscriptRejected
+from synthetic_transcripts import generate_transcript
+
+
+class GatedParser(TranscriptParser):
+    """A parser whose parses wait until ``gate`` is set, so jobs can be caught in flight."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.calls = 0
+
+    def parse_transcript(self, pdf_file, **kwargs):
+        self.calls += 1
+        self.started.set()
+        assert self.gate.wait(10)
+        return super().parse_transcript(pdf_file, **kwargs)
+
+
+def test_result_matches_parse_transcript_and_is_cached(transcript, transcript_pdf, baseline):
+    manager = ParseJobManager(TranscriptParser(), workers=1)
+    try:
+        job = manager.submit(transcript_pdf)
+        result = job.result(30)
+        assert result == baseline
+        assert job.progress == 1.0
+        assert job.pages_done == job.pages_total == len(transcript.pages)
+        assert manager.in_flight() == 0
+
+        again = manager.submit(bytearray(transcript_pdf))
+        assert again.cached and again.done()
+        assert scores(again.result()) == scores(baseline)
+    finally:
+        manager.shutdown()
+
+
+def test_duplicate_uploads_join_one_job(transcript_pdf, baseline):
+    parser = GatedParser()
+    manager = ParseJobManager(parser, workers=1)
+    try:
+        first = manager.submit(transcript_pdf)
+        second = manager.submit(transcript_pdf)
+        assert second is first and first.watchers == 2
+        assert not first.done() and first.progress < 1.0
+
+        parser.gate.set()
+        assert first.result(30) == baseline
+        assert parser.calls == 1
+    finally:
+        parser.gate.set()
+        manager.shutdown()
+
+
+def test_abandoned_queued_job_is_cancelled(transcript_pdf):
+    parser = GatedParser()
+    manager = ParseJobManager(parser, workers=1)
+    try:
+        running = manager.submit(transcript_pdf)
+        assert parser.started.wait(10)
+        queued = manager.submit(generate_transcript(seed=2, pages=1).to_pdf())
+        assert manager.in_flight() == 2
+
+        # Still watched by a second session, so it stays queued
+        queued_again = manager.submit(generate_transcript(seed=2, pages=1).to_pdf())
+        manager.release(queued)
+        assert not queued.future.cancelled()
+        manager.release(queued_again)
+        assert queued.future.cancelled()
+        # A running job can't be cancelled; it finishes for the cache
+        manager.release(running)
+        assert manager.in_flight() == 1
+
+        parser.gate.set()
+        running.result(30)
+        assert parser.calls == 1
+    finally:
+        parser.gate.set()
+        manager.shutdown()
+
+
+def test_limits(transcript_pdf):
+    parser = GatedParser()
+    manager = ParseJobManager(parser, workers=1, limits=PreflightLimits(max_concurrent=1, max_pages=1))
+    try:
+        with pytest.raises(TranscriptRejected) as rejected:
+            manager.submit(transcript_pdf)
+        assert rejected.value.reason == 'too_many_pages'
+
+        job = manager.submit(generate_transcript(seed=2, pages=1).to_pdf())
+        with pytest.raises(TranscriptRejected) as rejected:
+            manager.submit(generate_transcript(seed=3, pages=1).to_pdf())
+        assert rejected.value.reason == 'busy'
+        # Joining the job already running isn't another job
+        assert manager.submit(generate_transcript(seed=2, pages=1).to_pdf()) is job
+    finally:
+        parser.gate.set()
+        manager.shutdown()
@@ -0,0 +1,75 @@
+"""
+Tests for zero-copy PDF buffers and shared-memory hand-off
+"""
+
+import io
+import mmap
+import pickle
+
+import pytest
+
+from conftest import scores
+from pdf_buffer import BufferReader, SharedPDF, open_stream, pdf_view, shareable
+
+
+def test_views_share_memory_with_their_source(transcript_pdf, tmp_path):
+    data = bytearray(transcript_pdf)
+    view = pdf_view(data)
+    assert view.readonly and view.obj is data
+    data[0:1] = b'#'
+    assert view[0:1] == b'#'
+
+    upload = io.BytesIO(transcript_pdf)
+    assert pdf_view(upload) == transcript_pdf
+
+    path = tmp_path / 'transcript.pdf'
+    path.write_bytes(transcript_pdf)
+    assert isinstance(pdf_view(str(path)).obj, mmap.mmap)
+    assert pdf_view(path) == transcript_pdf
+    (tmp_path / 'empty.pdf').write_bytes(b'')
+    assert len(pdf_view(str(tmp_path / 'empty.pdf'))) == 0
+
+
+def test_buffer_reader_reads_like_bytes_io():
+    data = bytes(range(256)) * 4
+    reader, expected = BufferReader(memoryview(data)), io.BytesIO(data)
+    for whence, offset, size in ((io.SEEK_SET, 10, 5), (io.SEEK_CUR, 100, 300), (io.SEEK_END, -20, 50),
+                                 (io.SEEK_END, 10, 5), (io.SEEK_SET, 0, -1)):
+        assert reader.seek(offset, whence) == expected.seek(offset, whence)
+        assert reader.read(size) == expected.read(size)
+        assert reader.tell() == expected.tell()
+    target = bytearray(8)
+    reader.seek(3)
+    assert reader.readinto(target) == 8 and bytes(target) == data[3:11]
+    with pytest.raises(ValueError):
+        reader.seek(-1)
+
+
+def test_shared_pdf_pickles_as_a_handle(transcript_pdf):
+    with SharedPDF(transcript_pdf) as shared:
+        pickled = pickle.dumps(shared)
+        assert len(pickled) < 200
+        attached = pickle.loads(pickled)
+        assert attached.view() == transcript_pdf
+        attached.close()
+        # Only the owner frees the segment
+        assert shared.view() == transcript_pdf
+
+        assert shareable(shared) == (shared, None)
+        assert shareable('transcript.pdf') == ('transcript.pdf', None)
+        assert isinstance(open_stream(shared), BufferReader)
+
+
+def test_every_buffer_parses_like_bytes(parser, transcript_pdf, baseline, tmp_path):
+    path = tmp_path / 'transcript.pdf'
+    path.write_bytes(transcript_pdf)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert parser.parse_transcript(mapped) == baseline
+        assert scores(parser.parse_transcript(mapped, workers=2)) == scores(baseline)
+    with SharedPDF(transcript_pdf) as shared:
+        assert parser.parse_transcript(shared) == baseline
+        assert scores(parser.parse_transcript(shared, workers=2)) == scores(baseline)
+
+    source, shared = shareable(io.BytesIO(transcript_pdf))
+    with shared:
+        assert source is shared and shared.view() == transcript_pdf
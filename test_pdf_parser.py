@@ -0,0 +1,46 @@
+"""
+Tests for TranscriptParser's sequential, parallel and streaming extraction
+"""
+
+import io
+
+import pytest
+
+from conftest import scores
+from synthetic_transcripts import generate_transcript
+
+
+def test_extract_text_matches_rendered_text(parser, transcript, transcript_pdf):
+    assert parser.extract_text_from_pdf(transcript_pdf) == transcript.text
+
+
+@pytest.mark.parametrize('pages_per_task', [1, 4])
+def test_parallel_extraction_keeps_page_order(parser, transcript_pdf, pages_per_task):
+    sequential = list(parser.iter_page_texts(transcript_pdf))
+    parallel = list(parser.iter_page_texts(transcript_pdf, workers=2, pages_per_task=pages_per_task))
+    assert parallel == sequential
+
+
+def test_parse_transcript_same_for_every_source(parser, transcript_pdf, baseline, tmp_path):
+    path = tmp_path / 'transcript.pdf'
+    path.write_bytes(transcript_pdf)
+    for source in (str(path), io.BytesIO(transcript_pdf), bytearray(transcript_pdf), memoryview(transcript_pdf)):
+        assert scores(parser.parse_transcript(source)) == scores(baseline)
+    assert scores(parser.parse_transcript(transcript_pdf, workers=2)) == scores(baseline)
+
+
+def test_streamed_lines_parse_like_full_text(parser, transcript, transcript_pdf, baseline):
+    assert parser.parse_transcript_text(parser.iter_lines(transcript_pdf))['units'] == baseline['units']
+    assert parser.parse_transcript_text(transcript.lines)['units'] == baseline['units']
+
+
+def test_bounded_pages_match_sequential_pages(parser, tmp_path):
+    path = tmp_path / 'long.pdf'
+    path.write_bytes(generate_transcript(seed=4, pages=5).to_pdf())
+    bounded = [text for _, text in parser.iter_pages_bounded(str(path), pages_per_open=2)]
+    assert bounded == list(parser.iter_page_texts(str(path)))
+
+
+def test_unreadable_pdf_raises(parser):
+    with pytest.raises(Exception, match='Error reading PDF'):
+        parser.parse_transcript(b'%PDF-1.4 truncated')
@@ -0,0 +1,72 @@
+"""
+Tests for upload pre-flight checks and the per-document time budget
+"""
+
+import pickle
+
+import pytest
+
+from preflight import PreflightLimits, TranscriptRejected, preflight, within_budget
+from synthetic_transcripts import render_pdf
+
+
+def password_protected(pdf: bytes) -> bytes:
+    """``pdf`` with a standard security handler whose empty password doesn't open it."""
+    encrypt = (b"/Encrypt << /Filter /Standard /V 1 /R 2 /O <" + b"ab" * 32 + b"> /U <" + b"cd" * 32
+               + b"> /P -4 >> /ID [<" + b"01" * 16 + b"> <" + b"01" * 16 + b">]")
+    return pdf.replace(b"trailer\n<< ", b"trailer\n<< " + encrypt + b" ", 1)
+
+
+def reason(pdf_file, **limits):
+    with pytest.raises(TranscriptRejected) as rejected:
+        preflight(pdf_file, PreflightLimits(**limits))
+    return rejected.value.reason
+
+
+def test_transcript_passes(transcript, transcript_pdf):
+    assert preflight(transcript_pdf) == {'bytes': len(transcript_pdf), 'pages': len(transcript.pages),
+                                         'encrypted': False, 'text_layer': True}
+    assert preflight(render_pdf([['ACADEMIC TRANSCRIPT']]))['pages'] == 1
+    assert preflight(render_pdf([['2021 S1C ENGG1810 Computing 74.0 CR 6']]))['pages'] == 1
+    # Readers allow junk before the header
+    assert preflight(b'\0' * 100 + transcript_pdf)['pages'] == len(transcript.pages)
+    # A scanned first page can't be checked for markers, so it is let through for OCR
+    assert preflight(render_pdf([[]]))['text_layer'] is False
+
+
+def test_rejections(transcript_pdf):
+    assert reason(transcript_pdf, max_bytes=1024) == 'too_large'
+    assert reason(b'\0' * 2048 + transcript_pdf) == 'not_pdf'
+    assert reason(b'hello') == 'not_pdf'
+    assert reason(b'%PDF-1.4 truncated') == 'unreadable'
+    assert reason(transcript_pdf, max_pages=1) == 'too_many_pages'
+    assert reason(render_pdf([['Quarterly sales report'], ['Page 2']])) == 'not_transcript'
+    assert reason(render_pdf([['Quarterly sales report, June2024']])) == 'not_transcript'
+    assert reason(password_protected(transcript_pdf)) == 'encrypted'
+    assert preflight(render_pdf([['Quarterly sales report']]), PreflightLimits(require_markers=False))['pages'] == 1
+
+
+def test_rejection_survives_pickling():
+    rejected = pickle.loads(pickle.dumps(TranscriptRejected('busy', 'Try again')))
+    assert (rejected.reason, rejected.message, str(rejected)) == ('busy', 'Try again', 'Try again')
+
+
+def test_time_budget(parser, transcript_pdf, baseline):
+    assert list(within_budget(iter(range(3)), None)) == [0, 1, 2]
+    assert list(within_budget(range(3), 60)) == [0, 1, 2]
+
+    closed = []
+
+    def pages():
+        try:
+            yield from range(3)
+        finally:
+            closed.append(True)
+
+    with pytest.raises(TranscriptRejected) as rejected:
+        list(within_budget(pages(), -1))
+    assert rejected.value.reason == 'time_budget' and closed == [True]
+
+    assert parser.parse_transcript(transcript_pdf, time_budget=60) == baseline
+    with pytest.raises(TranscriptRejected):
+        parser.parse_transcript(transcript_pdf, time_budget=-1)
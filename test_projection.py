@@ -0,0 +1,92 @@
+"""
+Tests for the Monte Carlo EIHWAM projection against scoring each scenario in full
+"""
+
+import numpy as np
+import pytest
+
+from projection import MIN_STD, EIHWAMProjection, MarkDistribution
+from simulator import WhatIfSimulator
+
+# Remaining units: (code, credit points); a thesis, a 0 CP PEP unit and a 1000-level unit among them
+REMAINING = [('ELEC4702', 6), ('ENGG4000', 12), ('ENGP3000', 0), ('MATH1021', 6), ('CIVL3205', 6)]
+
+
+def rescore(parser, baseline, marks):
+    """EIHWAM of ``baseline``'s units plus each remaining unit at its mark, computed from scratch."""
+    lines = [f"2025 S1C {code} Future unit {mark:.1f} CR {credit_points}"
+             for (code, credit_points), mark in zip(REMAINING, marks)]
+    units = [unit.to_dict() for unit in baseline['units']] + parser.parse_units(lines)
+    return parser.evaluate_units(units)['eihwam']
+
+
+def projection(baseline, distribution=None):
+    remaining = [{'code': code, 'credit_points': credit_points} for code, credit_points in REMAINING]
+    return EIHWAMProjection.from_units(baseline['units'], remaining, distribution)
+
+
+def test_scenarios_match_full_recalculation(parser, baseline):
+    projected = projection(baseline)
+    levels = [parser.rules.level(code) for code, _ in REMAINING]
+    marks = projected.distribution.sample(levels, 25, np.random.default_rng(3))
+
+    eihwam = projected.sample_eihwam(25, seed=3)
+    expected = [rescore(parser, baseline, scenario) for scenario in marks]
+    assert eihwam == pytest.approx(expected, abs=0.011)
+
+
+def test_without_spread_every_scenario_is_the_same(parser, baseline):
+    fixed = MarkDistribution({}, mean=72, std=0)
+    result = projection(baseline, fixed).project(scenarios=1000, seed=1)
+    eihwam = rescore(parser, baseline, [72] * len(REMAINING))
+
+    assert result['mean'] == pytest.approx(eihwam, abs=0.011) and result['std'] == 0
+    assert result['current_eihwam'] == baseline['eihwam']
+    assert result['class_probabilities'][result['most_likely_class']] == 1.0
+    assert result['most_likely_class'] == parser.determine_honours_class(result['mean'])
+
+
+def test_no_remaining_units(parser, baseline):
+    result = EIHWAMProjection.from_units(baseline['units'], []).project(scenarios=100)
+    assert result['mean'] == result['current_eihwam'] == baseline['eihwam']
+    assert result['most_likely_class'] == baseline['honours_class']
+
+
+def test_probabilities(baseline):
+    projected = projection(baseline)
+    result = projected.project(scenarios=20_000, seed=7)
+    assert result == projected.project(scenarios=20_000, seed=7)
+    assert sum(result['class_probabilities'].values()) == pytest.approx(1.0, abs=1e-3)
+    assert list(result['percentiles'].values()) == sorted(result['percentiles'].values())
+    assert result['remaining_units'] == len(REMAINING)
+
+
+def test_from_simulator_matches_from_units(parser, baseline):
+    simulator = WhatIfSimulator.from_result(parser, baseline)
+    for code, credit_points in REMAINING:
+        simulator.add_unit(code, code, credit_points)
+    simulator.add_unit('done', 'MECH3361', 6, mark=80)
+    fixed = MarkDistribution({}, mean=72, std=0)
+
+    from_simulator = EIHWAMProjection.from_simulator(simulator, fixed).sample_eihwam(10)
+    for code, _ in REMAINING:
+        simulator.set_mark(code, 72)
+    assert from_simulator == pytest.approx([simulator.eihwam] * 10, abs=0.011)
+
+
+def test_fit():
+    units = [{'level': level, 'mark': mark, 'credit_points': 6, 'included_in_eihwam': True}
+             for level, marks in ((2, (60, 70, 80)), (3, (75, 75, 75)), (4, (90,)))
+             for mark in marks]
+    distribution = MarkDistribution.fit(units)
+    assert distribution.levels == {2: (70.0, 10.0), 3: (75.0, MIN_STD)}
+    assert distribution.parameters([4])[0][0] == pytest.approx(np.mean([60, 70, 80, 75, 75, 75, 90]))
+
+    # Too little history: the prior, or wide defaults
+    assert MarkDistribution.fit(units[:2], prior=distribution) is distribution
+    assert MarkDistribution.fit([]).spread > 0
+
+    # Marks of units excluded for reasons other than their level say nothing of performance
+    withdrawn = {'level': 2, 'mark': 0, 'credit_points': 6, 'included_in_eihwam': False,
+                 'exclusion_reason': 'Withdrawn unit'}
+    assert MarkDistribution.fit(units + [withdrawn] * 3).levels == distribution.levels
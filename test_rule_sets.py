@@ -0,0 +1,122 @@
+"""
+Tests for per-handbook rule sets and their compiled-rules cache
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from conftest import scores
+from rule_sets import DEFAULT_RULE_SETS_PATH, RuleSetRegistry, transcript_profile
+from rules import DEFAULT_RULES_PATH, THESIS_CODES_PATH
+
+# A PEP unit printed with credit points and a mark: 0 CP under current rules, 6 CP before 2018
+PEP_LINE = '2016 S2C ENGP3000 Professional Practice 70.0 D 6'
+
+
+@pytest.fixture(scope='module')
+def registry():
+    return RuleSetRegistry()
+
+
+def test_default_rule_set_matches_parser(registry, parser, transcript, baseline):
+    result = registry.evaluate(parser.parse_units(transcript.lines), 'usyd-engineering')
+    assert scores(result) == scores(baseline)
+    assert result['rule_set'] == 'usyd-engineering'
+
+
+def test_pre_2018_rules(registry, parser, transcript):
+    units = parser.parse_units(transcript.lines + [PEP_LINE])
+    current = registry.evaluate(units, 'usyd-engineering')
+    pre_2018 = registry.evaluate(units, 'usyd-engineering-pre-2018')
+
+    current_pep, pre_2018_pep = current['units'][-1], pre_2018['units'][-1]
+    assert (current_pep['credit_points'], current_pep['included_in_eihwam']) == (0, False)
+    assert (pre_2018_pep['credit_points'], pre_2018_pep['included_in_eihwam']) == (6, True)
+    for current_unit, pre_2018_unit in zip(current['units'], pre_2018['units']):
+        if current_unit['is_thesis']:
+            assert pre_2018_unit['weight'] * 2 == current_unit['weight']
+
+
+def test_compare_is_independent_of_order_and_prior_scoring(registry, parser, transcript):
+    units = parser.parse_units(transcript.lines + [PEP_LINE])
+    forward = registry.compare(units, ['usyd-engineering', 'usyd-engineering-pre-2018'])
+    backward = registry.compare(units, ['usyd-engineering-pre-2018', 'usyd-engineering'])
+    assert forward == backward
+
+    # Units already scored under one rule set start from their printed credit points under another
+    rescored = registry.compare(forward['usyd-engineering-pre-2018']['units'])
+    assert {rule_set: scores(result) for rule_set, result in rescored.items()} == \
+        {rule_set: scores(result) for rule_set, result in forward.items()}
+
+
+def test_select(registry, parser):
+    # The pre-2018 rules are unverified, so they apply only when asked for by id
+    assert registry.select(2016) == registry.select(2018) == registry.select(None) == 'usyd-engineering'
+
+    units = parser.parse_units([PEP_LINE])
+    assert transcript_profile(units, ['Bachelor of Engineering (Honours)']) == (
+        'Bachelor of Engineering (Honours)', 2016)
+    assert registry.evaluate(units)['rule_set'] == 'usyd-engineering'
+    assert registry.evaluate(units, 'usyd-engineering-pre-2018')['rule_set'] == 'usyd-engineering-pre-2018'
+
+
+@pytest.fixture
+def rules_dir(tmp_path):
+    for path in (DEFAULT_RULE_SETS_PATH, DEFAULT_RULES_PATH, THESIS_CODES_PATH):
+        shutil.copy(path, tmp_path)
+    return tmp_path
+
+
+def rewrite(path, data):
+    stat = os.stat(path)
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_compiled_once_per_version(rules_dir):
+    path = str(rules_dir / 'rule_sets.json')
+    registry = RuleSetRegistry(path)
+    first = registry.parser('usyd-engineering')
+    assert registry.parser('usyd-engineering') is first
+
+    with open(path) as f:
+        data = json.load(f)
+    data['rule_sets'].append({'id': 'combined', 'extends': 'usyd-engineering', 'degrees': ['Combined'],
+                              'rules': {'honours_classes': {'thresholds': [[80, 'Class I']], 'lowest': 'Pass'}}})
+    rewrite(path, data)
+    # The edit didn't touch usyd-engineering, so it isn't rebuilt
+    assert registry.parser('usyd-engineering') is first
+    assert registry.compile('combined').honours_class(79) == 'Pass'
+    assert registry.select(2020, 'Bachelor of Engineering (Combined)') == 'combined'
+
+    rewrite(str(rules_dir / 'thesis_codes.json'), {'thesis_units': ['ZZZZ4999']})
+    rebuilt = registry.parser('usyd-engineering')
+    assert rebuilt is not first and rebuilt.thesis_codes == {'ZZZZ4999'}
+
+
+def test_verified_rule_sets_are_selected_by_year(rules_dir):
+    path = str(rules_dir / 'rule_sets.json')
+    with open(path) as f:
+        data = json.load(f)
+    for entry in data['rule_sets']:
+        entry.pop('verified', None)
+    rewrite(path, data)
+    registry = RuleSetRegistry(path)
+    assert registry.select(2016) == 'usyd-engineering-pre-2018'
+    assert registry.select(2018) == registry.select(None) == 'usyd-engineering'
+
+
+@pytest.mark.parametrize('entries, error', [
+    ([{'id': 'a', 'rules_file': 'eihwam_rules.json'}, {'id': 'a', 'rules_file': 'eihwam_rules.json'}], ValueError),
+    ([{'id': 'a', 'extends': 'b'}, {'id': 'b', 'extends': 'a'}], ValueError),
+    ([{'id': 'a', 'extends': 'missing'}], KeyError),
+])
+def test_invalid_definitions(rules_dir, entries, error):
+    path = str(rules_dir / 'rule_sets.json')
+    rewrite(path, {'rule_sets': entries})
+    with pytest.raises(error):
+        RuleSetRegistry(path).compile('a')
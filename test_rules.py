@@ -0,0 +1,109 @@
+"""
+Tests for the indexed EIHWAM rules against the original if/elif chain, and reloading rules files
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from pdf_parser import TranscriptParser
+from rules import DEFAULT_RULES_PATH, THESIS_CODES_PATH, GradeRule, RuleIndex, load_rule_index
+from synthetic_transcripts import generate_transcript
+
+
+def baseline_classify(unit):
+    """The original ``apply_eihwam_rules`` and ``calculate_weights`` for one unit."""
+    if unit['grade'] in ['P', 'F', 'CR', 'NC'] and unit['mark'] is None:
+        unit['included_in_eihwam'], unit['exclusion_reason'] = False, 'Pass/Fail only unit'
+    elif unit['grade'] == 'DC':
+        unit['included_in_eihwam'], unit['exclusion_reason'] = False, 'Discontinued unit'
+    elif unit['grade'] in ['W', 'AW', 'FW']:
+        unit['included_in_eihwam'], unit['exclusion_reason'] = False, 'Withdrawn unit'
+    elif unit['grade'] == 'SR':
+        unit['included_in_eihwam'], unit['exclusion_reason'] = False, 'Satisfactory Requirements (PEP unit)'
+    elif unit['grade'] in ['AF', 'DF']:
+        unit['mark'] = 0
+    elif unit['level'] == 1:
+        unit['included_in_eihwam'], unit['exclusion_reason'] = False, '1000-level unit (weight = 0)'
+    elif unit['credit_points'] is None or unit['mark'] is None:
+        unit['included_in_eihwam'], unit['exclusion_reason'] = False, 'Missing credit points or mark'
+    elif unit['credit_points'] == 0:
+        unit['included_in_eihwam'], unit['exclusion_reason'] = False, '0 credit point unit'
+
+    level = unit['level']
+    unit['weight'] = {1: 0, 2: 2, 3: 3}.get(level, 4 if level >= 4 else 0)
+    unit['wam_weight'] = {1: 1, 2: 2, 3: 3}.get(level, 4 if level >= 4 else 1)
+    if unit['is_thesis']:
+        unit['weight'] *= 2
+        unit['wam_weight'] *= 2
+    return unit
+
+
+@pytest.mark.parametrize('flexible', [False, True])
+def test_classification_matches_original_chain(parser, flexible):
+    for seed in range(10):
+        units = parser.parse_units(generate_transcript(seed=seed, flexible=flexible).lines)
+        expected = [baseline_classify(unit.to_dict()) for unit in units]
+        assert [unit.to_dict() for unit in parser.classify_units(units)] == expected
+
+
+def test_code_lookups():
+    rules = RuleIndex([], [], {}, [0, 0, 2, 3, 4], [1, 1, 2, 3, 4],
+                      credit_point_overrides={'ENGP': 0, 'ENGP3': 3, 'X': 1})
+    assert rules.credit_points('ENGP2001', 6) == 0
+    assert rules.credit_points('ENGP3001', 6) == 3
+    assert rules.credit_points('XENG1001', 6) == 1
+    assert rules.credit_points('ELEC1001', 6) == 6
+    assert rules.level('ELEC5001') == 5 and rules.weights(5, True) == (8, 8)
+    assert rules.level('ELECX001') == 0
+
+    default = load_rule_index()
+    assert default.code_info('ENGG4000') == (4, True, None)
+    assert default.code_info('ENGP1000') == (1, False, 0)
+    assert [default.honours_class(mark) for mark in (75, 74.99, 70, 65, 64.99)] == [
+        'Class I', 'Class II Division 1', 'Class II Division 1', 'Class II Division 2', 'Class III']
+
+
+def test_grade_rule_needs_one_action():
+    with pytest.raises(ValueError):
+        GradeRule(['AF'])
+    with pytest.raises(ValueError):
+        GradeRule(['AF'], exclude='Absent fail', mark=0)
+
+
+@pytest.fixture
+def rules_dir(tmp_path):
+    shutil.copy(DEFAULT_RULES_PATH, tmp_path / 'eihwam_rules.json')
+    shutil.copy(THESIS_CODES_PATH, tmp_path / 'thesis_codes.json')
+    return tmp_path
+
+
+def touch(path, data):
+    """Rewrite ``path`` with a modification time that is certain to differ."""
+    stat = os.stat(path)
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_rules_reload_when_files_change(rules_dir):
+    rules_path = str(rules_dir / 'eihwam_rules.json')
+    thesis_path = str(rules_dir / 'thesis_codes.json')
+    first = load_rule_index(rules_path)
+    assert load_rule_index(rules_path) is first
+
+    touch(thesis_path, {'thesis_units': ['ZZZZ4999']})
+    second = load_rule_index(rules_path)
+    assert second is not first and second.thesis_codes == {'ZZZZ4999'}
+    assert second.version != first.version
+
+    with open(rules_path) as f:
+        data = json.load(f)
+    data['thesis_multiplier'] = 1
+    touch(rules_path, data)
+    parser = TranscriptParser(rules=second)
+    parser.reload_rules(rules_path)
+    assert parser.rules.thesis_multiplier == 1
+    assert parser.rules_version != TranscriptParser(rules=second).rules_version
@@ -0,0 +1,113 @@
+"""
+Tests for the incremental what-if simulator against full recalculation
+"""
+
+import json
+
+import pytest
+
+from pdf_parser import TranscriptParser
+from rules import DEFAULT_RULES_PATH, RuleIndex
+from simulator import WhatIfSimulator
+
+# Hypothetical units as transcript lines, so the parser can score them from scratch
+HYPOTHETICAL = {
+    'elec': ('ELEC4702', 6, 'D'),
+    'thesis': ('ENGG4000', 12, 'CR'),
+    'pep': ('ENGP3000', 0, 'SR'),
+    'first-year': ('MATH1021', 6, 'HD'),
+    'absent-fail': ('MECH3361', 6, 'AF'),
+}
+
+
+def recalculate(parser, baseline, marks):
+    """EIHWAM and WAM of ``baseline``'s units plus each hypothetical unit at its mark."""
+    lines = [f"2025 S1C {HYPOTHETICAL[key][0]} Hypothetical unit {mark}.0 {HYPOTHETICAL[key][2]} "
+             f"{HYPOTHETICAL[key][1]}" for key, mark in marks.items()]
+    units = [unit.to_dict() for unit in baseline['units']] + parser.parse_units(lines)
+    result = parser.evaluate_units(units)
+    return result['eihwam'], result['wam']
+
+
+@pytest.fixture
+def simulator(parser, baseline):
+    return WhatIfSimulator.from_result(parser, baseline)
+
+
+def test_starts_at_parsed_result(simulator, baseline):
+    assert (simulator.eihwam, simulator.wam, simulator.honours_class) == (
+        baseline['eihwam'], baseline['wam'], baseline['honours_class'])
+
+
+def test_updates_match_full_recalculation(parser, baseline, simulator):
+    marks = {'elec': 81, 'thesis': 77, 'pep': 0, 'first-year': 90, 'absent-fail': 45}
+    for key, mark in marks.items():
+        code, credit_points, grade = HYPOTHETICAL[key]
+        simulator.add_unit(key, code, credit_points, mark, grade)
+    assert (simulator.eihwam, simulator.wam) == recalculate(parser, baseline, marks)
+
+    simulator.set_mark('thesis', 55)
+    marks['thesis'] = 55
+    assert (simulator.eihwam, simulator.wam) == recalculate(parser, baseline, marks)
+
+    simulator.remove_unit('elec')
+    del marks['elec']
+    assert (simulator.eihwam, simulator.wam) == recalculate(parser, baseline, marks)
+
+    for key in list(marks):
+        simulator.remove_unit(key)
+    assert (simulator.eihwam, simulator.wam) == (baseline['eihwam'], baseline['wam'])
+
+
+def test_pending_units_count_for_nothing(simulator, baseline):
+    simulator.add_unit('elec', 'ELEC4702')
+    assert simulator.eihwam == baseline['eihwam']
+    simulator.set_mark('elec', 100)
+    assert simulator.eihwam > baseline['eihwam']
+    simulator.set_mark('elec', None)
+    assert simulator.eihwam == baseline['eihwam']
+
+
+def test_fixed_marks_come_from_the_grade_rules(parser, baseline):
+    with open(DEFAULT_RULES_PATH) as f:
+        data = json.load(f)
+    # Only XF fixes a mark; AF and DF are ordinary graded results under these rules
+    data['grade_rules'] = [rule for rule in data['grade_rules'] if 'mark' not in rule]
+    data['grade_rules'].append({'grades': ['XF'], 'mark': 10})
+    custom = WhatIfSimulator.from_result(TranscriptParser(rules=RuleIndex.from_dict(data)), baseline)
+    expected = WhatIfSimulator.from_result(parser, baseline)
+
+    custom.add_unit('fixed', 'MECH3361', 6, 90, 'XF')
+    custom.add_unit('absent-fail', 'ELEC4702', 6, 45, 'AF')
+    expected.add_unit('fixed', 'MECH3361', 6, 10)
+    expected.add_unit('absent-fail', 'ELEC4702', 6, 45)
+    assert (custom.eihwam, custom.wam) == (expected.eihwam, expected.wam)
+
+    # Changing the mark of a unit whose grade fixes it changes nothing
+    custom.set_mark('fixed', 100)
+    assert (custom.eihwam, custom.wam) == (expected.eihwam, expected.wam)
+
+
+@pytest.mark.parametrize('target', [60.0, 70.0, 75.0, 80.0])
+def test_required_mark_is_the_minimum(parser, baseline, simulator, target):
+    simulator.add_unit('elec', 'ELEC4702')
+    simulator.add_unit('thesis', 'ENGG4000', 12)
+    mark = simulator.required_mark(target)
+
+    def reached(mark):
+        return recalculate(parser, baseline, {'elec': mark, 'thesis': mark})[0] >= target
+
+    if mark is None:
+        assert not reached(100)
+    else:
+        assert reached(mark)
+        assert mark == 0 or not reached(mark - 1)
+
+
+def test_required_marks_need_a_counting_pending_unit(simulator):
+    assert simulator.required_mark(70.0) is None
+    simulator.add_unit('pep', 'ENGP3000', 0)
+    assert simulator.required_mark(70.0) is None
+    simulator.add_unit('elec', 'ELEC4702')
+    assert set(simulator.required_marks()) == {honours_class for _, honours_class
+                                              in simulator.parser.rules.honours_thresholds}
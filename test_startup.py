@@ -0,0 +1,46 @@
+"""
+Tests that heavy dependencies stay out of cold starts until they are needed
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ('pdfplumber', 'pdfminer', 'pandas', 'numpy', 'PIL')
+
+
+def loaded_after(code):
+    """Which of ``HEAVY_MODULES`` (and multiprocessing) a fresh interpreter has loaded after running ``code``."""
+    check = code + "\nimport sys\nprint(' '.join(name for name in sys.argv[1:] if name in sys.modules))"
+    completed = subprocess.run([sys.executable, '-c', check, *HEAVY_MODULES, 'multiprocessing'], cwd=REPO,
+                               capture_output=True, text=True, check=True)
+    return set(completed.stdout.split())
+
+
+@pytest.mark.parametrize('module', ['pdf_parser', 'batch', 'api_server', 'parse_jobs', 'simulator', 'rule_sets'])
+def test_import_loads_no_heavy_dependencies(module):
+    assert loaded_after(f"import {module}").isdisjoint(HEAVY_MODULES)
+
+
+def test_text_parsing_never_loads_pdf_or_pool_modules():
+    code = ("from pdf_parser import TranscriptParser\n"
+            "TranscriptParser().parse_transcript_text('2021 S1C ENGG1810 Computing 74.0 CR 6')")
+    assert loaded_after(code) == set()
+
+
+def test_pdfplumber_loads_on_first_pdf(transcript_pdf, tmp_path):
+    path = tmp_path / 'transcript.pdf'
+    path.write_bytes(transcript_pdf)
+    loaded = loaded_after(f"from pdf_parser import TranscriptParser\nTranscriptParser().parse_transcript({str(path)!r})")
+    assert 'pdfplumber' in loaded
+    assert 'pandas' not in loaded and 'multiprocessing' not in loaded
+
+
+def test_thesis_codes_are_read_once():
+    from rules import load_thesis_codes
+
+    assert load_thesis_codes() is load_thesis_codes()
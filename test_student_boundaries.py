@@ -0,0 +1,68 @@
+"""
+Tests for streaming merged cohort PDFs one student at a time
+"""
+
+import pytest
+
+from batch import split_students
+from conftest import scores
+from student_boundaries import StudentBoundaryDetector
+from synthetic_transcripts import generate_transcript, render_pdf
+
+
+@pytest.fixture(scope='module')
+def cohort():
+    """Three transcripts of different lengths, each also rendered on its own."""
+    return [generate_transcript(seed=seed, pages=pages) for seed, pages in ((1, 2), (2, 1), (3, 3))]
+
+
+@pytest.fixture(scope='module')
+def merged_pdf(cohort, tmp_path_factory):
+    """The cohort merged into one export, with a page lacking a text layer after the first student."""
+    pages = cohort[0].pages + [[]] + cohort[1].pages + cohort[2].pages
+    path = tmp_path_factory.mktemp('cohort') / 'cohort.pdf'
+    path.write_bytes(render_pdf(pages))
+    return str(path)
+
+
+@pytest.mark.parametrize('pages_per_open', [1, 32])
+def test_one_result_per_student_matches_parse_transcript(parser, cohort, merged_pdf, pages_per_open):
+    results = list(parser.iter_student_results(merged_pdf, pages_per_open=pages_per_open))
+
+    assert [result['student_id'] for result in results] == [transcript.student_id for transcript in cohort]
+    first_page = 1
+    for result, transcript in zip(results, cohort):
+        assert scores(result) == scores(parser.parse_transcript(transcript.to_pdf()))
+        assert result['first_page'] == first_page
+        assert result['last_page'] == first_page + len(transcript.pages) - 1
+        first_page = result['last_page'] + 1 + (transcript is cohort[0])
+
+
+def test_bounded_pages_skip_pages_without_text(parser, cohort, merged_pdf):
+    indexes = [index for index, _ in parser.iter_pages_bounded(merged_pdf, pages_per_open=2)]
+    blank = len(cohort[0].pages)
+    assert indexes == [index for index in range(sum(len(t.pages) for t in cohort) + 1) if index != blank]
+
+
+def test_detector():
+    detector = StudentBoundaryDetector()
+    assert detector.starts_new_student("Student ID: 512345678\nPage 1 of 2")
+    assert not detector.starts_new_student("Page 2 of 2")
+    assert detector.student_id == '512345678'
+    # Without page numbers, only a change of ID starts a new student
+    assert not detector.starts_new_student("SID: 512345678")
+    assert detector.starts_new_student("Student Number 598765432")
+    assert not detector.starts_new_student("2021 S1C ENGG1810 Computing 74.0 CR 6")
+    assert detector.student_id == '598765432'
+
+
+def test_split_students_rows(parser, cohort, merged_pdf, tmp_path):
+    broken = tmp_path / 'broken.pdf'
+    broken.write_bytes(b'%PDF-1.4 not really a pdf')
+    rows = list(split_students([merged_pdf, str(broken)]))
+
+    assert [row.get('student_id') for row in rows] == [t.student_id for t in cohort] + [None]
+    for row, transcript in zip(rows, cohort):
+        assert row['status'] == 'ok' and row['file'] == merged_pdf
+        assert scores(row) == scores(parser.parse_transcript(transcript.to_pdf()))
+    assert rows[-1]['status'] == 'error' and rows[-1]['file'] == str(broken)
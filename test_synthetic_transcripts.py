@@ -0,0 +1,55 @@
+"""
+Tests for the synthetic transcript generator used by benchmarks and tests
+"""
+
+import os
+
+from synthetic_transcripts import GRADES, LINES_PER_PAGE, generate_transcript, load_thesis_codes, main
+
+
+def test_generation_is_deterministic():
+    assert generate_transcript(seed=7).to_pdf() == generate_transcript(seed=7).to_pdf()
+    assert generate_transcript(seed=7).lines != generate_transcript(seed=8).lines
+
+
+def test_pages_and_header(transcript):
+    assert len(transcript.pages) == 2
+    assert all(len(page) <= LINES_PER_PAGE for page in transcript.pages)
+    assert f"Student ID: {transcript.student_id}" in transcript.lines
+    assert transcript.pages[-1][-1] == 'Page 2 of 2'
+
+
+def test_every_unit_line_parses(parser):
+    transcripts = [generate_transcript(seed=seed, pages=3) for seed in range(5)]
+    for transcript in transcripts:
+        unit_lines = [line for line in transcript.lines if parser.matcher.match_strict(line)]
+        assert len(parser.parse_units(transcript.lines)) == len(unit_lines) > 0
+
+    units = [unit for transcript in transcripts for unit in parser.parse_units(transcript.lines)]
+    assert {unit['grade'] for unit in units} >= {grade for grade, _ in GRADES if grade != 'NC'}
+    assert {unit['level'] for unit in units} == {1, 2, 3, 4}
+    assert any(unit['is_thesis'] for unit in units)
+    assert any(unit['code'].startswith('ENGP') and unit['credit_points'] == 0 for unit in units)
+
+
+def test_flexible_transcripts_need_the_fallback_parser(parser):
+    transcript = generate_transcript(seed=3, flexible=True)
+    assert not any(parser.matcher.match_strict(line) for line in transcript.lines)
+    assert parser.parse_units(transcript.lines)
+
+
+def test_tabular_transcript_reads_as_text(parser):
+    tabular = generate_transcript(seed=2, tabular=True)
+    assert parser.extract_text_from_pdf(tabular.to_pdf()).split('\n')[:4] == tabular.lines[:4]
+
+
+def test_thesis_codes_override(parser):
+    units = parser.parse_units(generate_transcript(seed=1, pages=3, thesis_codes=['ZZZZ4999']).lines)
+    thesis_units = [unit for unit in units if unit['code'] == 'ZZZZ4999']
+    assert thesis_units and not any(unit['is_thesis'] for unit in thesis_units)
+    assert 'ZZZZ4999' not in load_thesis_codes()
+
+
+def test_cli_writes_pdfs(tmp_path):
+    assert main([str(tmp_path), '-n', '2', '--pages', '1', '--seed', '5']) == 0
+    assert sorted(os.listdir(tmp_path)) == ['transcript-00005.pdf', 'transcript-00006.pdf']
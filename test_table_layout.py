@@ -0,0 +1,94 @@
+"""
+Tests for layout-aware results-table extraction and its fallback to the text parser
+"""
+
+import pytest
+
+from conftest import scores
+from instrumentation import Instrumentation
+from pdf_parser import TranscriptParser
+from synthetic_transcripts import generate_transcript
+from table_layout import extract_table_rows, group_rows
+
+
+def printed_rows(transcript):
+    """The table rows a tabular synthetic transcript was rendered from, wrapped titles rejoined."""
+    rows = []
+    for page in transcript.pages:
+        for line in page:
+            if isinstance(line, str):
+                continue
+            year, session, code, title, mark, grade, credit_points = line
+            if year:
+                rows.append([year, session, code, title, float(mark) if mark else None, grade, int(credit_points)])
+            else:
+                rows[-1][3] += ' ' + title
+    return [tuple(row) for row in rows]
+
+
+@pytest.fixture(scope='module')
+def layout_parser():
+    return TranscriptParser(layout=True)
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_tabular_transcript_reads_every_printed_row(layout_parser, seed):
+    transcript = generate_transcript(seed=seed, pages=2, tabular=True)
+    pdf = transcript.to_pdf()
+    expected = printed_rows(transcript)
+
+    assert list(layout_parser.iter_table_rows(pdf)) == expected
+    assert list(layout_parser.iter_table_rows(pdf, workers=2, pages_per_task=1)) == expected
+    result = layout_parser.parse_transcript(pdf)
+    assert result['units'] == layout_parser.evaluate_units(layout_parser.units_from_table_rows(expected))['units']
+
+
+def test_layout_matches_text_parser_on_line_transcripts(layout_parser, transcript_pdf, baseline):
+    instrumentation = Instrumentation()
+    result = layout_parser.parse_transcript(transcript_pdf, instrumentation=instrumentation)
+    assert 'layout_fallbacks' not in instrumentation.counters
+    for key in ('eihwam', 'wam', 'honours_class', 'included_units'):
+        assert result[key] == baseline[key]
+
+    # Layout also reads pass/fail rows with no printed mark, which the line pattern skips
+    extra = [unit for unit in result['units'] if unit not in baseline['units']]
+    assert [unit for unit in result['units'] if unit not in extra] == baseline['units']
+    assert all(unit['mark'] is None and unit['exclusion_reason'] == 'Pass/Fail only unit' for unit in extra)
+
+
+def test_falls_back_to_text_without_a_table(layout_parser, parser):
+    pdf = generate_transcript(seed=2, flexible=True).to_pdf()
+    instrumentation = Instrumentation()
+    result = layout_parser.parse_transcript(pdf, instrumentation=instrumentation)
+    assert instrumentation.counters['layout_fallbacks'] == 1
+    assert scores(result) == scores(parser.parse_transcript(pdf))
+
+
+def words(*rows):
+    """pdfplumber-style words from (top, [(x0, text), ...]) rows."""
+    return [{'text': text, 'x0': x0, 'top': top} for top, cells in rows for x0, text in cells]
+
+
+def test_columns_come_from_word_positions():
+    page = words(
+        (100, [(36, '2021'), (66, 'S1C'), (106, 'ELEC1001'), (156, 'Signals'), (420, '74.0'),
+               (460, 'CR'), (490, '6')]),
+        (110, [(10, '*'), (156, 'and'), (190, 'Systems')]),
+        (120, [(36, '2021'), (66, 'S1C'), (106, 'MATH1002'), (156, 'Linear'), (190, 'Algebra'), (230, '2'),
+               (460, 'P'), (490, '6')]),
+        (130, [(36, '2021'), (66, 'S2C'), (106, 'ENGG1111'), (156, 'Design'), (420, '65.0'), (460, 'CR'),
+               (490, '6')]),
+        (200, [(36, 'Page'), (66, '1')]),
+    )
+    assert [len(row) for row in group_rows(page)] == [7, 3, 8, 7, 2]
+    assert extract_table_rows(page) == [
+        ('2021', 'S1C', 'ELEC1001', 'Signals and Systems', 74.0, 'CR', 6),
+        # A title ending in a number is not taken for a mark
+        ('2021', 'S1C', 'MATH1002', 'Linear Algebra 2', None, 'P', 6),
+        ('2021', 'S2C', 'ENGG1111', 'Design', 65.0, 'CR', 6),
+    ]
+
+
+def test_page_without_table_rows():
+    assert extract_table_rows(words((100, [(36, 'Academic'), (90, 'Transcript')]))) == []
+    assert extract_table_rows([]) == []
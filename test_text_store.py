@@ -0,0 +1,92 @@
+"""
+Tests for the persistent transcript text store and re-scoring from it
+"""
+
+import os
+from unittest import mock
+
+from batch import BatchProcessor, discover_pdfs, recompute_from_store
+from cache import hash_pdf_bytes
+from conftest import scores
+from text_store import TranscriptTextStore
+
+
+def test_put_get_and_reopen(tmp_path):
+    store = TranscriptTextStore(str(tmp_path))
+    store.put('a', ['line one', 'line two'], source='a.pdf')
+    store.put('a', ['ignored'])
+    store.put('b', [''])
+    store.close()
+
+    reopened = TranscriptTextStore(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.get('a') == ['line one', 'line two']
+    assert reopened.source('a') == 'a.pdf' and reopened.source('b') is None
+    assert reopened.get('b') == ['']
+    assert reopened.get('missing') is None
+    reopened.close()
+
+
+def test_readers_see_other_writers(tmp_path):
+    reader = TranscriptTextStore(str(tmp_path))
+    writer = TranscriptTextStore(str(tmp_path))
+    writer.put('a', ['first'])
+    assert reader.get('a') == ['first']
+    writer.put('b', ['second'])
+    assert reader.get('b') == ['second']
+    assert sorted(reader.hashes()) == ['a', 'b']
+
+
+def test_half_written_index_entry_is_skipped(tmp_path):
+    store = TranscriptTextStore(str(tmp_path))
+    store.put('a', ['first'])
+    store.close()
+    # A writer crashed part way through its index entry
+    with open(tmp_path / TranscriptTextStore.INDEX_NAME, 'ab') as f:
+        f.write(b'{"hash": "b", "segm')
+
+    store = TranscriptTextStore(str(tmp_path))
+    assert store.hashes() == ['a']
+    store.put('c', ['third'])
+    store.close()
+
+    reopened = TranscriptTextStore(str(tmp_path))
+    assert sorted(reopened.hashes()) == ['a', 'c']
+    assert reopened.get('c') == ['third']
+    reopened.close()
+
+
+def test_segments_roll_over(tmp_path):
+    store = TranscriptTextStore(str(tmp_path), max_segment_bytes=64)
+    for index in range(5):
+        store.put(str(index), [os.urandom(40).hex()])
+    assert len([name for name in os.listdir(tmp_path) if name.startswith('segment-')]) > 1
+    assert [store.get(str(index)) is not None for index in range(5)] == [True] * 5
+
+
+def test_stored_lines_rescore_like_the_pdf(parser, transcript_pdf, baseline, tmp_path):
+    path = tmp_path / 'transcript.pdf'
+    path.write_bytes(transcript_pdf)
+    store = TranscriptTextStore(str(tmp_path / 'store'))
+
+    pdf_hash, lines = store.extract_lines(parser, str(path))
+    assert pdf_hash == hash_pdf_bytes(transcript_pdf)
+    assert scores(parser.parse_transcript_text(lines)) == scores(baseline)
+
+    # A second lookup never opens the PDF
+    with mock.patch.object(parser, 'extract_text_from_pdf', side_effect=AssertionError):
+        assert store.extract_lines(parser, str(path)) == (pdf_hash, lines)
+
+
+def test_recompute_from_store_matches_batch(parser, pdf_dir, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    paths = discover_pdfs(pdf_dir)
+    first_run = {row['file']: row for row in BatchProcessor(workers=1, text_store_dir=store_dir).run(paths)}
+
+    recomputed = {row['file']: row for row in recompute_from_store(store_dir)}
+    assert sorted(recomputed) == paths
+    for path in paths:
+        assert scores(recomputed[path]) == scores(first_run[path]) == scores(parser.parse_transcript(path))
+
+    rows = list(recompute_from_store(store_dir, rule_set_ids=['usyd-engineering']))
+    assert {row['file']: scores(row) for row in rows} == {path: scores(row) for path, row in recomputed.items()}
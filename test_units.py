@@ -0,0 +1,94 @@
+"""
+Tests for the slotted Unit record and the columnar UnitTable
+"""
+
+import copy
+import json
+import pickle
+
+import pytest
+
+from units import Unit, UnitTable, printed_credit_points
+
+
+def make_unit(raw_credit_points=None, **fields):
+    """A unit; ``raw_credit_points`` (if given) as printed before a rule overrode its credit points."""
+    values = dict(code='ELEC3305', title='Signals and Systems', credit_points=6, mark=74, grade='CR',
+                  level=3, is_thesis=False)
+    values.update(fields)
+    unit = Unit(**values)
+    if raw_credit_points is not None:
+        unit.raw_credit_points = raw_credit_points
+    return unit
+
+
+def test_unit_behaves_like_its_dict():
+    unit = make_unit(year='2021', session='S1C')
+    as_dict = dict(unit)
+    assert unit == as_dict
+    assert list(unit) == list(as_dict) == ['code', 'title', 'credit_points', 'mark', 'grade', 'level',
+                                           'is_thesis', 'included_in_eihwam', 'exclusion_reason',
+                                           'year', 'session']
+    assert unit['mark'] == 74 and unit.get('weight') is None and 'weight' not in unit
+    with pytest.raises(KeyError):
+        unit['weight']
+    with pytest.raises(KeyError):
+        unit['not_a_field'] = 1
+
+    unit['weight'] = 3
+    assert unit.get('weight') == 3 and 'weight' in unit
+    assert json.loads(json.dumps(unit.to_dict())) == unit
+
+
+def test_unit_copies_and_pickles_without_unset_fields():
+    unit = make_unit(code='ENGP3001', credit_points=0, raw_credit_points=6)
+    for copied in (pickle.loads(pickle.dumps(unit)), copy.deepcopy(unit)):
+        assert copied == unit
+        assert 'year' not in copied and printed_credit_points(copied) == 6
+
+
+def test_printed_credit_points_stay_out_of_results():
+    unit = make_unit(code='ENGP3001', credit_points=0, raw_credit_points=6)
+    assert 'raw_credit_points' not in unit and 'raw_credit_points' not in unit.to_dict()
+    assert unit == make_unit(code='ENGP3001', credit_points=0)
+    assert printed_credit_points(unit) == 6
+    # Units without an override, and plain dicts, were printed as they are
+    assert printed_credit_points(Unit.from_dict(unit.to_dict())) == 0
+    assert printed_credit_points(make_unit()) == printed_credit_points(make_unit().to_dict()) == 6
+
+
+def test_parsed_units_round_trip_through_table(parser, transcript, baseline):
+    table = UnitTable(baseline['units'])
+    assert len(table) == len(baseline['units'])
+    assert table.to_units() == baseline['units']
+    assert table.column('mark') == [unit['mark'] for unit in baseline['units']]
+    printed = [printed_credit_points(unit) for unit in baseline['units']]
+    assert 0 in [unit['credit_points'] for unit in baseline['units']] and 6 in printed
+    assert [printed_credit_points(unit) for unit in table] == printed
+
+    # Unclassified units (no weights yet) round-trip too
+    units = parser.parse_units(transcript.lines)
+    assert UnitTable(units).to_units() == units
+
+
+def test_none_and_unset_fields_stay_distinct():
+    units = [
+        make_unit(mark=None, grade=None, credit_points=None),
+        make_unit(code='ENGP3001', credit_points=0),
+        make_unit(year='2019', session='S2C', weight=4, wam_weight=4, raw_credit_points=6,
+                  included_in_eihwam=False, exclusion_reason='Discontinued'),
+    ]
+    units[1].raw_credit_points = None
+    table = UnitTable(units)
+    assert list(table) == units
+    # No credit points were printed for the second unit, but a rule gave it some
+    assert [printed_credit_points(unit) for unit in table] == [None, None, 6]
+    assert table[1]['credit_points'] == 0
+    assert table.column('exclusion_reason') == [None, None, 'Discontinued']
+
+
+def test_table_shares_repeated_strings(baseline):
+    table = UnitTable(baseline['units'] * 50)
+    codes = table.column('code')
+    assert codes[0] is codes[len(baseline['units'])]
+    assert table.nbytes() > 0
@@ -0,0 +1,55 @@
+"""
+Tests for vectorized EIHWAM and WAM against TranscriptParser
+"""
+
+import pytest
+
+from conftest import scores
+from synthetic_transcripts import generate_transcript
+from units import UnitTable
+from vectorized import (UNIT_COLUMNS, apply_eihwam_rules, calculate_eihwam, calculate_weights, evaluate_cohort,
+                        frame_to_units, table_to_frame, units_to_frame)
+
+
+@pytest.fixture(scope='module')
+def cohort(parser):
+    """Parsed (unclassified) units of strict and flexible-format students."""
+    return {
+        f"{'flexible' if flexible else 'strict'}-{seed}": parser.parse_units(
+            generate_transcript(seed=seed, pages=1, flexible=flexible).lines)
+        for seed in range(6) for flexible in (False, True)
+    }
+
+
+def test_cohort_matches_parser(parser, cohort):
+    frame = evaluate_cohort(cohort)
+    assert list(frame['student']) == list(cohort)
+    for row in frame.to_dict('records'):
+        expected = scores(parser.evaluate_units([unit.to_dict() for unit in cohort[row['student']]]))
+        assert {key: row[key] for key in expected} == expected
+
+
+def test_unit_rules_and_weights_match_parser(parser, cohort):
+    for units in cohort.values():
+        frame = calculate_weights(apply_eihwam_rules(units_to_frame(units)))
+        expected = parser.classify_units([unit.to_dict() for unit in units])
+        columns = UNIT_COLUMNS + ['weight', 'wam_weight']
+        assert [{key: unit[key] for key in columns} for unit in frame_to_units(frame)] == \
+               [{key: unit[key] for key in columns} for unit in expected]
+
+
+def test_table_frame_matches_unit_frame(cohort):
+    units = cohort['strict-0']
+    assert table_to_frame(UnitTable(units)).equals(units_to_frame(units))
+
+
+def test_baseline_transcript(baseline):
+    frame = calculate_weights(apply_eihwam_rules(units_to_frame(baseline['units'])))
+    (row,) = calculate_eihwam(frame).to_dict('records')
+    assert {key: row[key] for key in scores(baseline)} == scores(baseline)
+
+
+def test_empty_groups_score_zero(cohort):
+    frame = evaluate_cohort({'nobody': [], 'strict-0': cohort['strict-0']})
+    nobody = frame.iloc[0]
+    assert (nobody['eihwam'], nobody['wam'], nobody['total_units']) == (0.0, 0.0, 0)
@@ -0,0 +1,170 @@
+"""
+Persistent store of extracted transcript text, keyed by PDF hash
+"""
+
+import json
+import mmap
+import os
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from cache import hash_pdf_bytes
+from pdf_buffer import pdf_view
+
+
+class TranscriptTextStore:
+    """Append-only, compressed store of transcript lines on disk.
+
+    Each transcript's lines are zlib-compressed and appended to the current
+    segment file; ``index.jsonl`` maps the PDF hash to (segment, offset,
+    length) plus the source path it came from. Segments are read through
+    ``mmap``, so looking up a transcript only touches its own bytes.
+    Several processes can append at once; writes are serialised with a
+    file lock and readers pick up new index entries on a miss.
+
+    The store is what makes re-scoring an archive cheap after a rules or
+    thesis-code change: ``TranscriptParser.parse_transcript_text`` runs on
+    the stored lines and pdfplumber is never called.
+    """
+
+    INDEX_NAME = 'index.jsonl'
+    LOCK_NAME = '.lock'
+
+    def __init__(self, directory: str, max_segment_bytes: int = 64 * 1024 * 1024, compression_level: int = 6):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.compression_level = compression_level
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._index: Dict[str, Tuple[int, int, int, Optional[str]]] = {}
+        self._index_offset = 0
+        self._maps: Dict[int, Tuple[int, mmap.mmap]] = {}
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _segment_path(self, segment: int) -> str:
+        return self._path(f'segment-{segment:05d}.bin')
+
+    def _load_index(self):
+        """Read index entries appended since the last load."""
+        path = self._path(self.INDEX_NAME)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            f.seek(self._index_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Partially written entry; pick it up on the next load
+                    break
+                self._index_offset += len(line)
+                try:
+                    entry = json.loads(line)
+                    self._index[entry['hash']] = (entry['segment'], entry['offset'], entry['length'],
+                                                  entry.get('source'))
+                except (ValueError, KeyError, TypeError):
+                    # Left half-written by a writer that crashed; the next writer ended it with a newline
+                    continue
+
+    def __contains__(self, pdf_hash: str) -> bool:
+        if pdf_hash not in self._index:
+            with self._lock:
+                self._load_index()
+        return pdf_hash in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def hashes(self) -> List[str]:
+        """All PDF hashes currently in the store."""
+        with self._lock:
+            self._load_index()
+        return list(self._index)
+
+    def source(self, pdf_hash: str) -> Optional[str]:
+        """The path the transcript was first stored from, if known."""
+        return self._index[pdf_hash][3]
+
+    def _segment_map(self, segment: int) -> mmap.mmap:
+        size = os.path.getsize(self._segment_path(segment))
+        cached = self._maps.get(segment)
+        if cached is not None and cached[0] >= size:
+            return cached[1]
+        # The segment grew since it was mapped; remap to see the new records
+        if cached is not None:
+            cached[1].close()
+        with open(self._segment_path(segment), 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[segment] = (size, mapped)
+        return mapped
+
+    def get(self, pdf_hash: str) -> Optional[List[str]]:
+        """Return the stored lines for ``pdf_hash``, or None."""
+        if pdf_hash not in self:
+            return None
+        segment, offset, length, _ = self._index[pdf_hash]
+        with self._lock:
+            data = self._segment_map(segment)[offset:offset + length]
+        return zlib.decompress(data).decode('utf-8').split('\n')
+
+    def put(self, pdf_hash: str, lines: List[str], source: Optional[str] = None):
+        """Append the lines for ``pdf_hash`` unless they are already stored."""
+        data = zlib.compress('\n'.join(lines).encode('utf-8'), self.compression_level)
+        with self._lock, open(self._path(self.LOCK_NAME), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._load_index()
+                if pdf_hash in self._index:
+                    return
+                segment = max((entry[0] for entry in self._index.values()), default=1)
+                segment_path = self._segment_path(segment)
+                if os.path.exists(segment_path) and os.path.getsize(segment_path) + len(data) > self.max_segment_bytes:
+                    segment += 1
+                    segment_path = self._segment_path(segment)
+                with open(segment_path, 'ab') as f:
+                    offset = f.tell()
+                    f.write(data)
+                entry = {'hash': pdf_hash, 'segment': segment, 'offset': offset,
+                         'length': len(data), 'source': source}
+                record = (json.dumps(entry) + '\n').encode('utf-8')
+                with open(self._path(self.INDEX_NAME), 'a+b') as f:
+                    # A writer that crashed mid-entry leaves no newline; start this entry on a line of its own
+                    if f.seek(0, os.SEEK_END):
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b'\n':
+                            record = b'\n' + record
+                    f.write(record)
+                self._load_index()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def extract_lines(self, parser, pdf_path: str) -> Tuple[str, List[str]]:
+        """Return (hash, lines) for a PDF, extracting and storing them on a miss."""
+        # Memory-mapped, so hashing and extraction share the page cache instead of a heap copy
+        data = pdf_view(pdf_path)
+        pdf_hash = hash_pdf_bytes(data)
+        lines = self.get(pdf_hash)
+        if lines is None:
+            lines = parser.extract_text_from_pdf(data).split('\n')
+            self.put(pdf_hash, lines, source=pdf_path)
+        return pdf_hash, lines
+
+    def iter_transcripts(self) -> Iterator[Tuple[str, Optional[str], List[str]]]:
+        """Yield (hash, source path, lines) for every stored transcript."""
+        for pdf_hash in self.hashes():
+            yield pdf_hash, self.source(pdf_hash), self.get(pdf_hash)
+
+    def close(self):
+        with self._lock:
+            for _, mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
@@ -0,0 +1,281 @@
+"""
+Compact unit records: a slotted Unit and a struct-of-arrays UnitTable
+"""
+
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Marks an optional field that has not been set (as opposed to None)
+_MISSING = object()
+
+# Fields every unit has, in dict order
+REQUIRED_FIELDS = ('code', 'title', 'credit_points', 'mark', 'grade', 'level',
+                   'is_thesis', 'included_in_eihwam', 'exclusion_reason')
+
+# Fields only some units have: year/session come from the strict parser,
+# weights are added by calculate_weights
+OPTIONAL_FIELDS = ('year', 'session', 'weight', 'wam_weight')
+
+_FIELD_ORDER = REQUIRED_FIELDS + OPTIONAL_FIELDS
+_FIELDS = frozenset(_FIELD_ORDER)
+
+
+class Unit:
+    """A parsed unit with a fixed set of slotted fields.
+
+    Supports the dict-style access the rest of the code uses
+    (``unit['mark']``, ``unit.get('year')``, ``dict(unit)``), so it can be
+    used anywhere a unit dict was. Optional fields behave like absent keys
+    until they are set.
+
+    ``raw_credit_points`` keeps the printed credit points of a unit whose
+    credit points a rule overrode, so it can be re-scored under other rules
+    (see ``printed_credit_points``). It is not a field: it stays out of the
+    dict view, ``to_dict`` and equality, so it never reaches results.
+    """
+
+    __slots__ = _FIELD_ORDER + ('raw_credit_points',)
+
+    def __init__(self, code: str, title: str, credit_points: Optional[int], mark: Optional[int],
+                 grade: Optional[str], level: int, is_thesis: bool, included_in_eihwam: bool = True,
+                 exclusion_reason: Optional[str] = None, year=_MISSING, session=_MISSING,
+                 weight=_MISSING, wam_weight=_MISSING, raw_credit_points=_MISSING):
+        self.code = code
+        self.title = title
+        self.credit_points = credit_points
+        self.mark = mark
+        self.grade = grade
+        self.level = level
+        self.is_thesis = is_thesis
+        self.included_in_eihwam = included_in_eihwam
+        self.exclusion_reason = exclusion_reason
+        self.year = year
+        self.session = session
+        self.weight = weight
+        self.wam_weight = wam_weight
+        self.raw_credit_points = raw_credit_points
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Unit':
+        return cls(**{key: data[key] for key in _FIELD_ORDER if key in data})
+
+    def to_dict(self) -> Dict:
+        return {key: value for key, value in self.items()}
+
+    def keys(self) -> List[str]:
+        return [key for key in _FIELD_ORDER if getattr(self, key) is not _MISSING]
+
+    def values(self) -> List:
+        return [getattr(self, key) for key in self.keys()]
+
+    def items(self) -> List[tuple]:
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key) if key in _FIELDS else _MISSING
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key: str):
+        value = getattr(self, key) if key in _FIELDS else _MISSING
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value):
+        if key not in _FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _FIELDS and getattr(self, key) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Unit, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Unit({self.to_dict()!r})"
+
+    def __reduce__(self):
+        # _MISSING does not survive pickling by identity, so send present fields only
+        if self.raw_credit_points is _MISSING:
+            return (_rebuild_unit, (self.to_dict(),))
+        return (_rebuild_unit, (self.to_dict(), self.raw_credit_points))
+
+
+def _rebuild_unit(data: Dict, raw_credit_points=_MISSING) -> Unit:
+    unit = Unit.from_dict(data)
+    unit.raw_credit_points = raw_credit_points
+    return unit
+
+
+def printed_credit_points(unit) -> Optional[int]:
+    """A unit's credit points as printed on the transcript, before any rule overrode them."""
+    raw_credit_points = unit.raw_credit_points if isinstance(unit, Unit) else _MISSING
+    return unit['credit_points'] if raw_credit_points is _MISSING else raw_credit_points
+
+
+class _Interner:
+    """Map repeated strings (codes, grades, reasons) to small integer ids."""
+
+    def __init__(self):
+        self.ids = {None: 0}
+        self.values = [None]
+
+    def id(self, value: Optional[str]) -> int:
+        found = self.ids.get(value)
+        if found is None:
+            found = len(self.values)
+            value = sys.intern(value)
+            self.ids[value] = found
+            self.values.append(value)
+        return found
+
+
+# Sentinel stored in the integer columns for None / unset values
+_NONE = -1
+# Sentinel for an optional field that is absent (where None is a value of its own)
+_UNSET = -2
+
+# Bit flags for UnitTable.flags
+THESIS_FLAG = 1
+INCLUDED_FLAG = 2
+
+
+class UnitTable:
+    """Column-oriented storage for many units (struct of arrays).
+
+    Integer fields live in compact ``array`` columns, and codes, grades,
+    sessions and exclusion reasons are interned once and stored as ids.
+    Titles are the only per-row strings. Rows are materialised as ``Unit``
+    objects on access, so iteration gives the same records that were added.
+    """
+
+    def __init__(self, units: Iterable = ()):
+        self._codes = _Interner()
+        self._grades = _Interner()
+        self._sessions = _Interner()
+        self._reasons = _Interner()
+        self.code_ids = array('I')
+        self.grade_ids = array('H')
+        self.session_ids = array('H')
+        self.reason_ids = array('H')
+        self.titles: List[str] = []
+        self.credit_points = array('h')
+        self.marks = array('h')
+        self.levels = array('b')
+        self.years = array('h')
+        self.weights = array('b')
+        self.wam_weights = array('b')
+        self.raw_credit_points = array('h')
+        self.flags = array('B')
+        self.extend(units)
+
+    def append(self, unit):
+        """Add a Unit (or unit dict) as a new row."""
+        get = unit.get
+        self.code_ids.append(self._codes.id(get('code')))
+        self.grade_ids.append(self._grades.id(get('grade')))
+        self.session_ids.append(self._sessions.id(get('session')))
+        self.reason_ids.append(self._reasons.id(get('exclusion_reason')))
+        self.titles.append(get('title'))
+        self.credit_points.append(_encode(get('credit_points')))
+        self.marks.append(_encode(get('mark')))
+        self.levels.append(get('level'))
+        year = get('year')
+        self.years.append(_NONE if year is None else int(year))
+        self.weights.append(_encode(get('weight')))
+        self.wam_weights.append(_encode(get('wam_weight')))
+        raw_credit_points = unit.raw_credit_points if isinstance(unit, Unit) else _MISSING
+        self.raw_credit_points.append(_UNSET if raw_credit_points is _MISSING else _encode(raw_credit_points))
+        self.flags.append((THESIS_FLAG if get('is_thesis') else 0) |
+                          (INCLUDED_FLAG if get('included_in_eihwam') else 0))
+
+    def extend(self, units: Iterable):
+        for unit in units:
+            self.append(unit)
+
+    def __len__(self) -> int:
+        return len(self.code_ids)
+
+    def __getitem__(self, index: int) -> Unit:
+        flags = self.flags[index]
+        unit = Unit(
+            code=self._codes.values[self.code_ids[index]],
+            title=self.titles[index],
+            credit_points=_decode(self.credit_points[index]),
+            mark=_decode(self.marks[index]),
+            grade=self._grades.values[self.grade_ids[index]],
+            level=self.levels[index],
+            is_thesis=bool(flags & THESIS_FLAG),
+            included_in_eihwam=bool(flags & INCLUDED_FLAG),
+            exclusion_reason=self._reasons.values[self.reason_ids[index]],
+        )
+        year = self.years[index]
+        if year != _NONE:
+            unit.year = str(year)
+            unit.session = self._sessions.values[self.session_ids[index]]
+        if self.weights[index] != _NONE:
+            unit.weight = self.weights[index]
+            unit.wam_weight = self.wam_weights[index]
+        if self.raw_credit_points[index] != _UNSET:
+            unit.raw_credit_points = _decode(self.raw_credit_points[index])
+        return unit
+
+    def __iter__(self) -> Iterator[Unit]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_units(self) -> List[Unit]:
+        return list(self)
+
+    def column(self, name: str) -> List:
+        """Return one field for every row, decoded to Python values."""
+        if name == 'code':
+            return [self._codes.values[i] for i in self.code_ids]
+        if name == 'grade':
+            return [self._grades.values[i] for i in self.grade_ids]
+        if name == 'session':
+            return [self._sessions.values[i] for i in self.session_ids]
+        if name == 'exclusion_reason':
+            return [self._reasons.values[i] for i in self.reason_ids]
+        if name == 'title':
+            return list(self.titles)
+        if name == 'is_thesis':
+            return [bool(flags & THESIS_FLAG) for flags in self.flags]
+        if name == 'included_in_eihwam':
+            return [bool(flags & INCLUDED_FLAG) for flags in self.flags]
+        if name == 'level':
+            return list(self.levels)
+        if name == 'raw_credit_points':
+            return [None if value == _UNSET else _decode(value) for value in self.raw_credit_points]
+        columns = {'credit_points': self.credit_points, 'mark': self.marks, 'year': self.years,
+                   'weight': self.weights, 'wam_weight': self.wam_weights}
+        if name not in columns:
+            raise KeyError(name)
+        return [_decode(value) for value in columns[name]]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the table, excluding interned strings."""
+        arrays = (self.code_ids, self.grade_ids, self.session_ids, self.reason_ids, self.credit_points,
+                  self.marks, self.levels, self.years, self.weights, self.wam_weights, self.raw_credit_points,
+                  self.flags)
+        total = sum(sys.getsizeof(column) for column in arrays)
+        total += sys.getsizeof(self.titles) + sum(sys.getsizeof(title) for title in self.titles)
+        return total
+
+
+def _encode(value: Optional[int]) -> int:
+    return _NONE if value is None or value is _MISSING else value
+
+
+def _decode(value: int) -> Optional[int]:
+    return None if value == _NONE else value
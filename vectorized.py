@@ -0,0 +1,224 @@
+"""
+Vectorized EIHWAM and WAM computation over columnar unit tables
+"""
+
+from typing import Dict, Iterable, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+from rules import MISSING_VALUES_REASON, ZERO_CREDIT_POINTS_REASON, RuleIndex, load_rule_index
+from units import INCLUDED_FLAG, THESIS_FLAG, UnitTable
+
+UNIT_COLUMNS = ['code', 'title', 'credit_points', 'mark', 'grade', 'level',
+                'is_thesis', 'included_in_eihwam', 'exclusion_reason']
+
+
+def _build_frame(units: List[Mapping], students: List[str] = None) -> pd.DataFrame:
+    data = {column: [unit.get(column) for unit in units] for column in UNIT_COLUMNS}
+    frame = pd.DataFrame({
+        'code': pd.Series(data['code'], dtype=object),
+        'title': pd.Series(data['title'], dtype=object),
+        'credit_points': np.array([np.nan if value is None else value for value in data['credit_points']], dtype=float),
+        'mark': np.array([np.nan if value is None else value for value in data['mark']], dtype=float),
+        'grade': pd.Series(data['grade'], dtype=object),
+        'level': np.asarray(data['level'], dtype=np.int64),
+        'is_thesis': np.asarray([bool(value) for value in data['is_thesis']], dtype=bool),
+        'included_in_eihwam': np.asarray([value is not False for value in data['included_in_eihwam']], dtype=bool),
+        'exclusion_reason': pd.Series(data['exclusion_reason'], dtype=object),
+    })
+    if students is not None:
+        frame.insert(0, 'student', pd.Series(students, dtype=object))
+    return frame
+
+
+def units_to_frame(units: Iterable[Mapping], student: str = None) -> pd.DataFrame:
+    """Build a unit table from parsed unit dicts.
+
+    ``mark`` and ``credit_points`` are float columns with NaN for missing
+    values. A ``student`` column is added when ``student`` is given.
+    """
+    units = list(units)
+    return _build_frame(units, None if student is None else [student] * len(units))
+
+
+def table_to_frame(table: UnitTable, students: List[str] = None) -> pd.DataFrame:
+    """Build a unit table straight from a UnitTable's columns.
+
+    No per-unit objects are created. ``students`` optionally labels each row.
+    """
+    def int_column(values) -> np.ndarray:
+        column = np.asarray(values, dtype=float)
+        column[column == -1] = np.nan
+        return column
+
+    flags = np.asarray(table.flags, dtype=np.uint8)
+    frame = pd.DataFrame({
+        'code': pd.Series(table.column('code'), dtype=object),
+        'title': pd.Series(table.titles, dtype=object),
+        'credit_points': int_column(table.credit_points),
+        'mark': int_column(table.marks),
+        'grade': pd.Series(table.column('grade'), dtype=object),
+        'level': np.asarray(table.levels, dtype=np.int64),
+        'is_thesis': (flags & THESIS_FLAG).astype(bool),
+        'included_in_eihwam': (flags & INCLUDED_FLAG).astype(bool),
+        'exclusion_reason': pd.Series(table.column('exclusion_reason'), dtype=object),
+    })
+    if students is not None:
+        frame.insert(0, 'student', pd.Series(students, dtype=object))
+    return frame
+
+
+def cohort_to_frame(units_by_student: Mapping[str, Iterable[Mapping]]) -> pd.DataFrame:
+    """Flatten many students' units into one table with a ``student`` column."""
+    units = []
+    students = []
+    for student, student_units in units_by_student.items():
+        student_units = list(student_units)
+        units.extend(student_units)
+        students.extend([student] * len(student_units))
+    return _build_frame(units, students)
+
+
+def apply_eihwam_rules(frame: pd.DataFrame, rules: RuleIndex = None) -> pd.DataFrame:
+    """Vectorized equivalent of ``TranscriptParser.apply_eihwam_rules``.
+
+    Each unit takes the first matching rule of ``rules`` (default:
+    eihwam_rules.json), exactly as ``RuleIndex.apply_rules`` does, via
+    ``np.select`` over boolean masks. Returns a new frame.
+    """
+    rules = rules or load_rule_index()
+    frame = frame.copy()
+    grade = frame['grade'].to_numpy(dtype=object)
+    mark_missing = frame['mark'].isna().to_numpy()
+    cp_missing = frame['credit_points'].isna().to_numpy()
+    credit_points = frame['credit_points'].to_numpy()
+    level = frame['level'].to_numpy()
+
+    # One condition per rule, in rule order; a None reason means "fix the mark"
+    conditions, reasons, fixed_marks = [], [], []
+    for rule in rules.grade_rules:
+        condition = np.isin(grade, rule.grades)
+        conditions.append(condition & mark_missing if rule.without_mark else condition)
+        reasons.append(rule.exclude)
+        fixed_marks.append(rule.mark)
+    for excluded_level, reason in rules.excluded_levels.items():
+        conditions.append(level == excluded_level)
+        reasons.append(reason)
+        fixed_marks.append(None)
+    conditions.append(cp_missing | mark_missing)
+    reasons.append(MISSING_VALUES_REASON)
+    fixed_marks.append(None)
+    conditions.append(credit_points == 0)
+    reasons.append(ZERO_CREDIT_POINTS_REASON)
+    fixed_marks.append(None)
+
+    # Index of the first matching rule per unit, or -1 when none apply
+    matched = np.select(conditions, np.arange(len(conditions)), default=-1)
+    reason_lookup = np.array(reasons + [None], dtype=object)
+    excludes = np.array([reason is not None for reason in reasons] + [False])
+    mark_lookup = np.array([np.nan if mark is None else mark for mark in fixed_marks] + [np.nan])
+    excluded = excludes[matched]
+    fixed_mark = mark_lookup[matched]
+
+    frame['included_in_eihwam'] = frame['included_in_eihwam'].to_numpy() & ~excluded
+    frame['exclusion_reason'] = np.where(excluded, reason_lookup[matched], frame['exclusion_reason'].to_numpy(dtype=object))
+    frame['mark'] = np.where(np.isnan(fixed_mark), frame['mark'].to_numpy(), fixed_mark)
+    return frame
+
+
+def calculate_weights(frame: pd.DataFrame, rules: RuleIndex = None) -> pd.DataFrame:
+    """Vectorized equivalent of ``TranscriptParser.calculate_weights``."""
+    rules = rules or load_rule_index()
+    eihwam_weights = np.array(rules.eihwam_weights, dtype=np.int64)
+    wam_weights = np.array(rules.wam_weights, dtype=np.int64)
+    frame = frame.copy()
+    level = frame['level'].to_numpy()
+    multiplier = np.where(frame['is_thesis'].to_numpy(), rules.thesis_multiplier, 1)
+    frame['weight'] = eihwam_weights[np.clip(level, 0, len(eihwam_weights) - 1)] * multiplier
+    frame['wam_weight'] = wam_weights[np.clip(level, 0, len(wam_weights) - 1)] * multiplier
+    return frame
+
+
+def _honours_classes(eihwam: np.ndarray, rules: RuleIndex) -> np.ndarray:
+    conditions = [eihwam >= threshold for threshold, _ in rules.honours_thresholds]
+    choices = [honours_class for _, honours_class in rules.honours_thresholds]
+    return np.select(conditions, choices, default=rules.lowest_honours_class)
+
+
+def calculate_eihwam(frame: pd.DataFrame, by: str = 'student', groups: Iterable = None,
+                     rules: RuleIndex = None) -> pd.DataFrame:
+    """Compute EIHWAM and WAM for every group in one weighted reduction.
+
+    ``frame`` must already have rules and weights applied. Returns one row
+    per group with the same values ``parse_transcript`` would report, in
+    order of first appearance, or in the order of ``groups`` when given
+    (groups with no units then get zero results, as an empty transcript does).
+    """
+    if groups is not None:
+        groups = pd.Index(list(groups))
+        group_index = groups.get_indexer(frame[by])
+    elif by in frame.columns:
+        group_index, groups = pd.factorize(frame[by])
+    else:
+        groups, group_index = pd.Index(['']), np.zeros(len(frame), dtype=np.int64)
+    group_count = len(groups)
+
+    mark = frame['mark'].to_numpy()
+    credit_points = frame['credit_points'].to_numpy()
+    has_values = ~np.isnan(mark) & ~np.isnan(credit_points) & (credit_points > 0)
+    eihwam_mask = has_values & frame['included_in_eihwam'].to_numpy()
+    mark = np.where(has_values, mark, 0)
+    credit_points = np.where(has_values, credit_points, 0)
+
+    weighted_cp = frame['weight'].to_numpy() * credit_points * eihwam_mask
+    wam_weighted_cp = frame['wam_weight'].to_numpy() * credit_points * has_values
+    # Marks, credit points and weights are integers, so these sums are exact
+    sums = np.stack([
+        np.bincount(group_index, weights=weighted_cp * mark, minlength=group_count),
+        np.bincount(group_index, weights=weighted_cp, minlength=group_count),
+        np.bincount(group_index, weights=wam_weighted_cp * mark, minlength=group_count),
+        np.bincount(group_index, weights=wam_weighted_cp, minlength=group_count),
+    ])
+
+    # Python floats and round() keep results identical to calculate_eihwam
+    # (NumPy rounds halves differently, e.g. 71.675 -> 71.68)
+    sums = sums.tolist()
+    eihwam = np.array([round(n / d, 2) if d > 0 else 0.0 for n, d in zip(sums[0], sums[1])])
+    wam = np.array([round(n / d, 2) if d > 0 else 0.0 for n, d in zip(sums[2], sums[3])])
+
+    included = np.bincount(group_index, weights=frame['included_in_eihwam'].to_numpy(), minlength=group_count)
+    total = np.bincount(group_index, minlength=group_count)
+    return pd.DataFrame({
+        by: np.asarray(groups, dtype=object),
+        'eihwam': eihwam,
+        'wam': wam,
+        'honours_class': _honours_classes(eihwam, rules or load_rule_index()),
+        'total_units': total,
+        'included_units': included.astype(np.int64),
+        'excluded_units': total - included.astype(np.int64),
+    })
+
+
+def evaluate_cohort(units_by_student: Mapping[str, Iterable[Mapping]], rules: RuleIndex = None) -> pd.DataFrame:
+    """Apply rules and weights and compute EIHWAM/WAM for many students at once."""
+    frame = calculate_weights(apply_eihwam_rules(cohort_to_frame(units_by_student), rules), rules)
+    return calculate_eihwam(frame, by='student', groups=units_by_student.keys(), rules=rules)
+
+
+def frame_to_units(frame: pd.DataFrame) -> List[Dict]:
+    """Convert a unit table back to the per-dict representation."""
+    units = []
+    for row in frame.to_dict('records'):
+        for column in ('mark', 'credit_points'):
+            value = row.get(column)
+            row[column] = None if value is None or np.isnan(value) else int(value)
+        for column in ('level', 'weight', 'wam_weight'):
+            if column in row:
+                row[column] = int(row[column])
+        for column in ('is_thesis', 'included_in_eihwam'):
+            row[column] = bool(row[column])
+        if pd.isna(row.get('exclusion_reason')):
+            row['exclusion_reason'] = None
+        units.append(row)
+    return units